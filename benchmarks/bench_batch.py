@@ -0,0 +1,61 @@
+"""Benchmark rendering a template with many contexts
+
+Compares calling `render()` for each record with `render_many()`, in the
+current thread, in a thread pool and in a process pool, on a short email
+template.
+
+Usage:
+    python benchmarks/bench_batch.py [n_records] [workers]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from liquid import Liquid
+
+TEMPLATE = '''Dear {{ name | capitalize }},
+
+{% if orders %}You have {{ orders | size }} orders:
+{% for order in orders %}  - #{{ order.id }}: {{ order.total }}
+{% endfor %}{% else %}You have no orders.{% endif %}
+Best,
+{{ sender }}'''
+
+def make_records(size):
+    # type: (int) -> List[dict]
+    """Generate the records"""
+    return [{'name': f'user{i}',
+             'orders': [{'id': j, 'total': j * 9.5} for j in range(i % 3)]}
+            for i in range(size)]
+
+def main():
+    """Run the benchmarks"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    records = make_records(size)
+    print(f'{size} records')
+    for name, config in (('Tag tree', {}), ('Compiled', {'compile': True})):
+        liq = Liquid(TEMPLATE, config, sender='Shop')
+        start = time.perf_counter()
+        expected = [liq.render(**record) for record in records]
+        elapsed = time.perf_counter() - start
+        print(f'  {name}:')
+        print(f'    {"render()":22}{size / elapsed:10.0f} records/s')
+
+        assert list(liq.render_many(records)) == expected
+        print(f'    {"render_many()":22}'
+              f'{liq.batch_stats.records_per_second:10.0f} records/s')
+
+        assert list(liq.render_many(records, workers)) == expected
+        print(f'    {f"render_many({workers} threads)":22}'
+              f'{liq.batch_stats.records_per_second:10.0f} records/s')
+
+        assert list(liq.render_many(records, processes=workers)) == expected
+        print(f'    {f"render_many({workers} procs)":22}'
+              f'{liq.batch_stats.records_per_second:10.0f} records/s')
+
+if __name__ == '__main__':
+    main()
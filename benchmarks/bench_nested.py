@@ -0,0 +1,56 @@
+"""Benchmark rendering nested loops of growing sizes
+
+The rendered pieces of the tag tree are written to one list, joined once,
+so the time per iteration should stay flat as the number of iterations
+grows (linear scaling).
+
+Usage:
+    python benchmarks/bench_nested.py [max_iterations] [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from liquid import Liquid
+
+TEMPLATE = '''
+{%- for row in rows -%}
+  <tr>{% for cell in row %}<td>{% if cell > 0 %}{{ cell }}{% endif %}</td>
+  {%- endfor %}</tr>
+{% endfor -%}
+'''
+
+def bench(liq, rows, repeats):
+    # type: (Liquid, List[List[int]], int) -> float
+    """Get the best time in seconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        liq.render(rows=rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    """Run the benchmarks"""
+    max_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sizes = []
+    size = 1000
+    while size <= max_iterations:
+        sizes.append(size)
+        size *= 10
+
+    for name, config in (('Tag tree', {}), ('Compiled', {'compile': True})):
+        liq = Liquid(TEMPLATE, config)
+        print(f'{name}:')
+        for size in sizes:
+            rows = [list(range(100)) for _ in range(size // 100)]
+            elapsed = bench(liq, rows, repeats)
+            print(f'  {size:>9} iterations: {elapsed * 1000:10.1f} ms '
+                  f'{elapsed / size * 1e6:8.2f} us/iteration')
+
+if __name__ == '__main__':
+    main()
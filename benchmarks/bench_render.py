@@ -0,0 +1,75 @@
+"""Benchmark the rendering of the templates
+
+Compares rendering the tag tree with rendering the compiled template
+(`{'compile': True}`) on a product listing in standard mode.
+
+Usage:
+    python benchmarks/bench_render.py [n_products] [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from liquid import Liquid
+
+TEMPLATE = '''
+{%- for product in products %}
+<div class="product-card" data-id="{{ product.id }}">
+  <h3>{{ product.title | escape }}</h3>
+  {%- if product.on_sale %}
+    <span class="badge">Sale</span>
+  {%- elsif product.new %}
+    <span class="badge">New</span>
+  {%- endif %}
+  {% assign price = product.price | times: 1.2 %}
+  <p class="price">{{ price }}</p>
+  <ul>{% for tag in product.tags %}<li>{{ tag }}</li>{% endfor %}</ul>
+  {% case product.stock %}
+    {% when 0 %}Sold out
+    {% else %}In stock
+  {% endcase %}
+</div>
+{%- endfor %}
+'''
+
+def make_products(size):
+    # type: (int) -> List[dict]
+    """Generate the products"""
+    return [{'id': i,
+             'title': f'Product <{i}>',
+             'on_sale': i % 3 == 0,
+             'new': i % 5 == 0,
+             'price': i * 1.5,
+             'tags': ['a', 'b', 'c'],
+             'stock': i % 4} for i in range(size)]
+
+def bench(liq, products, repeats):
+    # type: (Liquid, List[dict], int) -> Tuple[float, str]
+    """Get the best time in seconds and the rendered string"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rendered = liq.render(products=products)
+        best = min(best, time.perf_counter() - start)
+    return best, rendered
+
+def main():
+    """Run the benchmarks"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    products = make_products(size)
+    print(f'{size} products, best of {repeats} runs')
+    tree_time, tree_rendered = bench(Liquid(TEMPLATE), products, repeats)
+    compiled_time, compiled_rendered = bench(
+        Liquid(TEMPLATE, {'compile': True}), products, repeats
+    )
+    assert tree_rendered == compiled_rendered
+    print(f'  Tag tree: {tree_time * 1000:8.1f} ms')
+    print(f'  Compiled: {compiled_time * 1000:8.1f} ms '
+          f'({tree_time / compiled_time:.1f}x)')
+
+if __name__ == '__main__':
+    main()
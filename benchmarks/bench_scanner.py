@@ -0,0 +1,97 @@
+"""Benchmark the parse throughput of the node scanners
+
+Compares `NodeScanner` with the character-wise `NodeScannerLegacy` on a
+generated product-page-like template (~200KB by default) in both modes.
+
+Usage:
+    python benchmarks/bench_scanner.py [size_in_kb] [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from liquid.config import Config
+from liquid.utils import template_meta
+from liquid.parser import Parser
+from liquid.python.parser import Parser as ParserPython
+from tests.legacy_scanner import NodeScannerLegacy, NodeScannerLegacyPython
+
+CARD = '''
+<div class="product-card" data-id="{{ product.id }}">
+  <a href="/products/{{ product.handle }}" class="product-card__link">
+    <img src="{{ product.image }}" alt="{{ product.title | escape }}"
+         loading="lazy" width="480" height="480">
+  </a>
+  <h3 class="product-card__title">{{ product.title }}</h3>
+  {%- if product.on_sale %}
+    <span class="badge badge--sale">Sale</span>
+  {%- endif %}
+  <p class="product-card__price">{{ product.price | times: 1.0 }}</p>
+  <ul class="product-card__tags">
+    {% for tag in product.tags %}<li>{{ tag }}</li>{% endfor %}
+  </ul>
+  <p class="product-card__description">
+    Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod
+    tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim
+    veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip.
+  </p>
+</div>
+'''
+
+def make_template(size):
+    # type: (int) -> str
+    """Repeat the product card until the template reaches the size"""
+    return CARD * (size // len(CARD) + 1)
+
+def scan(parser_class, scanner_class, template):
+    # type: (Type[Parser], Type, str) -> int
+    """Scan the template into nodes, returning the number of nodes"""
+    parser_class = type(parser_class.__name__,
+                        (parser_class, ),
+                        {'NODESCANNER_CLASS': scanner_class})
+    parser = parser_class(template_meta(template), Config())
+    count = 0
+    while True:
+        node = parser.nodescanner.consume(parser.context.stream)
+        if node is False:
+            return count
+        if node is not True:
+            count += 1
+
+def bench(parser_class, scanner_class, template, repeats):
+    # type: (Type[Parser], Type, str, int) -> Tuple[float, int]
+    """Get the best throughput in MB/s and the number of nodes"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = scan(parser_class, scanner_class, template)
+        best = min(best, time.perf_counter() - start)
+    return len(template.encode()) / best / 1024 / 1024, count
+
+def main():
+    """Run the benchmarks"""
+    size = int(sys.argv[1]) * 1024 if len(sys.argv) > 1 else 200 * 1024
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    template = make_template(size)
+    print(f'Template size: {len(template) / 1024:.1f} KB, '
+          f'best of {repeats} runs')
+    for mode, parser_class, legacy in (
+            ('standard', Parser, NodeScannerLegacy),
+            ('python', ParserPython, NodeScannerLegacyPython)
+    ):
+        new_mbps, new_count = bench(parser_class,
+                                    parser_class.NODESCANNER_CLASS,
+                                    template,
+                                    repeats)
+        old_mbps, old_count = bench(parser_class, legacy, template, repeats)
+        assert new_count == old_count
+        print(f'[{mode}] {new_count} nodes')
+        print(f'  NodeScannerLegacy: {old_mbps:8.3f} MB/s')
+        print(f'  NodeScanner:       {new_mbps:8.3f} MB/s '
+              f'({new_mbps / old_mbps:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the startup of liquidpy
+
+Measures `import liquid`, the first render of a template and `warmup()`
+in fresh processes, with the LALR tables of the tag parsers cached on
+disk and without (`LIQUID_PARSER_CACHE_DIR=`). The max resident memory
+of the process before and after `warmup()` is also reported.
+
+Usage:
+    python benchmarks/bench_startup.py [repeats]
+"""
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = '''
+import json, time, resource
+start = time.perf_counter()
+import liquid
+imported = time.perf_counter()
+liquid.Liquid('{% for x in y %}{% if x %}{{ x }}{% endif %}{% endfor %}')
+parsed = time.perf_counter()
+memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+liquid.warmup()
+warmedup = time.perf_counter()
+print(json.dumps([imported - start, parsed - imported, warmedup - parsed,
+                  memory, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]))
+'''
+
+def run(cache_dir, repeats):
+    # type: (Optional[str], int) -> List[float]
+    """Run the script in fresh processes and get the best timings"""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = str(ROOT)
+    if cache_dir is not None:
+        env['LIQUID_PARSER_CACHE_DIR'] = cache_dir
+    results = [json.loads(subprocess.check_output([sys.executable,
+                                                   '-c', SCRIPT],
+                                                  env=env))
+               for _ in range(repeats)]
+    return [min(result[i] for result in results) for i in range(5)]
+
+def main():
+    """Run the benchmarks"""
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'Best of {repeats} runs')
+    print(f'  {"":16} {"import":>10} {"1st parse":>10} {"warmup":>10} '
+          f'{"max rss":>10} {"warmed up":>10}')
+    for label, cache_dir in (('no table cache', ''),
+                             ('table cache', None)):
+        if cache_dir is None:
+            # make sure the tables are cached
+            run(cache_dir, 1)
+        imported, parsed, warmedup, memory, warmed_memory = run(cache_dir,
+                                                                repeats)
+        print(f'  {label:16} {imported * 1000:8.1f}ms {parsed * 1000:8.1f}ms '
+              f'{warmedup * 1000:8.1f}ms {memory / 1024:8.1f}MB '
+              f'{warmed_memory / 1024:8.1f}MB')
+
+if __name__ == '__main__':
+    main()
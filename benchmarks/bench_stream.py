@@ -0,0 +1,68 @@
+"""Benchmark streaming the rendered content
+
+Compares `render()` with `render_to()` on a large CSV export, for the
+time to the first byte, the total time and the peak memory allocated
+while rendering.
+
+Usage:
+    python benchmarks/bench_stream.py [n_rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from liquid import Liquid
+
+TEMPLATE = '''id,name,email,score
+{% for row in rows -%}
+{{ row.id }},{{ row.name | capitalize }},{{ row.email }},{{ row.score }}
+{% endfor %}'''
+
+class Sink:
+    """Record the time of the first write and discard the content"""
+    def __init__(self, start):
+        self.start = start
+        self.first = None
+        self.devnull = open(os.devnull, 'w')
+
+    def write(self, content):
+        """Write the content"""
+        if self.first is None:
+            self.first = time.perf_counter() - self.start
+        self.devnull.write(content)
+
+def bench(func, rows):
+    # type: (Callable, List[dict]) -> Tuple[float, float, int]
+    """Get the time to the first byte, total time and peak memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    sink = Sink(start)
+    func(sink, rows)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sink.first, total, peak
+
+def main():
+    """Run the benchmarks"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = [{'id': i, 'name': f'user {i}', 'email': f'user{i}@example.com',
+             'score': i * 0.5} for i in range(size)]
+    liq = Liquid(TEMPLATE)
+    print(f'{size} rows')
+    for label, func in (
+            ('render()', lambda sink, rows: sink.write(liq.render(rows=rows))),
+            ('render_to()', lambda sink, rows: liq.render_to(sink, rows=rows))
+    ):
+        first, total, peak = bench(func, rows)
+        print(f'  {label:12} first byte {first * 1000:8.1f} ms, '
+              f'total {total * 1000:8.1f} ms, '
+              f'peak {peak / 1024 / 1024:6.1f} MB')
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,17 @@
 """A port of liquid template engine in python"""
-from .liquid import Liquid
+from .liquid import Liquid, warmup
+from .environment import Environment
+from .loaders import (
+    Loader,
+    FileSystemLoader,
+    DictLoader,
+    PackageLoader,
+    ZipLoader,
+    ChoiceLoader,
+)
 from .filters import filter_manager
 from .tags import tag_manager, Tag
+from .cache import template_cache
 from .exceptions import (
     LiquidException,
     LiquidTagRegistryException,
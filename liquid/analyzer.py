@@ -0,0 +1,411 @@
+"""Analyze the parsed templates statically
+
+The tag tree of a template is walked to find what the template refers to
+without rendering it: the variables expected from the context with the
+paths of the attributes and items accessed on them, the filters, the
+tags, the templates included or extended and the variables assigned.
+The templates included or extended are walked as well, as if they were
+in place. The tree is walked as optimized (see `liquid.optimizer`), so
+the references in the branches pruned or the tags removed are not there.
+
+The variables bound in the template (i.e. the variables of the loops) are
+not taken from the context. The paths accessed on the variables of the
+loops are reported on the iterables, with `[]` for any item, so that
+`{% for p in products %}{{ p.title }}{% endfor %}` refers to
+`products[].title`. The variables assigned are only taken as bound for
+the rest of the tag they are assigned in, since the tags before they are
+reached, or the branches not taken, do not assign them.
+
+The analysis is conservative, a variable might be reported although it
+is never used when rendering, but never the other way around, unless the
+analysis is not complete (i.e. the templates included by the paths
+evaluated when rendering, or the custom tags, whose references are not
+known).
+"""
+from collections import namedtuple
+from .filters import filter_manager
+from .tags.transformer import (
+    TagSegment,
+    TagSegmentArguments,
+    TagSegmentFilter,
+    TagSegmentGetAttr,
+    TagSegmentGetItem,
+    TagSegmentOutput,
+    TagSegmentVar
+)
+from .tags.tag__literal import TagLITERAL
+from .tags.tag__output import TagOUTPUT
+from .tags.tag__root import TagROOT
+from .tags.tag_assign import TagAssign
+from .tags.tag_block import TagBlock
+from .tags.tag_break import TagBreak
+from .tags.tag_capture import TagCapture
+from .tags.tag_case import TagCase
+from .tags.tag_comment import TagComment
+from .tags.tag_config import TagConfig
+from .tags.tag_continue import TagContinue
+from .tags.tag_cycle import TagCycle
+from .tags.tag_decrement import TagDecrement
+from .tags.tag_else import TagElse
+from .tags.tag_elsif import TagElsif
+from .tags.tag_extends import TagExtends
+from .tags.tag_for import TagFor
+from .tags.tag_if import TagIf
+from .tags.tag_include import TagInclude
+from .tags.tag_increment import TagIncrement
+from .tags.tag_raw import TagRaw
+from .tags.tag_tablerow import TagTablerow
+from .tags.tag_unless import TagUnless
+from .tags.tag_when import TagWhen
+from .utils import NOTHING, Scope
+
+class Analysis(namedtuple('Analysis', ['variables',
+                                         'paths',
+                                         'filters',
+                                         'tags',
+                                         'includes',
+                                         'extends',
+                                         'assigns',
+                                         'complete'])):
+    """The references of a template found by `Analyzer`
+
+    Attributes:
+        variables: The names of the variables expected from the context
+        paths: The paths accessed on the variables from the context, i.e.
+            `product.title`, `product.images[0]` or `products[].title`,
+            with `[]` for the items only known when rendering
+        filters: The names of the filters
+        tags: The names of the tags
+        includes: The paths of the templates included
+        extends: The paths of the templates extended, the closest first
+        assigns: The names of the variables assigned or captured
+        complete: Whether all the references are known. They are not if
+            there are templates included by the paths evaluated when
+            rendering, or tags unknown to the analyzer (i.e. custom tags)
+    """
+    __slots__ = ()
+
+# the mark of the variables not bound in the template
+_FREE = object()
+
+class Analyzer:
+    """Find the references of a parsed template
+
+    Attributes:
+        HANDLERS: The methods to analyze the tags, by the tag classes, the
+            other tags have their parsed contents and children walked
+        SEGMENT_HANDLERS: The methods to walk the segments, by the segment
+            classes, the other segments have their data walked
+        KNOWN: The tag classes whose references are all known
+        FILTER_MANAGER: The filter manager to get the filters from
+        VAR_SEGMENT: The segment class of the variables
+        GETATTR_SEGMENT: The segment class of the attributes
+        GETITEM_SEGMENT: The segment class of the items
+        BUILTINS: The names of the variables that are not expected from the
+            context
+
+        filters: The filters available to the template, the names of the
+            filters not in them are taken as variables from the context
+
+    Args:
+        parser: The parser of the template
+    """
+    HANDLERS = {
+        TagAssign: '_analyze_assign',
+        TagCapture: '_analyze_capture',
+        TagComment: '_skip',
+        TagConfig: '_skip',
+        TagExtends: '_analyze_extends',
+        TagFor: '_analyze_loop',
+        TagInclude: '_analyze_include',
+        TagRaw: '_skip',
+        TagTablerow: '_analyze_loop',
+    } # type: Dict[Type[Tag], str]
+
+    SEGMENT_HANDLERS = {
+        TagSegmentArguments: '_walk_arguments',
+        TagSegmentFilter: '_walk_filter',
+    } # type: Dict[Type[TagSegment], str]
+
+    KNOWN = (
+        TagROOT,
+        TagLITERAL,
+        TagOUTPUT,
+        TagAssign,
+        TagBlock,
+        TagBreak,
+        TagCapture,
+        TagCase,
+        TagComment,
+        TagConfig,
+        TagContinue,
+        TagCycle,
+        TagDecrement,
+        TagElse,
+        TagElsif,
+        TagExtends,
+        TagFor,
+        TagIf,
+        TagInclude,
+        TagIncrement,
+        TagRaw,
+        TagTablerow,
+        TagUnless,
+        TagWhen,
+    ) # type: Tuple[Type[Tag]]
+
+    FILTER_MANAGER = filter_manager # type: FilterManager
+    VAR_SEGMENT = TagSegmentVar # type: Type[TagSegment]
+    GETATTR_SEGMENT = TagSegmentGetAttr # type: Type[TagSegment]
+    GETITEM_SEGMENT = TagSegmentGetItem # type: Type[TagSegment]
+    BUILTINS = frozenset() # type: FrozenSet[str]
+
+    def __init__(self, parser):
+        # type: (Parser) -> None
+        self.filters = parser.env.get_filters(
+            self.FILTER_MANAGER
+        ) # type: Dict[str, Callable]
+        self._variables = set() # type: Set[str]
+        self._paths = set() # type: Set[str]
+        self._filters = set() # type: Set[str]
+        self._tags = set() # type: Set[str]
+        self._includes = set() # type: Set[str]
+        self._extends = [] # type: List[str]
+        self._assigns = set() # type: Set[str]
+        self._complete = True
+        # the roots of the templates being included, against recursions
+        self._including = set() # type: Set[Tag]
+
+    def analyze(self, root):
+        # type: (TagROOT) -> Analysis
+        """Analyze the tag tree of a template
+
+        Args:
+            root: The root tag of the template
+
+        Returns:
+            The references of the template
+        """
+        self._analyze_children(root, Scope({}))
+        return Analysis(frozenset(self._variables),
+                        frozenset(self._paths),
+                        frozenset(self._filters),
+                        frozenset(self._tags),
+                        frozenset(self._includes),
+                        tuple(self._extends),
+                        frozenset(self._assigns),
+                        self._complete)
+
+    def _analyze_children(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Analyze the children of a tag in order, with the variables bound
+        in them"""
+        for child in tag.children:
+            self._analyze_tag(child, bindings)
+
+    def _analyze_tag(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Analyze a tag and its descendants
+
+        Args:
+            tag: The tag
+            bindings: The variables bound in the template by their names,
+                see `_resolve` for the values
+        """
+        if isinstance(tag, TagLITERAL):
+            return
+        # not the internal ones (i.e. ROOT and OUTPUT)
+        if not tag.name.isupper():
+            self._tags.add(tag.name)
+        # the parsing might be held (i.e. inside a block)
+        if type(tag) not in self.KNOWN or (tag.PARSER and
+                                           tag.parsed is None):
+            self._complete = False
+        handler = self.HANDLERS.get(type(tag))
+        if handler:
+            getattr(self, handler)(tag, bindings)
+            return
+        self._walk(tag.parsed, bindings)
+        if tag.children:
+            self._analyze_children(tag, Scope(bindings))
+
+    def _walk(self, data, bindings):
+        # type: (Any, Scope) -> None
+        """Find the references in a segment, a tuple of them or a literal"""
+        if isinstance(data, (tuple, list)):
+            for dat in data:
+                self._walk(dat, bindings)
+            return
+        if not isinstance(data, TagSegment):
+            return
+
+        path = self._path(data, bindings)
+        if path is not None:
+            self._reference(*path, bindings)
+            return
+        handler = self.SEGMENT_HANDLERS.get(type(data))
+        if handler:
+            getattr(self, handler)(data, bindings)
+        else:
+            self._walk(data.data, bindings)
+
+    def _path(self, segment, bindings):
+        # type: (TagSegment, Scope) -> Optional[Tuple[str, List[str]]]
+        """Get the path of the attributes and items accessed on a variable,
+        with the subscripts evaluated when rendering walked
+
+        Returns:
+            The name of the variable and the parts of the path after it, or
+            None if the segment does not access a variable
+        """
+        parts = [] # type: List[str]
+        while not isinstance(segment, self.VAR_SEGMENT):
+            if isinstance(segment, self.GETATTR_SEGMENT):
+                parts.append(f'.{segment.data[1]}')
+            elif isinstance(segment, self.GETITEM_SEGMENT):
+                subscript = segment.data[1]
+                if isinstance(subscript, str):
+                    parts.append(f'.{subscript}')
+                elif isinstance(subscript, int):
+                    parts.append(f'[{subscript}]')
+                else:
+                    self._walk(subscript, bindings)
+                    parts.append('[]')
+            else:
+                return None
+            segment = segment.data[0]
+        return str(segment), parts[::-1]
+
+    def _resolve(self, name, parts, bindings):
+        # type: (str, List[str], Scope) -> Optional[str]
+        """Resolve the path accessed on a variable against the variables
+        bound in the template
+
+        A variable can be bound to None if it is local to the template, to
+        the path it refers to (i.e. the items of the iterable of a loop),
+        or to a dict of them for the parameters of an include.
+
+        Returns:
+            The path on the variables from the context, or None if the
+            variable is local
+        """
+        binding = bindings.get(name, _FREE)
+        if binding is _FREE:
+            if name in self.BUILTINS:
+                return None
+            self._variables.add(name)
+            return name + ''.join(parts)
+
+        parts = list(parts)
+        while isinstance(binding, dict) and parts:
+            binding = binding.get(parts.pop(0)[1:])
+        if not isinstance(binding, str):
+            return None
+        return binding + ''.join(parts)
+
+    def _reference(self, name, parts, bindings):
+        # type: (str, List[str], Scope) -> None
+        """Record the path accessed on a variable"""
+        path = self._resolve(name, parts, bindings)
+        if path is not None:
+            self._paths.add(path)
+
+    def _alias(self, segment, bindings):
+        # type: (Any, Scope) -> Optional[str]
+        """Get the path a segment refers to as a whole, if it is one"""
+        if isinstance(segment, TagSegmentOutput) and len(segment) == 1:
+            segment = segment.data[0]
+        if not isinstance(segment, TagSegment):
+            return None
+        path = self._path(segment, bindings)
+        return None if path is None else self._resolve(*path, bindings)
+
+    def _filter(self, name, bindings):
+        # type: (str, Scope) -> None
+        """Record a filter, which is looked up in the context if it is not
+        one of the filters available"""
+        self._filters.add(name)
+        if name not in self.filters:
+            self._reference(name, [], bindings)
+
+    def _walk_arguments(self, segment, bindings):
+        # type: (TagSegmentArguments, Scope) -> None
+        """Walk the values of the arguments, not the names of the keyword
+        ones"""
+        for test1, test2 in segment.data:
+            self._walk(test1 if test2 is NOTHING else test2, bindings)
+
+    def _walk_filter(self, segment, bindings):
+        # type: (TagSegmentFilter, Scope) -> None
+        """Record the filter and walk its arguments"""
+        name, args = segment.data
+        self._filter(str(name), bindings)
+        self._walk(args, bindings)
+
+    @staticmethod
+    def _skip(tag, bindings): # pylint: disable=unused-argument
+        # type: (Tag, Scope) -> None
+        """Skip the tags rendering nothing from the context"""
+
+    def _analyze_assign(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Walk the output and bind the variable assigned to it"""
+        varname, output = tag.parsed
+        self._walk(output, bindings)
+        bindings[varname] = self._alias(output, bindings)
+        self._assigns.add(varname)
+
+    def _analyze_capture(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Analyze the children and bind the variable captured"""
+        self._analyze_children(tag, Scope(bindings))
+        varname = str(tag.parsed)
+        bindings[varname] = None
+        self._assigns.add(varname)
+
+    def _analyze_loop(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Analyze the children with the variable of the loop bound to the
+        items of the iterable"""
+        varname, atom, args = tag.parsed
+        self._walk((atom, args), bindings)
+        iterable = self._alias(atom, bindings)
+        inside = Scope(bindings, {
+            varname: None if iterable is None else f'{iterable}[]'
+        })
+        if isinstance(tag, TagFor):
+            inside['forloop'] = None
+        self._analyze_children(tag, inside)
+
+    def _analyze_include(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        """Analyze the included template in place, with the parameters
+        bound to what they refer to"""
+        path, items = tag.parsed
+        self._walk(tuple(value for _, value in items), bindings)
+        if isinstance(path, TagSegment):
+            # only known when rendering
+            self._walk(path, bindings)
+            self._complete = False
+            return
+
+        self._includes.add(path.context.path)
+        root = path.visitor.root
+        if root in self._including:
+            return
+        self._including.add(root)
+        self._analyze_children(root, Scope(bindings, {'include': {
+            str(name): self._alias(value, bindings) for name, value in items
+        }}))
+        self._including.remove(root)
+
+    def _analyze_extends(self, tag, bindings):
+        # type: (TagExtends, Scope) -> None
+        """Analyze the tree flattened with the mother templates"""
+        mother = tag.parsed
+        while mother:
+            self._extends.append(mother.context.path)
+            mother = next((child.parsed
+                           for child in mother.visitor.root.children
+                           if type(child) is type(tag)), None)
+        self._analyze_children(tag.flattened, bindings)
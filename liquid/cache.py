@@ -0,0 +1,366 @@
+"""The cache of the parsed templates
+
+Attributes:
+    CacheInfo: The statistics of the cache
+    template_cache: The process-wide cache of the parsed templates
+    include_cache: The process-wide cache of the templates resolved by the
+        include tags with the paths evaluated when rendering, keyed by the
+        names, the including templates, the configurations and the
+        loaders. The values are the keys of the templates in
+        `template_cache`, and the entries are removed when the paths of
+        the templates resolved are invalidated
+"""
+import os
+import pickle
+import copyreg
+import hashlib
+import tempfile
+from io import BytesIO, StringIO, TextIOWrapper
+from pathlib import Path
+from threading import RLock
+from collections import OrderedDict, namedtuple
+from .config import LIQUID_CACHE_SIZE
+from .utils import logger
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+def dependencies(root):
+    # type: (Tag) -> List[str]
+    """Get the paths of the template and the templates it includes or
+    extends
+
+    The templates included by paths evaluated when rendering are not
+    known until then, see `include_cache`.
+
+    Args:
+        root: The root tag of the parsed template
+
+    Returns:
+        The paths of the templates
+    """
+    ret = []
+    parsers = [root.parser]
+    while parsers:
+        parser = parsers.pop()
+        ret.append(str(Path(parser.context.path)))
+        tags = [parser.visitor.root]
+        while tags:
+            tag = tags.pop()
+            tags.extend(tag.children)
+            if tag.name == 'extends' and tag.parsed is not None:
+                parsers.append(tag.parsed)
+            elif (tag.name == 'include' and tag.parsed is not None
+                  and not tag.dynamic):
+                parsers.append(tag.parsed[0])
+    return ret
+
+class TemplateCache:
+    """An in-memory LRU cache of the parsed templates
+
+    The least recently used entry is evicted when the cache is full.
+
+    Attributes:
+        maxsize: The max number of entries to keep
+        hits: The number of hits
+        misses: The number of misses
+
+    Args:
+        maxsize: The max number of entries to keep
+    """
+
+    def __init__(self, maxsize=LIQUID_CACHE_SIZE):
+        # type: (int) -> None
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # type: OrderedDict
+        # the paths of the templates each entry depends on
+        self._depends = {} # type: Dict[Tuple, FrozenSet[str]]
+        self._lock = RLock()
+
+    @staticmethod
+    def key(liquid_class, source, meta, config, env=None):
+        # type: (Type[Liquid], str, TemplateMeta, Config,
+        #        Optional[Environment]) -> Tuple
+        """Get the key of a template
+
+        Args:
+            liquid_class: The class of the Liquid object, telling the mode
+            source: The source of the template
+            meta: The template meta data. The path is part of the key, since
+                relative includes and extends are resolved against it
+            config: The configuration
+            env: The environment, whose loader resolves the templates
+                included or extended. The loader is identified by its
+                `repr()`, see `Loader`
+
+        Returns:
+            The key for the cache
+        """
+        return (
+            liquid_class.__name__,
+            hashlib.sha256(source.encode()).hexdigest(),
+            meta.path,
+            TemplateCache.config_key(config),
+            repr(env.loader) if env else None
+        )
+
+    @staticmethod
+    def config_key(config):
+        # type: (Config) -> Tuple[Tuple[str, str], ...]
+        """Get the part of the keys for the configuration
+
+        Args:
+            config: The configuration
+
+        Returns:
+            The items of the configuration with the values in their
+            `repr()`, sorted by the names
+        """
+        return tuple(sorted((name, repr(value))
+                            for name, value in config.items()))
+
+    def get(self, key, default=None):
+        # type: (Tuple, Any) -> Any
+        """Get an entry and mark it as the most recently used one
+
+        Args:
+            key: The key of the entry
+            default: The value to return if the entry does not exist
+
+        Returns:
+            The cached value or the default
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, depends=()):
+        # type: (Tuple, Any, Iterable[Union[str, Path]]) -> None
+        """Put an entry in the cache, evicting the least recently used
+        entries if the cache is full
+
+        Args:
+            key: The key of the entry
+            value: The value to cache
+            depends: The paths of the templates the entry depends on, i.e.
+                the ones included or extended, so that the entry is removed
+                when any of them is invalidated
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._depends[key] = frozenset(str(path) for path in depends)
+            while len(self._entries) > max(self.maxsize, 0):
+                evicted, _ = self._entries.popitem(last=False)
+                self._depends.pop(evicted, None)
+
+    def invalidate(self, path=None):
+        # type: (Optional[Union[str, Path]]) -> int
+        """Remove the entries of a template and the ones depending on it
+
+        Args:
+            path: The path of the template. If not given, all the entries
+                are removed
+
+        Returns:
+            The number of the entries removed
+        """
+        with self._lock:
+            if path is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._depends.clear()
+                return removed
+
+            path = str(path)
+            keys = [key for key in self._entries
+                    if key[2] == path or path in self._depends.get(key, ())]
+            for key in keys:
+                del self._entries[key]
+                self._depends.pop(key, None)
+            return len(keys)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all the entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._depends.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        # type: () -> CacheInfo
+        """Get the statistics of the cache"""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses,
+                             self.maxsize, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+class PickledStream:
+    # pylint: disable=too-few-public-methods
+    """Stands for the file stream of a template in the pickled templates
+
+    It works as a closed stream, which is reopened by its name when the
+    source is needed to show in the exceptions.
+
+    Attributes:
+        name: The name of the file
+        closed: Always True
+    """
+    closed = True
+
+    def __init__(self, name):
+        # type: (str) -> None
+        self.name = name
+
+def _reduce_stringio(stream):
+    # type: (StringIO) -> Tuple[Callable, Tuple[str]]
+    """Pickle the StringIO object as its value"""
+    return StringIO, (stream.getvalue() if not stream.closed else '', )
+
+def _reduce_file(stream):
+    # type: (IO) -> Tuple[Callable, Tuple[str]]
+    """Pickle the file stream as its name"""
+    return PickledStream, (stream.name, )
+
+# pylint: disable=invalid-name
+DISPATCH_TABLE = copyreg.dispatch_table.copy() # type: Dict[Type, Callable]
+DISPATCH_TABLE.update({StringIO: _reduce_stringio,
+                       TextIOWrapper: _reduce_file})
+# pylint: enable=invalid-name
+
+def dumps(obj):
+    # type: (Any) -> bytes
+    """Pickle an object with parsed templates in it
+
+    The streams of the templates cannot be pickled themselves. The
+    StringIO objects are pickled as their values and the file streams
+    as their names (see `PickledStream`).
+
+    Args:
+        obj: The object to pickle
+
+    Returns:
+        The pickled bytes, which can be loaded by `pickle.loads()`
+    """
+    buffer = BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = DISPATCH_TABLE
+    pickler.dump(obj)
+    return buffer.getvalue()
+
+class DiskCache:
+    """A cache of the parsed templates in a directory
+
+    The parsed templates are pickled into files named by the hash of the
+    key and the version of liquidpy. The modification times of the
+    template and the templates it includes or extends are stored with
+    the parsed template, so that the entry is invalidated when any of
+    them changes.
+
+    Attributes:
+        directory: The directory to save the cached templates
+
+    Args:
+        directory: The directory to save the cached templates
+    """
+    def __init__(self, directory):
+        # type: (Union[str, Path]) -> None
+        self.directory = Path(directory)
+
+    def path(self, key):
+        # type: (Tuple) -> Path
+        """Get the path of the cache file for the key"""
+        from . import __version__
+        digest = hashlib.sha256(f'{__version__}{key!r}'.encode()).hexdigest()
+        return self.directory / f'{digest}.pickle'
+
+    @staticmethod
+    def mtimes(root):
+        # type: (Tag) -> Dict[str, int]
+        """Get the modification times of the template and the templates
+        it includes or extends
+
+        Args:
+            root: The root tag of the parsed template
+
+        Returns:
+            The modification times in nanoseconds, keyed by the paths
+        """
+        ret = {}
+        for path in dependencies(root):
+            try:
+                ret[path] = Path(path).stat().st_mtime_ns
+            except OSError:
+                # templates from a string
+                pass
+        return ret
+
+    def get(self, key):
+        # type: (Tuple) -> Optional[Tag]
+        """Load the parsed template
+
+        Args:
+            key: The key of the template
+
+        Returns:
+            The root tag of the parsed template, or None if it is not cached
+            or any of the templates it depends on has been modified
+        """
+        path = self.path(key)
+        try:
+            with path.open('rb') as fcache:
+                mtimes, root = pickle.load(fcache)
+        except FileNotFoundError:
+            return None
+        except Exception as exc: # pylint: disable=broad-except
+            logger.debug('Failed to load cached template %s: %s', path, exc)
+            return None
+
+        for template, mtime in mtimes.items():
+            try:
+                if Path(template).stat().st_mtime_ns != mtime:
+                    return None
+            except OSError:
+                return None
+        return root
+
+    def set(self, key, root):
+        # type: (Tuple, Tag) -> None
+        """Save the parsed template
+
+        The file is written to a temporary file first and then moved to
+        its place, so that other processes never see a partial file.
+
+        Args:
+            key: The key of the template
+            root: The root tag of the parsed template
+        """
+        tmpfile = None # type: Optional[str]
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmpfile = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fcache:
+                fcache.write(dumps((self.mtimes(root), root)))
+            os.replace(tmpfile, self.path(key))
+        except Exception as exc: # pylint: disable=broad-except
+            # the template is just not cached, i.e. in a read-only directory
+            logger.debug('Failed to cache template %s: %s', key[2], exc)
+            if tmpfile is not None and os.path.exists(tmpfile):
+                os.unlink(tmpfile)
+
+# pylint: disable=invalid-name
+template_cache = TemplateCache() # type: TemplateCache
+include_cache = TemplateCache() # type: TemplateCache
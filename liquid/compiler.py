@@ -0,0 +1,459 @@
+"""Compile the parsed templates into python functions
+
+The tag tree of a template is turned into the source code of a single
+python function, which is then compiled with `compile()`. Rendering the
+template runs the flat bytecode of the function, instead of walking the
+tree and dispatching the rendering to each tag.
+
+Tags without a handler in the compiler are rendered by their own
+`render` method from inside the compiled function.
+
+The template can also be compiled into a generator function, yielding the
+rendered pieces in order, for streaming.
+"""
+from contextlib import contextmanager
+from .config import LIQUID_LOG_INDENT
+from .utils import logger, Scope
+from .tags.transformer import render_segment
+from .tags.tag__literal import TagLITERAL
+from .tags.tag__output import TagOUTPUT
+from .tags.tag__root import TagROOT
+from .tags.tag_assign import TagAssign
+from .tags.tag_block import TagBlock
+from .tags.tag_break import TagBreak
+from .tags.tag_capture import TagCapture
+from .tags.tag_case import TagCase
+from .tags.tag_comment import TagComment
+from .tags.tag_continue import TagContinue
+from .tags.tag_else import TagElse
+from .tags.tag_elsif import TagElsif
+from .tags.tag_extends import TagExtends
+from .tags.tag_for import TagFor, ForLoop
+from .tags.tag_if import TagIf
+from .tags.tag_include import TagInclude
+from .tags.tag_raw import TagRaw
+from .tags.tag_unless import TagUnless
+from .tags.tag_when import TagWhen
+
+class Uncompilable(Exception):
+    """Raised when a tag cannot be compiled, so that its closest compiled
+    loop (or the whole template) is rendered by the tags instead"""
+
+class Compiler:
+    # pylint: disable=too-many-instance-attributes
+    """Compile a parsed template into a python function
+
+    The compiled function has the signature of
+    `render(local_vars, global_vars, write)`, where `write` is called with
+    the rendered pieces in order. With `generator` it is
+    `render(local_vars, global_vars)`, yielding the pieces instead.
+
+    Each tag is compiled in a `try` block the same way it is rendered in
+    `Tag.render`, so that errors are located and reported the same way.
+
+    Attributes:
+        HANDLERS: The methods to compile the tags, by the tag classes
+
+        root: The root tag of the template
+        namespace: The globals for the compiled function, holding the tags,
+            segments and other constants used by the function
+        lines: The lines of the source code
+        indent: The current indentation level
+        loops: The flags of break and continue of the loops being compiled
+        generator: Whether to compile the template into a generator function
+
+    Args:
+        root: The root tag of the template
+        generator: Whether to compile the template into a generator function
+    """
+    HANDLERS = {
+        TagROOT: '_compile_children',
+        TagLITERAL: '_compile_literal',
+        TagOUTPUT: '_compile_output',
+        TagAssign: '_compile_assign',
+        TagBlock: '_compile_block',
+        TagBreak: '_compile_break',
+        TagCapture: '_compile_capture',
+        TagCase: '_compile_case',
+        TagComment: '_compile_nothing',
+        TagContinue: '_compile_break',
+        TagElse: '_compile_children',
+        TagElsif: '_compile_if',
+        TagExtends: '_compile_extends',
+        TagFor: '_compile_for',
+        TagIf: '_compile_if',
+        TagInclude: '_compile_include',
+        TagRaw: '_compile_children',
+        TagUnless: '_compile_unless',
+        TagWhen: '_compile_when',
+    } # type: Dict[Type[Tag], str]
+
+    def __init__(self, root, generator=False):
+        # type: (TagROOT, bool) -> None
+        self.root = root
+        self.generator = generator
+        self.namespace = {'ForLoop': ForLoop,
+                          'Scope': Scope,
+                          'render_segment': render_segment}
+        self.lines = []     # type: List[str]
+        self.indent = 1     # type: int
+        self.loops = {}     # type: Dict[Tag, Tuple[str, str]]
+        self._cases = {}    # type: Dict[Tag, str]
+        self._counter = 0   # type: int
+
+    def compile(self):
+        # type: () -> Optional[Callable]
+        """Compile the template
+
+        Returns:
+            The compiled function, or None if the template cannot be
+            compiled
+        """
+        try:
+            self._compile_tag(self.root, 'local_vars', 'write')
+        except Uncompilable:
+            return None
+
+        if self.generator:
+            # make sure it is a generator function even nothing is yielded
+            self._emit('yield from ()')
+        source = '\n'.join(
+            [f'def render(local_vars, global_vars'
+             f'{"" if self.generator else ", write"}):'] +
+            (self.lines or ['    pass'])
+        )
+        logger.debug('%s- COMPILED %r:\n%s',
+                     self.root.context.level * LIQUID_LOG_INDENT,
+                     self.root.context.name,
+                     source)
+        code = compile(source, f'<liquid {self.root.context.path}>', 'exec')
+        exec(code, self.namespace) # pylint: disable=exec-used
+        return self.namespace['render']
+
+    def _name(self, prefix):
+        # type: (str) -> str
+        """Get a unique name for a variable in the compiled function"""
+        self._counter += 1
+        return f'{prefix}{self._counter}'
+
+    def _const(self, obj, prefix='c'):
+        # type: (Any, str) -> str
+        """Put an object into the namespace and get its name"""
+        name = self._name(prefix)
+        self.namespace[name] = obj
+        return name
+
+    def _emit(self, line):
+        # type: (str) -> None
+        """Add a line to the source code with current indentation"""
+        self.lines.append('    ' * self.indent + line)
+
+    def _write(self, write, value):
+        # type: (str, str) -> None
+        """Write a value, or yield it for the generator function"""
+        if self.generator and write == 'write':
+            self._emit(f'yield {value}')
+        else:
+            self._emit(f'{write}({value})')
+
+    def _call(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile a template (included or extended) into its own function
+        and call it, or render it by the root tag if it is uncompilable"""
+        render = self.__class__(tag, self.generator).compile()
+        if not render:
+            self._write(write, f'{self._const(tag, "tag")}.render('
+                               f'{local_vars}, global_vars)[0]')
+        elif not self.generator:
+            self._emit(f'{self._const(render, "render")}('
+                       f'{local_vars}, global_vars, {write})')
+        elif write == 'write':
+            self._emit(f'yield from {self._const(render, "render")}('
+                       f'{local_vars}, global_vars)')
+        else:
+            self._emit(f'{write}("".join({self._const(render, "render")}('
+                       f'{local_vars}, global_vars)))')
+
+    @contextmanager
+    def _block(self, line):
+        # type: (str) -> None
+        """Open an indented block with the line (i.e. `if ...:`)"""
+        self._emit(line)
+        self.indent += 1
+        nlines = len(self.lines)
+        try:
+            yield
+        finally:
+            if len(self.lines) == nlines:
+                self._emit('pass')
+            self.indent -= 1
+
+    @contextmanager
+    def _try(self, tag):
+        # type: (Tag) -> None
+        """Turn the errors into LiquidRenderError as `Tag.render` does"""
+        nlines = len(self.lines)
+        with self._block('try:'):
+            yield
+        if len(self.lines) == nlines + 2 and self.lines[-1].endswith('pass'):
+            del self.lines[-2:]
+            return
+        with self._block('except Exception as exc:'):
+            self._emit(f'raise {self._const(tag, "tag")}'
+                       '._render_error(exc) from None')
+
+    def _compile_tag(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile a tag with the given names of the local variables and
+        the writer in the compiled function"""
+        handler = self.HANDLERS.get(type(tag))
+        if not handler or (tag.PARSER and tag.parsed is None):
+            # no handler or the parsing is held (i.e. inside a block)
+            self._compile_fallback(tag, local_vars, write)
+        else:
+            getattr(self, handler)(tag, local_vars, write)
+
+    def _compile_fallback(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Render the tag by itself"""
+        for loop_control in _loop_controls(tag):
+            if loop_control.closest_parent in self.loops:
+                # the flags of the compiled loops are invisible to the tag
+                raise Uncompilable(loop_control)
+        self._write(write, f'{self._const(tag, "tag")}.render('
+                           f'{local_vars}, global_vars, True)[0]')
+
+    def _compile_nothing(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Nothing rendered for the tag (i.e. comment)"""
+
+    def _compile_children(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the children of the tag"""
+        for child in tag.children:
+            # rendered by their elders
+            if child.prev:
+                continue
+            self._compile_tag(child, local_vars, write)
+
+    def _compile_literal(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        # pylint: disable=unused-argument
+        """The content, with the whitespaces controlled, is written as is"""
+        content = tag._render(None, None) # pylint: disable=protected-access
+        if content:
+            self._write(write, repr(content))
+
+    def _compile_output(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Render the output segment and write it if it is not None"""
+        value = self._name('value')
+        with self._try(tag):
+            self._emit(f'{value} = {self._const(tag.parsed, "seg")}.render('
+                       f'{local_vars}, global_vars)')
+            with self._block(f'if {value} is not None:'):
+                self._write(write, f'str({value})')
+
+    def _compile_assign(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        # pylint: disable=unused-argument
+        """Assign the rendered output to both local and global variables"""
+        varname, output = tag.parsed
+        with self._try(tag):
+            self._emit(f'{local_vars}[{varname!r}] = '
+                       f'global_vars[{varname!r}] = '
+                       f'{self._const(output, "seg")}.render('
+                       f'{local_vars}, global_vars)')
+
+    def _compile_block(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the children of the block"""
+        with self._try(tag):
+            self._compile_children(tag, local_vars, write)
+
+    def _compile_capture(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        # pylint: disable=unused-argument
+        """Render the children into a buffer and assign it"""
+        varname = str(tag.parsed)
+        buffer = self._name('buffer')
+        with self._try(tag):
+            self._emit(f'{buffer} = []')
+            self._compile_children(tag, local_vars, f'{buffer}.append')
+            self._emit(f'{local_vars}[{varname!r}] = '
+                       f'global_vars[{varname!r}] = "".join({buffer})')
+
+    def _compile_if(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the if/elsif tags with their younger siblings"""
+        with self._try(tag):
+            with self._block(f'if {self._const(tag, "tag")}._render_expr('
+                             f'{local_vars}, global_vars):'):
+                self._compile_children(tag, local_vars, write)
+            if tag.next:
+                with self._block('else:'):
+                    self._compile_tag(tag.next, local_vars, write)
+
+    def _compile_unless(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the unless tag"""
+        with self._try(tag):
+            with self._block(f'if not {self._const(tag, "tag")}._render_expr('
+                             f'{local_vars}, global_vars):'):
+                self._compile_children(tag, local_vars, write)
+
+    def _compile_case(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the case tag, the when tags will be compared with
+        the value here"""
+        if not any(child.name == 'when' for child in tag.children):
+            # let it raise the error while rendering
+            self._compile_fallback(tag, local_vars, write)
+            return
+
+        self._cases[tag] = self._name('case')
+        with self._try(tag):
+            self._emit(f'{self._cases[tag]} = '
+                       f'{self._const(tag.parsed, "seg")}.render('
+                       f'{local_vars}, global_vars)')
+            for child in tag.children:
+                if child.prev:
+                    continue
+                self._compile_tag(child, local_vars, write)
+                if child.name == 'when':
+                    break
+
+    def _compile_when(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the when tag with its younger siblings"""
+        with self._try(tag):
+            with self._block(f'if {self._const(tag.parsed, "seg")}.render('
+                             f'{local_vars}, global_vars) == '
+                             f'{self._cases[tag.closest_parent]}:'):
+                self._compile_children(tag, local_vars, write)
+            if tag.next:
+                with self._block('else:'):
+                    self._compile_tag(tag.next, local_vars, write)
+
+    def _compile_for(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the for tag, falling back to the tag itself if its
+        break/continue tags cannot be compiled"""
+        nlines = len(self.lines)
+        indent = self.indent
+        try:
+            self._compile_loop(tag, local_vars, write)
+        except Uncompilable:
+            del self.lines[nlines:]
+            self.indent = indent
+            self._compile_fallback(tag, local_vars, write)
+
+    def _compile_loop(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the loop of the for tag"""
+        items = self._name('items')
+        forloop = self._name('forloop')
+        local_vars_inside = self._name('local_vars')
+        self.loops[tag] = (self._name('flag_break'),
+                           self._name('flag_continue'))
+        flag_break, flag_continue = self.loops[tag]
+        varname = tag.parsed[0]
+        try:
+            with self._try(tag):
+                self._emit(f'{items} = {self._const(tag, "tag")}._iterable('
+                           f'{local_vars}, global_vars)')
+                self._emit(f'{local_vars_inside} = Scope({local_vars}, {{}})')
+                self._emit(f'{flag_break} = {flag_continue} = False')
+                target = f'{local_vars_inside}[{varname!r}] in {items}'
+                if tag.uses_forloop:
+                    self._emit(f"{forloop} = {local_vars_inside}['forloop'] "
+                               f'= ForLoop(len({items}))')
+                    target = (f'{forloop}.index0, {local_vars_inside}'
+                              f'[{varname!r}] in enumerate({items})')
+                with self._block(f'for {target}:'):
+                    self._compile_loop_body(tag, local_vars_inside, write)
+                if tag.next:
+                    with self._block(f'if not {items}:'):
+                        self._compile_tag(tag.next, local_vars, write)
+        finally:
+            del self.loops[tag]
+
+    def _compile_loop_body(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the children of a loop, checking the flags of break and
+        continue after the children that might set them"""
+        flag_break, flag_continue = self.loops[tag]
+        for child in tag.children:
+            if child.prev:
+                continue
+            self._compile_tag(child, local_vars, write)
+            controls = set(loop_control.name
+                           for loop_control in _loop_controls(child)
+                           if loop_control.closest_parent is tag)
+            if 'break' in controls:
+                with self._block(f'if {flag_break}:'):
+                    self._emit('break')
+            if 'continue' in controls:
+                with self._block(f'if {flag_continue}:'):
+                    self._emit(f'{flag_continue} = False')
+                    self._emit('continue')
+
+    def _compile_break(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        # pylint: disable=unused-argument
+        """Set the flags of the loop for break/continue tags"""
+        loop = tag.closest_parent
+        if loop not in self.loops:
+            raise Uncompilable(tag)
+        flag_break, flag_continue = self.loops[loop]
+        self._emit(f'{flag_break if tag.name == "break" else flag_continue}'
+                   ' = True')
+
+    def _compile_include(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the included template into its own function, or into
+        this one if it is inlined. The ones with the paths evaluated when
+        rendering are rendered by the tag"""
+        if tag.dynamic:
+            # resolved when rendering
+            self._compile_fallback(tag, local_vars, write)
+            return
+
+        inc_parser, items = tag.parsed
+        local_vars_inc = self._name('local_vars')
+        items = ', '.join(
+            f'{varname!r}: render_segment({self._const(value, "seg")}, '
+            f'{local_vars}, global_vars)'
+            for varname, value in items
+        )
+        if tag.inlined is not None:
+            with self._try(tag):
+                self._emit(f"{local_vars_inc} = Scope({local_vars}, "
+                           f"{{'include': {{{items}}}}})")
+                self._compile_children(inc_parser.visitor.root,
+                                       local_vars_inc,
+                                       write)
+            return
+
+        with self._try(tag):
+            self._emit(f"{local_vars_inc} = Scope({local_vars}, "
+                       f"{{'include': {{{items}}}}})")
+            self._call(inc_parser.visitor.root, local_vars_inc, write)
+
+    def _compile_extends(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        """Compile the flattened tree of the mother template into its own
+        function"""
+        with self._try(tag):
+            self._call(tag.flattened, local_vars, write)
+
+def _loop_controls(tag):
+    # type: (Tag) -> Iterator[Tag]
+    """Find the break/continue tags inside a tag and its younger siblings"""
+    while tag:
+        if tag.name in ('break', 'continue'):
+            yield tag
+        for child in tag.children:
+            if not child.prev:
+                yield from _loop_controls(child)
+        tag = tag.next
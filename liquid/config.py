@@ -4,11 +4,29 @@ Attributes:
     LIQUID_LOGGER_NAME: The name of the logger
     LIQUID_LOG_INDENT: Indentions to show the tree structure in logging
     LIQUID_FILTERS_ENVNAME: The variable containing all filters
+    LIQUID_FRAME_ENVNAME: The variable containing the render frame, which
+        holds the states of the tags for one render
     LIQUID_EXC_MAX_STACKS: The stacks to show in exceptions when debug is on
     LIQUID_EXC_CODE_CONTEXT: The number of context lines to show codes in
         exceptions when debug is on
+    LIQUID_CACHE_SIZE: The max number of templates to keep in the
+        in-memory cache
+    LIQUID_STREAM_CHUNK_SIZE: The min size of the chunks yielded by
+        `Liquid.render_iter`
+    LIQUID_BATCH_CHUNK_SIZE: The number of the contexts sent to a worker
+        process at a time by `Liquid.render_many`
+    LIQUID_PATH_CACHE_TTL: The seconds before the memoized paths of the
+        templates and the listings of the directories are checked again.
+        It can be changed by environment variable `LIQUID_PATH_CACHE_TTL`,
+        `0` to check them at each lookup, `inf` to never check them.
+    LIQUID_PARSER_CACHE_DIR: The directory to save the LALR tables of the
+        tag parsers, so that they are not generated at each import.
+        It can be changed by environment variable `LIQUID_PARSER_CACHE_DIR`,
+        and an empty value disables it. If not set, it is resolved when
+        the tables are first saved, see `utils.parser_cache_file`.
     DEFAULT_CONFIG: The default configuration
 """
+import os
 import logging
 from diot import Diot
 
@@ -17,16 +35,30 @@ from diot import Diot
 LIQUID_LOGGER_NAME = 'LIQUID'                  # type: str
 LIQUID_LOG_INDENT = '  '                       # type: str
 LIQUID_FILTERS_ENVNAME = '__LIQUID_FILTERS__'  # type: str
+LIQUID_FRAME_ENVNAME = '__LIQUID_FRAME__'      # type: str
 LIQUID_EXC_MAX_STACKS = 5                      # type: int
 LIQUID_EXC_CODE_CONTEXT = 3                    # type: int
+LIQUID_CACHE_SIZE = 512                        # type: int
+LIQUID_STREAM_CHUNK_SIZE = 8192               # type: int
+LIQUID_BATCH_CHUNK_SIZE = 256                  # type: int
+LIQUID_PATH_CACHE_TTL = float(
+    os.environ.get('LIQUID_PATH_CACHE_TTL', 1.0)
+)                                              # type: float
+LIQUID_PARSER_CACHE_DIR = os.environ.get(
+    'LIQUID_PARSER_CACHE_DIR'
+)                                              # type: Optional[str]
 
 DEFAULT_CONFIG = Diot(
     mode='standard',
     strict=True,
     debug=False,
     cache=False,
+    compile=False,
     extends_dir=[],
-    include_dir=[]
+    include_dir=[],
+    inline_include=False,
+    fold_constants=True,
+    specialize=False
 ) # type: Diot
 
 class Config(Diot):
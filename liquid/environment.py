@@ -0,0 +1,248 @@
+"""The Environment owning the configuration, the filters, the tags and the
+loaders, with the registry of the parsed templates"""
+from threading import RLock
+from collections import ChainMap
+from .config import Config
+from .cache import TemplateCache
+from .utils import Context, template_meta
+from .loaders import Loader, FileSystemLoader, ChoiceLoader
+
+class Environment:
+    """The environment to load and parse the templates
+
+    The templates included are resolved by the loader and parsed only once
+    for each resolved path, so that a template included by many others is
+    kept in memory once. The templates extended are resolved by the loader
+    as well, but parsed for each template extending them, since their
+    blocks are replaced by the ones of that template.
+
+    Examples:
+        >>> env = Environment({'mode': 'python'},
+        >>>                   loader=FileSystemLoader('./templates'))
+        >>> liq = env.get_template('page.liquid')
+        >>> liq.render(a=1)
+
+    Attributes:
+        config: The configuration
+        loader: The loader to find the templates
+
+    Args:
+        config: The configuration
+        loader: The loader to find the templates, or a list of them to try
+            in order. Defaults to a `FileSystemLoader` looking up the
+            directories from the configuration and the directory of the
+            template referring to the one to load
+        filters: The extra filters for this environment, which override the
+            ones from the filter manager of the mode
+    """
+
+    def __init__(self, config=None, loader=None, filters=None):
+        # type: (Optional[Dict[str, Any]], Any, Optional[Dict[str, Callable]])
+        #   -> None
+        self.config = config if isinstance(config, Config) else Config(
+            config or {}
+        )
+        if loader is None:
+            loader = FileSystemLoader()
+        elif not isinstance(loader, Loader):
+            loader = ChoiceLoader(loader)
+        self.loader = loader # type: Loader
+        self._filters = filters
+        self._registry = {} # type: Dict[Tuple, Parser]
+        self._lock = RLock()
+
+    @property
+    def liquid_class(self):
+        # type: () -> Type[Liquid]
+        """The Liquid class for the mode"""
+        from .liquid import Liquid, LiquidPython
+        return LiquidPython if self.config.mode == 'python' else Liquid
+
+    @property
+    def filters(self):
+        # type: () -> Mapping[str, Callable]
+        """The filters, with the ones of this environment first"""
+        return self.get_filters(self.liquid_class.FILTER_MANAGER)
+
+    def get_filters(self, filter_manager):
+        # type: (FilterManager) -> Mapping[str, Callable]
+        """Get the filters of a filter manager, with the ones of this
+        environment first
+
+        Args:
+            filter_manager: The filter manager
+
+        Returns:
+            The filters
+        """
+        if not self._filters:
+            return filter_manager.filters
+        return ChainMap(self._filters, filter_manager.filters)
+
+    @property
+    def tags(self):
+        # type: () -> TagManager
+        """The tag manager for the mode"""
+        if self.config.mode == 'python':
+            from .python.tags import tag_manager
+        else:
+            from .tags import tag_manager
+        return tag_manager
+
+    def find(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        """Find a template by the loader
+
+        Args:
+            name: The name of the template
+            curr_path: The path of the template that refers to it
+            dirs: The extra directories to look up
+
+        Returns:
+            The metadata of the template or None if not found
+        """
+        return self.loader.load(name, curr_path, dirs)
+
+    def parse(self, # pylint: disable=too-many-arguments
+              meta,
+              parser_class,
+              config=None,
+              level=0,
+              parent=None):
+        # type: (TemplateMeta, Type[Parser], Optional[Config], int,
+        #        Optional[Parser]) -> Parser
+        """Parse a template into a new parser
+
+        Args:
+            meta: The metadata of the template
+            parser_class: The class of the parser
+            config: The configuration, defaults to the one of the
+                environment
+            level: The level of the parser, used to indent the logs
+            parent: The parent parser, used to show the stacks in the
+                exceptions
+
+        Returns:
+            The parser with the template parsed
+        """
+        parser = parser_class(
+            meta,
+            config or self.config,
+            Context(name=meta.name,
+                    path=meta.path,
+                    stream=meta.stream,
+                    lineno=0,
+                    colno=0,
+                    level=level),
+            env=self
+        )
+        try:
+            parser.parse()
+        finally:
+            # the stream is reopened by its name if needed by the exceptions
+            if meta.should_close:
+                meta.stream.close()
+        parser.parent = parent
+        return parser
+
+    def shared(self, # pylint: disable=too-many-arguments
+               meta,
+               parser_class,
+               config=None,
+               level=0,
+               parent=None):
+        # type: (TemplateMeta, Type[Parser], Optional[Config], int,
+        #        Optional[Parser]) -> Parser
+        """Get the parser of a template from the registry, parsing it on
+        the first time
+
+        See `parse` for the arguments.
+
+        Returns:
+            The parser shared by all the templates referring to the same path
+            with the same configuration
+        """
+        key = (parser_class,
+               meta.path,
+               TemplateCache.config_key(config or self.config))
+        with self._lock:
+            try:
+                parser = self._registry[key]
+            except KeyError:
+                parser = self._registry[key] = self.parse(
+                    meta, parser_class, config, level, parent
+                )
+                return parser
+
+        if meta.should_close:
+            meta.stream.close()
+        return parser
+
+    def clear(self):
+        # type: () -> None
+        """Remove all the parsed templates from the registry, so that they
+        are loaded and parsed again"""
+        with self._lock:
+            self._registry.clear()
+
+    def get_template(self, name, **envs):
+        # type: (str, Any) -> Liquid
+        """Get a Liquid object for a template found by the loader
+
+        The parsed template is shared with the ones including it.
+
+        Args:
+            name: The name of the template
+            **envs: Other environment variables for template rendering
+
+        Returns:
+            The Liquid object
+
+        Raises:
+            OSError: When the template cannot be found
+        """
+        meta = self.find(name)
+        if meta is None:
+            raise OSError(f'Cannot find template: {name!r}')
+        liquid_class = self.liquid_class
+        liq = liquid_class.__new__(liquid_class, meta)
+        # pylint: disable=protected-access
+        liq._init(meta, self, envs, shared=True)
+        return liq
+
+    def from_string(self, source, **envs):
+        # type: (Union[str, IO], Any) -> Liquid
+        """Get a Liquid object for a template from a string or a stream,
+        resolving the templates it includes or extends by the loader
+
+        Args:
+            source: The source of the template, or a stream of it
+            **envs: Other environment variables for template rendering
+
+        Returns:
+            The Liquid object
+        """
+        meta = template_meta(source)
+        liquid_class = self.liquid_class
+        liq = liquid_class.__new__(liquid_class, meta)
+        liq._init(meta, self, envs) # pylint: disable=protected-access
+        return liq
+
+    def __getstate__(self):
+        # type: () -> Dict[str, Any]
+        """The registry is not pickled, the templates are parsed again
+        when needed"""
+        return {'config': self.config,
+                'loader': self.loader,
+                '_filters': self._filters}
+
+    def __setstate__(self, state):
+        # type: (Dict[str, Any]) -> None
+        self.__dict__.update(state)
+        self._registry = {}
+        self._lock = RLock()
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__}(mode={self.config.mode!r}, '
+                f'loader={self.loader!r})>')
@@ -21,7 +21,7 @@ class LiquidSyntaxError(LiquidException):
         parser: The parser
     """
     def __init__(self, msg, context=None, parser=None):
-        # type: (str, Diot, Parser) -> None
+        # type: (str, Context, Parser) -> None
         from .utils import excmsg_with_context
         super().__init__(excmsg_with_context(msg, context, parser))
 
@@ -34,6 +34,6 @@ class LiquidRenderError(LiquidException):
         parser: The parser
     """
     def __init__(self, msg, context=None, parser=None):
-        # type: (str, Diot, Parser) -> None
+        # type: (str, Context, Parser) -> None
         from .utils import excmsg_with_context
         super().__init__(excmsg_with_context(msg, context, parser))
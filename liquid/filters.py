@@ -14,13 +14,19 @@ class FilterManager(Singleton):
     Attributes:
         INSTANCE: The instance of the class, since it's a signleton
         filters: The filters database
+        pure: The names of the pure filters, which give the same result for
+            the same arguments without side effects, so that they are
+            evaluated once at parse time when all their arguments are
+            constants
     """
 
     INSTANCE = None     # type: FilterManager
     filters = {}        # type: Dict[str, Callable]
+    pure = set()        # type: Set[str]
 
-    def register(self, name_or_filter=None, mode='standard'):
-        # type: (Optional[Union[str, Callable]], bool) -> Optional[Callable]
+    def register(self, name_or_filter=None, mode='standard', pure=False):
+        # type: (Optional[Union[str, Callable]], str, bool)
+        #   -> Optional[Callable]
         """Register a filter
 
         This can be used as a decorator
@@ -32,10 +38,15 @@ class FilterManager(Singleton):
         >>> def add(a, b):
         >>>   return a+b
 
+        The filters can be `async def`, to be used with
+        `Liquid.render_async`.
+
         Args:
             name_or_filter: The filter to register
                 if name is given, will be treated as alias
             mode: Whether do it for given mode
+            pure: Whether the filter is pure, so that it can be evaluated
+                at parse time with constant arguments
 
         Returns:
             The registered function or the decorator
@@ -45,7 +56,7 @@ class FilterManager(Singleton):
         #     return filtermgr.register(name_or_filter)
         if mode == 'python':
             from .python.filters import filter_manager as filtermgr
-            return filtermgr.register(name_or_filter)
+            return filtermgr.register(name_or_filter, pure=pure)
 
         def decorator(filterfunc):
             name = filterfunc.__name__
@@ -58,6 +69,10 @@ class FilterManager(Singleton):
                 name = names
             for nam in name:
                 self.__class__.filters[nam] = filterfunc
+                if pure:
+                    self.__class__.pure.add(nam)
+                else:
+                    self.__class__.pure.discard(nam)
 
             return filterfunc
 
@@ -84,6 +99,7 @@ class FilterManager(Singleton):
             from .python.filters import filter_manager as filtermgr
             return filtermgr.unregister(name)
 
+        self.__class__.pure.discard(name)
         try:
             return self.__class__.filters.pop(name)
         except KeyError:
@@ -365,3 +381,8 @@ def compact(base):
     """Remove empties from a list"""
     ret = [bas for bas in base if bas]
     return ret or EmptyDrop()
+
+# All the builtin filters are pure, except date, which gives the current
+# time for "now" and "today"
+filter_manager.pure.update(name for name in filter_manager.filters
+                           if name != 'date')
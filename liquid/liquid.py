@@ -1,12 +1,109 @@
-"""Provides Liquid, LiquidPython and LiquidJekyll classes"""
-from .config import Config, LIQUID_FILTERS_ENVNAME
-from .utils import template_meta, check_name
+"""Provides Liquid, LiquidPython and LiquidJekyll classes, and warmup()"""
+import time
+import pickle
+from io import StringIO
+from itertools import islice
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .config import (LIQUID_FILTERS_ENVNAME,
+                     LIQUID_FRAME_ENVNAME,
+                     LIQUID_STREAM_CHUNK_SIZE,
+                     LIQUID_BATCH_CHUNK_SIZE)
+from .utils import template_meta, check_name, logger, RenderFrame
+from .exceptions import LiquidNameError
+from .cache import template_cache, dependencies, DiskCache, dumps
 from .parser import Parser
+from .environment import Environment
+from .compiler import Compiler
+from .analyzer import Analyzer
 from .filters import filter_manager, EmptyDrop
+from .tags import tag_manager
 # from .jekyll.parser import Parser as ParserJekyll
 # from .jekyll.filters import filter_manager as filter_manager_jekyll
 from .python.parser import Parser as ParserPython
+from .python.compiler import Compiler as CompilerPython
+from .python.analyzer import Analyzer as AnalyzerPython
 from .python.filters import filter_manager as filter_manager_python
+from .python.tags import tag_manager as tag_manager_python
+
+class BatchStats(namedtuple('BatchStats', ['records', 'seconds'])):
+    """The statistics of a batch rendered by `Liquid.render_many`
+
+    Attributes:
+        records: The number of the contexts rendered
+        seconds: The time spent in seconds, including the time to consume
+            the results
+    """
+    __slots__ = ()
+
+    @property
+    def records_per_second(self):
+        # type: () -> float
+        """The throughput"""
+        return self.records / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return (f'{self.records} records in {self.seconds:.3f}s '
+                f'({self.records_per_second:.0f} records/s)')
+
+def _map_pool(executor, workers, func, iterable):
+    # type: (Executor, int, Callable, Iterable) -> Iterator[Any]
+    """Map the function over the iterable in a pool, in order
+
+    Unlike `Executor.map()`, the iterable is not consumed at once, only a
+    few items for each worker are submitted ahead.
+    """
+    with executor:
+        pending = deque()
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _chunks(iterable, size):
+    # type: (Iterable, int) -> Iterator[List]
+    """Split the iterable into lists with the given size"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _load_liquid(liquid_class, state):
+    # type: (Type[Liquid], bytes) -> Liquid
+    """Load a pickled Liquid object, see `Liquid.__reduce__`"""
+    liq = object.__new__(liquid_class)
+    liq.__dict__.update(pickle.loads(state))
+    liq.config.update_logger()
+    liq.compiled = liq._compile(liq.parsed) # pylint: disable=protected-access
+    return liq
+
+def _raise_specialized(specialized, context):
+    # type: (FrozenSet[str], Dict[str, Any]) -> None
+    """Raise the error for the variables specialized that are given again
+    to render the template, see `Liquid._specialize`"""
+    raise LiquidNameError('Variables specialized cannot be overridden: '
+                          f'{sorted(specialized.intersection(context))!r}')
+
+# The Liquid object and the function to make the contexts in the worker
+# processes of `Liquid.render_many`
+_WORKER = None # type: Optional[Tuple[Liquid, Callable]]
+
+def _init_worker(liq):
+    # type: (Liquid) -> None
+    """Keep the Liquid object shipped to a worker process"""
+    global _WORKER # pylint: disable=global-statement
+    _WORKER = liq, liq._context_maker() # pylint: disable=protected-access
+
+def _render_chunk(contexts):
+    # type: (List[Dict[str, Any]]) -> List[str]
+    """Render a chunk of the contexts in a worker process"""
+    liq, make_contexts = _WORKER
+    # pylint: disable=protected-access
+    return [liq._render(*make_contexts(context)) for context in contexts]
 
 class Liquid:
     """The main class for external use
@@ -23,6 +120,8 @@ class Liquid:
 
     Attributes:
         PARSER_CLASS: The root parser class
+        COMPILER_CLASS: The compiler class
+        ANALYZER_CLASS: The analyzer class
         FILTER_MANAGER: The filter manager
 
     Args:
@@ -35,6 +134,8 @@ class Liquid:
         **envs: Other environment variables for template rendering.
     """
     PARSER_CLASS = Parser
+    COMPILER_CLASS = Compiler
+    ANALYZER_CLASS = Analyzer
     FILTER_MANAGER = filter_manager
 
     # pylint: disable=unused-argument
@@ -59,25 +160,152 @@ class Liquid:
         # since __new__ returns an object anyway is a Liquid object
         # we will need to pass handling to LiquidPython itself
 
+        self._init(template_meta(liquid_template),
+                   Environment(liquid_config),
+                   envs)
+
+    def _init(self, meta, env, envs, shared=False):
+        # type: (TemplateMeta, Environment, Dict[str, Any], bool) -> None
+        """Initialize the object, see `Environment.get_template` for shared
+
+        Args:
+            meta: The template meta data
+            env: The environment to resolve the templates included or
+                extended, with the configuration and the filters
+            envs: Other environment variables for template rendering
+            shared: Whether the parsed template is shared by the ones
+                including it in the environment
+        """
         check_name(envs)
         self.envs = envs
-        self.config = Config(liquid_config or {})
+        self.env = env
+        self.config = env.config
         self.config.update_logger()
-        self.meta = template_meta(liquid_template)
-        self.parsed = self._from_cache(liquid_template)
+        self.meta = meta
+        if shared:
+            parsed = env.shared(meta, self.PARSER_CLASS).visitor.root
+            self.parsed, self.compiled = parsed, self._compile(parsed)
+        else:
+            self.parsed, self.compiled = self._from_cache()
+        # the names of the variables the template is specialized against
+        self._specialized = self._specialize() # type: FrozenSet[str]
+        # the generator function for streaming, compiled on first use
+        self._compiled_iter = None # type: Optional[Callable]
+        # the statistics of the last batch by render_many()
+        self.batch_stats = None # type: Optional[BatchStats]
+        # the references of the template, analyzed on first use
+        self._analysis = None # type: Optional[Analysis]
 
-    # pylint: disable=unused-argument
-    def _from_cache(self, liquid_template):
-        #  (Union[str, Path, IO]) -> Type[Parser]
-        """Try to the parsed object from the cache
+    def _from_cache(self):
+        # type: () -> Tuple[Tag, Optional[Callable]]
+        """Try to get the parsed and compiled template from the cache
+
+        When config.cache is False, don't cache
+        When True, cache it in memory (`template_cache`), keyed by the
+        source, the path of the template and the configuration. The entry
+        is removed by `template_cache.invalidate()` with the path of the
+        template or any of the templates it includes or extends.
+        Otherwise a directory should be specified, the parsed templates are
+        also pickled there, so that they are shared between processes and
+        runs. They are invalidated once the template, or any of the
+        templates it includes or extends, is modified.
 
-        // Todo: When config.cache is False, don't cache
-        When True, try to cache it in memory, otherwise a directory should
-        be specified, objects are cached there
+        Returns:
+            The root tag of the parsed template and the compiled function
+            if `config.compile` is True
         """
-        parsed = self.PARSER_CLASS(self.meta, self.config).parse()
-        return parsed
-    # pylint: enable=unused-argument
+        if not self.config.cache:
+            return self._parse(self.meta)
+
+        source = self.meta.stream.read()
+        key = template_cache.key(self.__class__,
+                                 source,
+                                 self.meta,
+                                 self.config,
+                                 self.env)
+        cached = template_cache.get(key)
+        if cached is not None:
+            return cached
+
+        disk_cache = (DiskCache(self.config.cache)
+                      if self.config.cache is not True
+                      else None) # type: Optional[DiskCache]
+        parsed = disk_cache.get(key) if disk_cache else None
+        if parsed is None:
+            # the cached template is shared by the Liquid objects, it should
+            # not rely on the stream that is closed with this object
+            parsed = self.PARSER_CLASS(
+                self.meta._replace(stream=StringIO(source),
+                                   should_close=False),
+                self.config,
+                env=self.env
+            ).parse()
+            if disk_cache:
+                disk_cache.set(key, parsed)
+        # compiled functions cannot be pickled, compile them anyway
+        cached = parsed, self._compile(parsed)
+        template_cache.set(key, cached, dependencies(parsed))
+        return cached
+
+    def _parse(self, meta):
+        # type: (TemplateMeta) -> Tuple[Tag, Optional[Callable]]
+        """Parse and compile (if `config.compile` is True) the template
+
+        Args:
+            meta: The template meta data
+
+        Returns:
+            The root tag of the parsed template and the compiled function
+        """
+        parsed = self.PARSER_CLASS(meta, self.config, env=self.env).parse()
+        return parsed, self._compile(parsed)
+
+    def _specialize(self):
+        # type: () -> FrozenSet[str]
+        """Specialize the parsed template against the envs if
+        `config.specialize` is True, see `Optimizer.specialize`
+
+        The parsed template, which might be shared, is not modified, the
+        specialized copy is compiled again instead.
+
+        Returns:
+            The names of the variables the template is specialized against
+        """
+        if not self.config.specialize or not self.envs or self.config.debug:
+            return frozenset()
+        optimizer = self.PARSER_CLASS.OPTIMIZER_CLASS(self.parsed.parser)
+        parsed = optimizer.specialize(self.parsed, self.envs)
+        if parsed is self.parsed:
+            return frozenset()
+        self.parsed, self.compiled = parsed, self._compile(parsed)
+        return frozenset(optimizer.constants)
+
+    def _compile(self, parsed):
+        # type: (Tag) -> Optional[Callable]
+        """Compile the parsed template if `config.compile` is True
+
+        Args:
+            parsed: The root tag of the parsed template
+
+        Returns:
+            The compiled function or None
+        """
+        if not self.config.compile:
+            return None
+        return self.COMPILER_CLASS(parsed).compile()
+
+    def __reduce__(self):
+        # type: () -> Tuple[Callable, Tuple[Type[Liquid], bytes]]
+        """Pickle the Liquid object with the parsed template
+
+        The streams of the templates are pickled as their values or names,
+        and the compiled functions are compiled again when loaded.
+        """
+        state = self.__dict__.copy()
+        state['meta'] = self.meta._replace(should_close=False)
+        state['compiled'] = state['_compiled_iter'] = None
+        state['batch_stats'] = None
+        return _load_liquid, (self.__class__, dumps(state))
 
     def __del__(self):
         try:
@@ -86,23 +314,76 @@ class Liquid:
         except AttributeError: # pragma: no cover
             pass
 
-    def _update_context(self, context):
-        # type: (Dict[str, Any]) -> Dict[str, Any]
-        """Update the given context based on pre-set envs"""
-        check_name(context)
-        envs = self.envs.copy() # type: Dict[str, Any]
-        envs.update(context)
-        return envs
+    def _contexts(self, context):
+        # type: (Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]
+        """Get the local and global variables to render the template with
+
+        Args:
+            context: The context given to render the template
+
+        Returns:
+            The local and global variables
+        """
+        return self._context_maker()(context)
+
+    def _context_maker(self):
+        # type: () -> Callable[[Dict[str, Any]], Tuple[dict, dict]]
+        """Get a function to make the local and global variables from
+        the contexts, with the fixed part prepared only once
+
+        Returns:
+            The function, see `_contexts`
+        """
+        envs = self.envs
+        specialized = self._specialized
+        fixed = {LIQUID_FILTERS_ENVNAME: self.env.get_filters(
+            self.FILTER_MANAGER
+        ),
+                 # liquid's EmptyDrop object
+                 'empty': EmptyDrop()}
+
+        def contexts(context):
+            check_name(context)
+            if specialized and not specialized.isdisjoint(context):
+                _raise_specialized(specialized, context)
+            local_context = envs.copy()
+            local_context.update(context)
+            global_context = local_context.copy()
+            global_context.update(fixed)
+            global_context[LIQUID_FRAME_ENVNAME] = RenderFrame()
+            return local_context, global_context
+
+        return contexts
 
     def _render(self, local_vars: dict, global_vars: dict) -> str:
         # render and return
         try:
+            if self.compiled:
+                rendered = []
+                self.compiled(local_vars, global_vars, rendered.append)
+                return ''.join(rendered)
             return self.parsed.render(local_vars, global_vars)[0]
         finally:
             # debug mode needs stream to print stack details
             if self.meta.should_close:
                 self.meta.stream.close()
 
+    def _render_iter(self, local_vars, global_vars):
+        # type: (dict, dict) -> Iterator[str]
+        """Render the template piece by piece"""
+        if self._compiled_iter is None:
+            self._compiled_iter = self.COMPILER_CLASS(
+                self.parsed, generator=True
+            ).compile() or False
+        try:
+            if self._compiled_iter:
+                yield from self._compiled_iter(local_vars, global_vars)
+            else:
+                yield self.parsed.render(local_vars, global_vars)[0]
+        finally:
+            if self.meta.should_close:
+                self.meta.stream.close()
+
     def render(self, **context):
         # type: (Any) -> str
         """Render the template with given context
@@ -114,14 +395,175 @@ class Liquid:
         Returns:
             The rendered content
         """
-        context = self._update_context(context)
-        global_context = context.copy()
-        global_context[
-            LIQUID_FILTERS_ENVNAME
-        ] = self.FILTER_MANAGER.filters
-        # liquid's EmptyDrop object
-        global_context['empty'] = EmptyDrop()
-        return self._render(context, global_context)
+        return self._render(*self._contexts(context))
+
+    async def render_async(self, **context):
+        # type: (Any) -> str
+        """Render the template with given context in an asyncio event loop
+
+        The values of the variables, the attributes, the items, the
+        function calls (python mode) and the results of the filters (which
+        can be `async def`) that are awaitable are awaited where they are
+        used, so that the ones the template does not use are never
+        awaited.
+
+        The tags are rendered by coroutines in the loop (see
+        `Tag.render_to_async`) instead of the compiled function, so the
+        renders running at the same time are only limited by the loop.
+        The bodies of the lambdas (python mode) are called synchronously,
+        so the awaitable values in them are left as they are.
+
+        Args:
+            context: The context used to render the template
+
+        Returns:
+            The rendered content, the same as `render` with the awaitables
+            resolved
+        """
+        local_vars, global_vars = self._contexts(context)
+        rendered = []
+        try:
+            await self.parsed.render_to_async(rendered.append,
+                                              local_vars,
+                                              global_vars)
+        finally:
+            if self.meta.should_close:
+                self.meta.stream.close()
+        return ''.join(rendered)
+
+    def render_many(self, contexts, workers=None, processes=None):
+        # type: (Iterable[Dict], Optional[int], Optional[int]) -> Iterator[str]
+        """Render the template with each of the contexts
+
+        The variables that do not change between the renders (the envs,
+        the filters, etc) are prepared only once. When all the contexts
+        are rendered, the throughput is kept in `batch_stats` and logged.
+
+        Examples:
+            >>> liq = Liquid('Dear {{name}},')
+            >>> list(liq.render_many([{'name': 'Ann'}, {'name': 'Bob'}]))
+            >>> # ['Dear Ann,', 'Dear Bob,']
+            >>> liq.batch_stats # BatchStats(records=2, seconds=...)
+
+        Args:
+            contexts: The contexts used to render the template. It can be
+                a lazy iterable, which is consumed as the results are
+                consumed.
+            workers: The number of threads to render the template with.
+                If not given, render them in the current thread.
+            processes: The number of processes to render the template with.
+                The template is pickled and shipped to each process once,
+                and then the contexts and the rendered contents are sent
+                in chunks of `LIQUID_BATCH_CHUNK_SIZE`. The contexts must be
+                picklable. Takes precedence over `workers`.
+
+        Yields:
+            The rendered content for each context, in the same order
+        """
+        make_contexts = self._context_maker()
+
+        def render(context):
+            return self._render(*make_contexts(context))
+
+        start = time.perf_counter()
+        records = 0
+        if processes:
+            rendered_all = (
+                rendered
+                for chunk in _map_pool(
+                    ProcessPoolExecutor(processes,
+                                        initializer=_init_worker,
+                                        initargs=(self, )),
+                    processes,
+                    _render_chunk,
+                    _chunks(contexts, LIQUID_BATCH_CHUNK_SIZE)
+                )
+                for rendered in chunk
+            )
+        elif workers:
+            rendered_all = _map_pool(ThreadPoolExecutor(workers),
+                                     workers,
+                                     render,
+                                     contexts)
+        else:
+            rendered_all = map(render, contexts)
+
+        for rendered in rendered_all:
+            records += 1
+            yield rendered
+
+        self.batch_stats = BatchStats(records,
+                                      time.perf_counter() - start)
+        logger.info('Rendered %s', self.batch_stats)
+
+    def render_iter(self, **context):
+        # type: (Any) -> Iterator[str]
+        """Render the template with given context, yielding the rendered
+        content in chunks as soon as they are rendered
+
+        The template is compiled into a generator function for this, with
+        loops, includes and extends streamed. The chunks are at least
+        `LIQUID_STREAM_CHUNK_SIZE` characters, except the last one.
+
+        Args:
+            context: The context used to render the template
+
+        Yields:
+            The chunks of the rendered content in order
+        """
+        chunks = []
+        size = 0
+        for piece in self._render_iter(*self._contexts(context)):
+            chunks.append(piece)
+            size += len(piece)
+            if size >= LIQUID_STREAM_CHUNK_SIZE:
+                yield ''.join(chunks)
+                chunks = []
+                size = 0
+        if chunks:
+            yield ''.join(chunks)
+
+    def render_to(self, fileobj, **context):
+        # type: (IO, Any) -> None
+        """Render the template with given context into a file object
+
+        The rendered content is written in chunks (see `render_iter`),
+        instead of being held in memory as a whole.
+
+        Args:
+            fileobj: The file object to write the content to
+            context: The context used to render the template
+        """
+        write = fileobj.write
+        for chunk in self.render_iter(**context):
+            write(chunk)
+
+    def analyze(self):
+        # type: () -> Analysis
+        """Find what the template refers to without rendering it, i.e.
+        the variables and the paths on them to get from the context
+
+        The templates included or extended are analyzed in place, and the
+        variables the template is specialized against are not referred to
+        any more (see `config.specialize`). See `liquid.analyzer` for the
+        details.
+
+        Examples:
+            >>> liq = Liquid('{% for p in products %}{{ p.title | upcase }}'
+            >>>              '{% endfor %}')
+            >>> liq.analyze().variables # -> frozenset({'products'})
+            >>> liq.analyze().paths
+            >>> # -> frozenset({'products', 'products[].title'})
+            >>> liq.analyze().filters # -> frozenset({'upcase'})
+
+        Returns:
+            The references of the template
+        """
+        if self._analysis is None:
+            self._analysis = self.ANALYZER_CLASS(
+                self.parsed.parser
+            ).analyze(self.parsed)
+        return self._analysis
 
 # class LiquidJekyll(Liquid):
 #     """Support for extended mode of liquidpy"""
@@ -139,28 +581,58 @@ class LiquidPython(Liquid):
     # pylint: disable=too-few-public-methods
     """Support for extended mode of liquidpy"""
     PARSER_CLASS = ParserPython
+    COMPILER_CLASS = CompilerPython
+    ANALYZER_CLASS = AnalyzerPython
     FILTER_MANAGER = filter_manager_python
 
     # pylint: disable=signature-differs,unused-argument,arguments-differ
     def __new__(cls, *args, **kwargs):
         return object.__new__(cls)
 
-    def render(self, **context):
-        # type: (Any) -> str
-        """Render the template with given context
-        The parsed is a TagRoot object, whose render gives a string
-
-        Args:
-            context: The context used to render the template
+    def _context_maker(self):
+        # type: () -> Callable[[Dict[str, Any]], Tuple[dict, dict]]
+        """Get a function to make the local and global variables from
+        the contexts, with python's builtins available
 
         Returns:
-            The rendered content
+            The function, see `_contexts`
         """
-        context = self._update_context(context)
-        global_context = __builtins__.copy()
-        global_context.update(context)
+        envs = self.envs
+        specialized = self._specialized
+        builtins = __builtins__.copy()
+        builtins.update(envs)
+        filters = self.env.get_filters(self.FILTER_MANAGER)
 
-        global_context[
-            LIQUID_FILTERS_ENVNAME
-        ] = self.FILTER_MANAGER.filters
-        return self._render(context, global_context)
+        def contexts(context):
+            check_name(context)
+            if specialized and not specialized.isdisjoint(context):
+                _raise_specialized(specialized, context)
+            local_context = envs.copy()
+            local_context.update(context)
+            global_context = builtins.copy()
+            global_context.update(context)
+            global_context[LIQUID_FILTERS_ENVNAME] = filters
+            global_context[LIQUID_FRAME_ENVNAME] = RenderFrame()
+            return local_context, global_context
+
+        return contexts
+
+def warmup(mode=None):
+    # type: (Optional[str]) -> int
+    """Build the parsers of all the tags up front
+
+    The parsers of the tags are built on first use. Long-running processes,
+    i.e. servers, could call this at startup, so that the first renders
+    do not pay for it.
+
+    Args:
+        mode: The mode to warm up, 'standard' or 'python'.
+            Both if not given.
+
+    Returns:
+        The number of the tag parsers built
+    """
+    managers = {'standard': tag_manager, 'python': tag_manager_python}
+    if mode:
+        managers = {mode: managers[mode]}
+    return sum(manager.warmup() for manager in managers.values())
@@ -0,0 +1,214 @@
+"""The loaders to find the templates by their names for an Environment
+
+A loader gives the metadata (`TemplateMeta`) of a template, whose path
+identifies the template in the registry of the environment, so that the
+template is parsed only once however many templates include it.
+"""
+import pkgutil
+import hashlib
+import zipfile
+from io import StringIO
+from pathlib import Path, PurePosixPath
+from .utils import TemplateMeta, find_template, path_resolver
+
+class Loader:
+    """The base class of the loaders
+
+    The `repr()` of a loader is part of the keys of the cached templates,
+    so it should tell the templates it loads apart, and stay the same
+    across the runs for the templates cached in a directory. The default
+    one is made of the class and the attributes of the loader, the
+    subclasses with attributes that have no such `repr()` should
+    override it.
+    """
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        """Find the template by its name
+
+        Args:
+            name: The name of the template, i.e. the path in the include or
+                extends tag
+            curr_path: The path of the template that refers to it
+            dirs: The extra directories to look up, i.e. `include_dir` or
+                `extends_dir` from the configuration
+
+        Returns:
+            The metadata of the template, or None if it is not found
+        """
+        raise NotImplementedError # pragma: no cover
+
+    def __repr__(self):
+        attrs = ', '.join(f'{name}={value!r}'
+                          for name, value in sorted(vars(self).items()))
+        return (f'{self.__class__.__module__}.'
+                f'{self.__class__.__qualname__}({attrs})')
+
+    @staticmethod
+    def _meta(name, path, source):
+        # type: (str, str, str) -> TemplateMeta
+        """Get the metadata of a template loaded as a string"""
+        return TemplateMeta(PurePosixPath(name).stem,
+                            path,
+                            StringIO(source),
+                            False)
+
+class FileSystemLoader(Loader):
+    """Load the templates from the file system
+
+    A relative name is looked up in the extra directories, then the
+    search path and then the directory of the template referring to it.
+
+    Attributes:
+        searchpath: The directories to look up
+
+    Args:
+        *searchpath: The directories to look up
+    """
+
+    def __init__(self, *searchpath):
+        # type: (Union[str, Path]) -> None
+        self.searchpath = [Path(path) for path in searchpath]
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        try:
+            path = find_template(name,
+                                 curr_path,
+                                 [*dirs, *self.searchpath])
+            if not path or not path_resolver.is_file(path):
+                return None
+            # the results of the path resolver may be stale (see
+            # LIQUID_PATH_CACHE_TTL), so the file may be gone by now
+            stream = path.open(encoding='utf-8')
+        except OSError:
+            return None
+        return TemplateMeta(path.stem, str(path), stream, True)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.searchpath!r})'
+
+class DictLoader(Loader):
+    """Load the templates from a dict
+
+    Attributes:
+        mapping: The sources of the templates keyed by their names
+
+    Args:
+        mapping: The sources of the templates keyed by their names
+    """
+
+    def __init__(self, mapping):
+        # type: (Dict[str, str]) -> None
+        self.mapping = mapping
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        try:
+            source = self.mapping[name]
+        except KeyError:
+            return None
+        return self._meta(name, f'<dict>/{name}', source)
+
+    def __repr__(self):
+        digest = hashlib.sha256(
+            repr(sorted(self.mapping.items())).encode()
+        ).hexdigest()
+        return f'{self.__class__.__name__}({digest[:16]})'
+
+class PackageLoader(Loader):
+    """Load the templates from the resources of a package, which also
+    works for the packages imported from zip files
+
+    Attributes:
+        package: The name of the package
+        directory: The directory of the templates in the package
+
+    Args:
+        package: The name of the package
+        directory: The directory of the templates in the package
+    """
+
+    def __init__(self, package, directory='templates'):
+        # type: (str, str) -> None
+        self.package = package
+        self.directory = directory
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        resource = f'{self.directory}/{name}'
+        try:
+            source = pkgutil.get_data(self.package, resource)
+        except OSError:
+            return None
+        if source is None: # pragma: no cover
+            return None
+        return self._meta(name,
+                          f'<package {self.package}>/{resource}',
+                          source.decode())
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}'
+                f'({self.package!r}, {self.directory!r})')
+
+class ZipLoader(Loader):
+    """Load the templates from a zip file
+
+    Attributes:
+        path: The path to the zip file
+        prefix: The directory of the templates in the zip file
+
+    Args:
+        path: The path to the zip file
+        prefix: The directory of the templates in the zip file
+    """
+
+    def __init__(self, path, prefix=''):
+        # type: (Union[str, Path], str) -> None
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        inner = str(PurePosixPath(self.prefix, name))
+        try:
+            with zipfile.ZipFile(self.path) as zfile:
+                source = zfile.read(inner).decode()
+        except (OSError, KeyError):
+            return None
+        return self._meta(name, f'{self.path}/{inner}', source)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}'
+                f'({str(self.path)!r}, {self.prefix!r})')
+
+class ChoiceLoader(Loader):
+    """Try the loaders in order
+
+    Attributes:
+        loaders: The loaders
+
+    Args:
+        loaders: The loaders
+    """
+
+    def __init__(self, loaders):
+        # type: (Iterable[Loader]) -> None
+        self.loaders = list(loaders)
+
+    def load(self, name, curr_path=None, dirs=()):
+        # type: (str, Optional[str], Iterable[Union[str, Path]])
+        #   -> Optional[TemplateMeta]
+        for loader in self.loaders:
+            meta = loader.load(name, curr_path, dirs)
+            if meta is not None:
+                return meta
+        return None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.loaders!r})'
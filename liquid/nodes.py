@@ -1,4 +1,5 @@
 """Definition of nodes and node scanner"""
+import re
 from .config import LIQUID_LOG_INDENT
 from .tags import tag_manager
 from .utils import analyze_leading_spaces, logger
@@ -46,7 +47,7 @@ class Node:
                  parser,
                  open_tag='',
                  close_tag=''):
-        # type: (str, str, str, Optional[Diot], "Parser") -> None
+        # type: (str, str, str, Optional[Context], "Parser") -> None
         self.open_compact = '-' in open_tag
         self.close_compact = '-' in close_tag
         self.context = context
@@ -155,268 +156,309 @@ class NodeTag(Node):
 
         self.content = content
 
+def _node_patterns(nodes):
+    # type: (Tuple[Type[Node]]) -> Tuple[Pattern, Dict[str, Type[Node]]]
+    """Compile the pattern to find the open tags of the nodes
+
+    Escapes (`\\\\x`) are matched as well, so that escaped characters can be
+    skipped. A lone backslash at the end of the source matches as an
+    escape without the escaped character.
+
+    Returns:
+        The compiled pattern and a mapping from open tags to node classes
+    """
+    open_tags = {tag: node for node in nodes for tag in node.OPEN_TAG}
+    alternatives = '|'.join(re.escape(tag) for tag in sorted(
+        open_tags, key=len, reverse=True
+    ))
+    return (re.compile(rf'\\.?|(?P<open>{alternatives})', re.DOTALL),
+            open_tags)
+
+def _close_patterns(nodes):
+    # type: (Tuple[Type[Node]]) -> Dict[Type[Node], Tuple]
+    """Get the close tag information of the nodes
+
+    Returns:
+        A mapping from node classes to a tuple of the close tags, the proper
+        prefixes of the close tags and the compiled pattern to find the next
+        character that may start a close tag or an escape
+    """
+    ret = {}
+    for node in nodes:
+        close_tags = frozenset(node.CLOSE_TAG)
+        prefixes = frozenset(tag[:i] for tag in close_tags
+                             for i in range(1, len(tag)))
+        chars = ''.join(sorted(set(tag[0] for tag in close_tags) | {'\\'}))
+        ret[node] = (close_tags,
+                     prefixes,
+                     re.compile(f'[{re.escape(chars)}]'))
+    return ret
+
 class NodeScanner:
     # pylint: disable=too-many-instance-attributes,too-few-public-methods
     """Scanning for the nodes
 
+    The whole source is read at once. Literal text is skipped in bulk by
+    a compiled pattern hitting the open tags, and the content of a node is
+    skipped up to the characters that may start a close tag. The nodes, the
+    raw tags, the escapes and the positions are the same as the ones from
+    the original character-wise scanner (kept in the tests to check this
+    one against).
+
     Attributes:
         LITERAL: The literal node
         NODES: The possible nodes
-        OPEN_CHARS: The start characters of open tags for those nodes
-            This is to speed up the lookup for a potential hit of a node
-
-        context: The context of the potential node
-        open_context: Where the open tag hits
-        hit: The node we hit
-            This will be only fit when there is only one type of node hit
-        literal_buffer: The buffer for literal nodes
-            This will not consume the potential node
-        opentag_buffer: The buffer for open tags
-        closetag_buffer: The buffer for close tags
-        content_buffer: The buffer for content of potential nodes
-        escape: Whether the previous character is an escape (`\\`)
+        OPEN_REGEX: The pattern to find the open tags and escapes
+        OPEN_TAGS: The open tags and the node classes they open
+        CLOSE_INFO: The close tag information for each node class
+
+        context: The context of the scanner, moving along with the scanning
+        open_context: The context where the potential node or literal starts
+        hit: The node class we hit, waiting to be closed
+        opentag: The open tag of the node we hit
         rawtag: The matched raw tag name
         parser: The parser
+        source: The whole source of the template
+        pos: The position of the scanning in source
     """
 
-    __slots__ = ('context', 'open_context', 'hit', 'literal_buffer',
-                 'opentag_buffer', 'content_buffer', 'closetag_buffer',
-                 'escape', 'rawtag', 'parser')
-
+    __slots__ = ('context', 'open_context', 'hit', 'opentag', 'rawtag',
+                 'parser', 'source', 'pos', '_lineno', '_colno', '_lineno_pos')
 
     LITERAL = NodeLiteral          # type: NodeLiteral
     NODES = (NodeOutput, NodeTag)  # type: Tuple[Type[Node]]
-    OPEN_CHARS = set(tag[0] for node in NODES
-                     for tag in node.OPEN_TAG) # type: Set[str]
+    OPEN_REGEX, OPEN_TAGS = _node_patterns(NODES)
+    CLOSE_INFO = _close_patterns(NODES)
+
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        cls.OPEN_REGEX, cls.OPEN_TAGS = _node_patterns(cls.NODES)
+        cls.CLOSE_INFO = _close_patterns(cls.NODES)
 
     def __init__(self, context, parser):
-        # type: (Diot, "Parser") -> None
-
-        self.context = context      # type: Diot
-        self.open_context = None    # type: Diot
-        self.hit = None             # type: Optional[Node]
-        self.literal_buffer = ''    # type: str
-        self.opentag_buffer = None  # type: str
-        self.closetag_buffer = None # type: str
-        self.content_buffer = None  # type: str
-        self.escape = None          # type: bool
+        # type: (Context, "Parser") -> None
+        self.context = context      # type: Context
+        self.open_context = None    # type: Context
+        self.hit = None             # type: Optional[Type[Node]]
+        self.opentag = ''           # type: str
         self.rawtag = None          # type: Optional[str]
         self.parser = parser        # type: Parser
-        self._clear_state()
+        self.source = None          # type: Optional[str]
+        self.pos = 0                # type: int
+        self._lineno = self._colno = self._lineno_pos = 0
 
-    def _clear_state(self):
-        """Clear the hit state."""
-        self.hit = None
-        self.opentag_buffer = ''
-        self.closetag_buffer = ''
-        self.content_buffer = ''
-
-    def _summarize(self, end=False):
-        """Summarize the residue"""
-
-        # we don't have any node hit, summarize the literal
-        if not self.hit:
-            # context is mutable, have to copy it to keep current context
-            literal = (self.literal_buffer + self.opentag_buffer
-                       if end
-                       else self.literal_buffer) # type: str
-            self.literal_buffer = ''
-            if literal:
-                node = self.LITERAL(literal, self.open_context, self.parser)
-                logger.debug('[dim italic]%s  Found %r[/dim italic]',
-                             self.context.level * LIQUID_LOG_INDENT,
-                             node.tag,
-                             extra={"markup": True})
-                return node
-            return not end
-
-        # We got a hit, if no closetag hit yet,
-        # we need to summarize previous literals
-        if not self.closetag_buffer:
-            if self.literal_buffer:
-                node = self.LITERAL(self.literal_buffer,
-                                    self.open_context,
-                                    self.parser)
-                self.literal_buffer = ''
-                logger.debug('[dim italic]%s  Found %r[/dim italic]',
-                             self.context.level * LIQUID_LOG_INDENT,
-                             node.tag,
-                             extra={"markup": True})
-                self.open_context = self.context.copy()
-                self.open_context.colno -= len(self.opentag_buffer)
-                return node
-            if not end:
-                return True
-        if self.closetag_buffer in self.hit.CLOSE_TAG:
-            # let's see if we are inside a raw tag
-            if self.rawtag:
-                # NodeTag
-                if (not self.hit.name and
-                        self.content_buffer.strip() == 'end' + self.rawtag):
-                    self.rawtag = None
-                else:
-                    self.literal_buffer += (self.opentag_buffer +
-                                            self.content_buffer +
-                                            self.closetag_buffer)
-                    logger.debug('[dim italic]%s  Gave up %r (inside raw tag)'
-                                 '[/dim italic]',
-                                 self.context.level * LIQUID_LOG_INDENT,
-                                 self.hit.__name__,
-                                 extra={"markup": True})
-                    self._clear_state()
-                    if not end:
-                        return True
-
-            node = self.hit(self.content_buffer,
-                            self.open_context,
-                            self.parser,
-                            self.opentag_buffer,
-                            self.closetag_buffer) # type: Type[Node]
-
-            logger.debug('%s  Found %r',
-                         self.context.level * LIQUID_LOG_INDENT,
-                         node.tag)
-            if node.raw:
-                self.rawtag = node.name
-
-            self._clear_state()
-            return node
-
-        context = self.open_context or self.context
-        raise LiquidSyntaxError(
-            f'Unclosed node {self.hit.__name__} ({context.name}, '
-            f'line {context.lineno + 1}, '
-            f'column {context.colno + 1})',
-            context,
-            self.parser
-        )
+    def _position(self, pos):
+        # type: (int) -> Tuple[int, int]
+        """Get the line and column numbers at the given position of the source
 
-    def _open_node(self, char):
-        # type: (str) -> Optional[bool]
-        """check if char is opening a node only when one definite
-        type of node hit"""
-        if ((not self.opentag_buffer and not char in self.OPEN_CHARS) or
-                self.content_buffer):
-            return False
+        Positions are always requested forwards, so that the newlines are
+        counted incrementally.
+        """
+        self._lineno += self.source.count('\n', self._lineno_pos, pos)
+        self._lineno_pos = pos
+        linestart = self.source.rfind('\n', 0, pos) + 1
+        return (self._lineno,
+                pos - linestart + (self._colno if not linestart else 0))
+
+    def _context_at(self, pos):
+        # type: (int) -> Context
+        """Get a copy of the context at the given position of the source"""
+        context = self.context.copy()
+        context.lineno, context.colno = self._position(pos)
+        return context
+
+    def _move_to(self, pos):
+        # type: (int) -> None
+        """Move the scanning (and the context) to the given position"""
+        self.pos = pos
+        self.context.lineno, self.context.colno = self._position(pos)
+
+    def _literal(self, literal):
+        # type: (str) -> Optional[NodeLiteral]
+        """Create a literal node at the open context"""
+        if not literal:
+            return None
+        node = self.LITERAL(literal, self.open_context, self.parser)
+        logger.debug('[dim italic]%s  Found %r[/dim italic]',
+                     self.context.level * LIQUID_LOG_INDENT,
+                     node.tag,
+                     extra={"markup": True})
+        return node
 
-        opentag = self.opentag_buffer + char # type: str
-        # See if we already have a hit, see if we hit '-'
-        if self.hit:
-            return opentag in self.hit.OPEN_TAG
+    def _scan_literal(self, literal=''):
+        # type: (str) -> Union[bool, Node]
+        """Scan the literal until the next open tag, and open that node
+
+        Args:
+            literal: The literal that has been scanned (inside raw tags)
 
-        potential_hits = [node for node in self.NODES
-                          if any(tag.startswith(opentag)
-                                 for tag in node.OPEN_TAG)]
+        Returns:
+            The literal node or the node opened if there is no literal ahead.
+            False if we hit the end of the source without any literal.
+        """
+        source = self.source
+        start = pos = self.pos
+        pieces = [literal]
+        while True:
+            match = self.OPEN_REGEX.search(source, pos)
+            if not match:
+                pieces.append(source[start:])
+                self._move_to(len(source))
+                return self._literal(''.join(pieces)) or False
+
+            if match.group('open'):
+                break
+            # escapes: "\\" is taken as "\", and a trailing "\" is dropped
+            escape = match.group()
+            if escape != '\\\\' and len(escape) > 1:
+                pos = match.end()
+                continue
+            pieces.append(source[start:match.start()])
+            pieces.append(escape[1:])
+            start = pos = match.end()
+
+        pieces.append(source[start:match.start()])
+        self.opentag = match.group('open')
+        self.hit = self.OPEN_TAGS[self.opentag]
+        node = self._literal(''.join(pieces))
+        self.open_context = self._context_at(match.start())
+        self._move_to(match.end())
+        logger.debug('[dim italic]%s  Opened potential node: %s '
+                     '(line: %s, column: %s)[/dim italic]',
+                     self.context.level * LIQUID_LOG_INDENT,
+                     self.hit.__name__,
+                     self.open_context.lineno + 1,
+                     self.open_context.colno + 1,
+                     extra={"markup": True})
+        return node or self._scan_node()
+
+    def _scan_content(self):
+        # type: () -> Tuple[str, str]
+        # pylint: disable=too-many-branches
+        """Scan the content of the node we hit until its close tag, and move
+        the scanning after the close tag
 
-        if len(potential_hits) == 1:
-            self.hit = potential_hits[0]
-            return True
-        if len(potential_hits) > 1:
-            return None
-        return False
+        Returns:
+            The content and the close tag
 
-    def _close_node(self, char):
-        # type: (str) -> Optional[bool]
-        """Check if a char is closing a node"""
+        Raises:
+            LiquidSyntaxError: When the node is not closed
+        """
+        source = self.source
+        end = len(source)
+        hit = self.hit
+        close_tags, close_prefixes, close_regex = self.CLOSE_INFO[hit]
+        pos = self.pos
+        content = []
+        closetag = ''
+        while True:
+            if content and not closetag:
+                match = close_regex.search(source, pos)
+                if not match:
+                    content.append(source[pos:])
+                    pos = end
+                elif match.start() > pos:
+                    content.append(source[pos:match.start()])
+                    pos = match.start()
+            if pos >= end:
+                self._move_to(end)
+                context = self.open_context or self.context
+                raise LiquidSyntaxError(
+                    f'Unclosed node {hit.__name__} ({context.name}, '
+                    f'line {context.lineno + 1}, '
+                    f'column {context.colno + 1})',
+                    context,
+                    self.parser
+                )
+
+            unit = source[pos]
+            if unit == '\\':
+                # an escape can never be part of a tag
+                unit = source[pos:pos + 2]
+                if unit == '\\\\':
+                    unit = '\\'
+                pos += 2
+            else:
+                pos += 1
+                if not content and self.opentag + unit in hit.OPEN_TAG:
+                    self.opentag += unit
+                    continue
+                if closetag + unit in close_tags:
+                    closetag += unit
+                    break
+                if closetag + unit in close_prefixes:
+                    closetag += unit
+                    continue
+            content.append(closetag + unit)
+            closetag = ''
+
+        self._move_to(min(pos, end))
+        return ''.join(content), closetag
+
+    def _scan_node(self):
+        # type: () -> Union[bool, Node]
+        """Scan the node we hit until its close tag
 
-        closetag = self.closetag_buffer + char # type: str
-        if closetag in self.hit.CLOSE_TAG:
-            return True
-        if any(ctag.startswith(closetag) for ctag in self.hit.CLOSE_TAG):
-            return None
-        return False
-
-    def _add_to_buffer(self, char):
-        # type: (str) -> Union[bool, Type[Node]]
-        """Add character to buffer, and decide whether we should do a summary
-        on the state"""
-        # When should we do a summary:
-        # 1. When a potential hit is determined (ie `{%` hit)
-        # 2. When a hit closes (ie `%}` hit)
-        # 3. Stream end hit
-        if self.escape:
-            char = f'\\{char}'
-            self.escape = False
-
-        if not self.hit:
-            opened = self._open_node(char) # type: Optional[bool]
-            if opened is True: # pragma: no cover
-                self.opentag_buffer += char
-                ret = self._summarize()
-                logger.debug('[dim italic]%s  Opened potential node: %s '
-                             '(line: %s, column: %s)[/dim italic]',
-                             self.context.level * LIQUID_LOG_INDENT,
-                             self.hit.__name__,
-                             self.open_context.lineno + 1,
-                             self.open_context.colno + 1,
-                             extra={"markup": True})
-                return ret
-
-            if opened is False:
-                self.literal_buffer += self.opentag_buffer + char
-                self.opentag_buffer = ''
-
-            else: # hit potentially, multiple node types hit
-                self.opentag_buffer += char
-
-        elif self._open_node(char) is False:
-            closed = self._close_node(char)
-            if closed is True:
-                self.closetag_buffer += char
-                node = self._summarize()
-                if isinstance(node, bool):
-                    return node
-                self.open_context = self.context.copy()
-                logger.debug('[dim italic]%s  Closed node: %s[/dim italic]',
+        Returns:
+            The node closed, or whatever scanned next if the node is given
+            up inside a raw tag.
+        """
+        hit = self.hit
+        content, closetag = self._scan_content()
+        opentag = self.opentag
+        self.hit = None
+        self.opentag = ''
+        # let's see if we are inside a raw tag
+        if self.rawtag:
+            if not hit.name and content.strip() == 'end' + self.rawtag:
+                self.rawtag = None
+            else:
+                logger.debug('[dim italic]%s  Gave up %r (inside raw tag)'
+                             '[/dim italic]',
                              self.context.level * LIQUID_LOG_INDENT,
-                             f"{node.__class__.__name__}({node.tag.name})"
-                             if isinstance(node, NodeTag)
-                             else node.name,
+                             hit.__name__,
                              extra={"markup": True})
-                return node
-
-            if closed is False:
-                self.content_buffer += self.closetag_buffer + char
-                self.closetag_buffer = ''
-
-            else: # potentially closed
-                self.closetag_buffer += char
-
-        else: # we hit '-'
-            self.opentag_buffer += char
-        return True
+                return self._scan_literal(opentag + content + closetag)
+
+        node = hit(content,
+                   self.open_context,
+                   self.parser,
+                   opentag,
+                   closetag) # type: Node
+        logger.debug('%s  Found %r',
+                     self.context.level * LIQUID_LOG_INDENT,
+                     node.tag)
+        if node.raw:
+            self.rawtag = node.name
+
+        self.open_context = self.context.copy()
+        logger.debug('[dim italic]%s  Closed node: %s[/dim italic]',
+                     self.context.level * LIQUID_LOG_INDENT,
+                     f"{node.__class__.__name__}({node.tag.name})"
+                     if isinstance(node, NodeTag)
+                     else node.name,
+                     extra={"markup": True})
+        return node
 
     def consume(self, stream):
         # type: (IO) -> Union[bool, Type[Node]]
-        """Consume the character of a stream
+        """Consume the stream until the next node
 
-        if it is empty, then we hit the end of the stream.
-        Otherwise, we need to update the context, and add the character to the
-        buffer.
+        The whole stream is read at the first call.
 
         Args:
             stream: The stream to consume
 
         Returns:
-            True: we should continue consuming
             False: we should stop consuming (we hit the end of the stream)
             Node: A complete node hit
         """
-        char = stream.read(1) # type: str
-        if not char:
-            return self._summarize(end=True)
-
-        if char == '\n':
-            self.context.lineno += 1
-            self.context.colno = 0
-            return self._add_to_buffer(char)
-        if char == '\\':
-            self.escape = not self.escape
-            self.context.colno += 1
-            if not self.escape:
-                return self._add_to_buffer(char)
-        else:
-            self.context.colno += 1
-            return self._add_to_buffer(char)
-
-        return True
+        if self.source is None:
+            self.source = stream.read()
+            self._lineno = self.context.lineno
+            self._colno = self.context.colno
+        if self.hit:
+            return self._scan_node()
+        if self.pos >= len(self.source):
+            return False
+        return self._scan_literal()
@@ -0,0 +1,635 @@
+"""Optimize the parsed templates
+
+The tag tree of a template is optimized right after it is parsed. The
+constant parts of the expressions, which are made of literals and the
+filters registered as pure, are evaluated once here instead of at each
+render, if `config.fold_constants` is True. The output tags evaluated to
+constants are turned into literals.
+
+The whitespaces of the literals are stripped here for the whitespace
+control, instead of at each render. The tags rendering nothing (comments
+and config tags) are removed, the raw tags are turned into literals, and
+then the literals next to each other are merged, so that a template with
+only literals left is rendered as a single string.
+
+The branches of the if/elsif/unless/else tags never taken are pruned once
+their conditions are known to be constants, and the children of the
+branch always taken are put in place of the tags. The same is done for
+the for loops over constant empty iterables, with their else branches.
+This is done only if `config.fold_constants` is True as well.
+
+A template can also be specialized against the variables given to
+construct it (see `Optimizer.specialize`), which are taken as constants
+as well, unless they are bound by the tags of the template (i.e. assign).
+
+The values of the constants are kept only if they are immutable (strings,
+numbers, booleans and None), so that they are never shared between renders
+to be modified. The expressions failing to be evaluated are kept as they
+are, so that the errors are raised and located when rendering as before.
+"""
+from copy import copy
+from .config import LIQUID_FILTERS_ENVNAME
+from .filters import filter_manager
+from .tags.transformer import (
+    TagSegment,
+    TagSegmentArguments,
+    TagSegmentComparison,
+    TagSegmentFilter,
+    TagSegmentGetAttr,
+    TagSegmentGetItem,
+    TagSegmentLogical,
+    TagSegmentOutput,
+    TagSegmentRange,
+    TagSegmentVar
+)
+from .tags.tag__literal import TagLITERAL
+from .tags.tag__output import TagOUTPUT
+from .tags.tag__root import TagROOT
+from .tags.tag_assign import TagAssign
+from .tags.tag_block import TagBlock
+from .tags.tag_break import TagBreak
+from .tags.tag_capture import TagCapture
+from .tags.tag_case import TagCase
+from .tags.tag_comment import TagComment
+from .tags.tag_config import TagConfig
+from .tags.tag_continue import TagContinue
+from .tags.tag_cycle import TagCycle
+from .tags.tag_decrement import TagDecrement
+from .tags.tag_else import TagElse
+from .tags.tag_elsif import TagElsif
+from .tags.tag_extends import TagExtends
+from .tags.tag_for import TagFor
+from .tags.tag_if import TagIf
+from .tags.tag_include import TagInclude
+from .tags.tag_increment import TagIncrement
+from .tags.tag_raw import TagRaw
+from .tags.tag_tablerow import TagTablerow
+from .tags.tag_unless import TagUnless
+from .tags.tag_when import TagWhen
+
+# the types of the values that can be kept as constants
+CONSTANT_TYPES = (str, int, float, bool, type(None))
+# the mark of the segments failed to be evaluated
+_FAILED = object()
+
+def copy_tree(root):
+    # type: (Tag) -> Tag
+    """Copy a tag with its descendants, and the trees flattened by the
+    extends tags, so that the copy can be modified
+
+    Args:
+        root: The tag to copy
+
+    Returns:
+        The copy, whose tags refer to their copied parents and siblings
+    """
+    return copy_tags([root], root.parent)[0]
+
+def copy_tags(tags, parent):
+    # type: (List[Tag], Optional[Tag]) -> List[Tag]
+    """Copy the tags with their descendants, and the trees flattened by the
+    extends tags, so that the copies can be modified
+
+    Args:
+        tags: The tags to copy, with the siblings to link together
+        parent: The parent of the copies
+
+    Returns:
+        The copies, whose tags refer to their copied parents and siblings
+    """
+    copies = {} # type: Dict[Tag, Tag]
+
+    def _copy(tag, parent):
+        tag_copy = copies[tag] = copy(tag)
+        tag_copy.parent = parent
+        tag_copy.children = [_copy(child, tag_copy)
+                             for child in tag.children]
+        if isinstance(tag, TagExtends):
+            tag_copy.flattened = _copy(tag.flattened, None)
+        return tag_copy
+
+    tag_copies = [_copy(tag, parent) for tag in tags]
+    for tag, tag_copy in copies.items():
+        tag_copy.prev = copies.get(tag.prev)
+        tag_copy.next = copies.get(tag.next)
+    return tag_copies
+
+class Optimizer:
+    """Fold the constants, prune the dead branches and merge the literals
+    in a parsed template
+
+    Attributes:
+        HANDLERS: The methods to optimize the tags, by the tag classes
+        SEGMENTS: The segment classes that can be evaluated at parse time
+            when all their data are constants
+        FILTER_SEGMENT: The segment class of the filters
+        FILTER_MANAGER: The filter manager to get the pure filters from
+        VAR_SEGMENT: The segment class of the variables
+        BINDINGS: The methods to get the names of the variables bound by
+            the tags, by the tag classes
+        UNBOUND: The tag classes binding no variables
+
+        fold_constants: Whether to fold the constants
+        filters: The pure filters by their names, which are not overridden
+            by the environment of the template
+        global_vars: The global variables to evaluate the constants with
+        constants: The variables taken as constants, see `specialize`
+
+    Args:
+        parser: The parser of the template
+    """
+    HANDLERS = {
+        TagOUTPUT: '_fold_output',
+        TagAssign: '_fold_assign',
+        TagComment: '_remove_comment',
+        TagConfig: '_remove',
+        TagElsif: '_fold_test',
+        TagExtends: '_optimize_extends',
+        TagIf: '_fold_test',
+        TagRaw: '_optimize_raw',
+        TagUnless: '_fold_test',
+    } # type: Dict[Type[Tag], str]
+
+    SEGMENTS = (
+        TagSegmentArguments,
+        TagSegmentComparison,
+        TagSegmentFilter,
+        TagSegmentGetAttr,
+        TagSegmentGetItem,
+        TagSegmentLogical,
+        TagSegmentOutput,
+        TagSegmentRange,
+    ) # type: Tuple[Type[TagSegment]]
+
+    FILTER_SEGMENT = TagSegmentFilter # type: Type[TagSegment]
+    FILTER_MANAGER = filter_manager # type: FilterManager
+    VAR_SEGMENT = TagSegmentVar # type: Type[TagSegment]
+
+    BINDINGS = {
+        TagAssign: '_bound_assign',
+        TagCapture: '_bound_capture',
+        TagDecrement: '_bound_counter',
+        TagFor: '_bound_loop',
+        TagIncrement: '_bound_counter',
+        TagInclude: '_bound_include',
+        TagTablerow: '_bound_loop',
+    } # type: Dict[Type[Tag], str]
+
+    UNBOUND = (
+        TagROOT,
+        TagLITERAL,
+        TagOUTPUT,
+        TagBlock,
+        TagBreak,
+        TagCase,
+        TagComment,
+        TagConfig,
+        TagContinue,
+        TagCycle,
+        TagElse,
+        TagElsif,
+        TagExtends,
+        TagIf,
+        TagRaw,
+        TagUnless,
+        TagWhen,
+    ) # type: Tuple[Type[Tag]]
+
+    def __init__(self, parser):
+        # type: (Parser) -> None
+        self.fold_constants = parser.config.fold_constants # type: bool
+        filters = parser.env.get_filters(self.FILTER_MANAGER)
+        self.filters = {
+            name: filters[name] for name in self.FILTER_MANAGER.pure
+            if filters.get(name) is self.FILTER_MANAGER.filters.get(name)
+        } # type: Dict[str, Callable]
+        self.global_vars = {LIQUID_FILTERS_ENVNAME: self.filters}
+        self.constants = {} # type: Dict[str, Any]
+
+    def optimize(self, root):
+        # type: (TagROOT) -> TagROOT
+        """Optimize the tag tree of a template in place
+
+        Args:
+            root: The root tag of the template
+
+        Returns:
+            The root tag
+        """
+        self._optimize_children(root)
+        return root
+
+    def specialize(self, root, envs):
+        # type: (TagROOT, Dict[str, Any]) -> TagROOT
+        """Specialize the tag tree of a template against the variables that
+        are the same for all its renders, with the parts depending only on
+        them evaluated
+
+        The variables bound by the tags of the template are not taken as
+        constants, and nothing is taken if any variable might be bound by
+        the tags (i.e. custom tags). The values of the variables are
+        supposed not to be modified once the template is specialized.
+
+        Args:
+            root: The root tag of the template, which is not modified
+            envs: The variables given to construct the template
+
+        Returns:
+            A specialized copy of the tree, or the tree itself if there is
+            nothing to specialize
+        """
+        bound = self._bound_names(root)
+        if bound is None or not self.fold_constants:
+            return root
+        self.constants = {name: value for name, value in envs.items()
+                          if name not in bound}
+        if not self.constants:
+            return root
+        return self.optimize(copy_tree(root))
+
+    def fold(self, segment):
+        # type: (Any) -> Any
+        """Fold the constant parts of a segment
+
+        Args:
+            segment: The segment or a literal value
+
+        Returns:
+            The value if the segment is a constant, otherwise the segment
+            with its constant parts folded
+        """
+        if not self.fold_constants:
+            return segment
+        if isinstance(segment, tuple):
+            return self._fold_all(segment)
+        if (type(segment) not in self.SEGMENTS and
+                not isinstance(segment, self.VAR_SEGMENT)):
+            return segment
+
+        if self._constant(segment):
+            value = self._evaluate(segment)
+            if isinstance(value, CONSTANT_TYPES):
+                return value
+
+        if isinstance(segment, TagSegmentOutput):
+            return self._fold_filters(segment)
+        if isinstance(segment, self.VAR_SEGMENT):
+            return segment
+
+        data = segment.data
+        if isinstance(segment, self.FILTER_SEGMENT):
+            # the name of the filter is never folded
+            folded = (data[0], *self._fold_all(data[1:]))
+        else:
+            folded = self._fold_all(data)
+        if all(new is old for new, old in zip(folded, data)):
+            return segment
+        return segment.__class__(*folded)
+
+    def _fold_all(self, data):
+        # type: (Tuple[Any]) -> Tuple[Any]
+        """Fold the data of a segment, which is kept if nothing folded"""
+        folded = tuple(self.fold(dat) for dat in data)
+        if all(new is old for new, old in zip(folded, data)):
+            return data
+        return folded
+
+    def _constant(self, segment):
+        # type: (Any) -> bool
+        """Check if a segment is made of literals and pure filters only"""
+        if isinstance(segment, (tuple, list)):
+            return all(self._constant(data) for data in segment)
+        if not isinstance(segment, TagSegment):
+            return True
+        if isinstance(segment, self.VAR_SEGMENT):
+            return str(segment) in self.constants
+        if type(segment) not in self.SEGMENTS:
+            return False
+        if isinstance(segment, self.FILTER_SEGMENT):
+            return self._pure(segment) and self._constant(segment.data[1])
+        return all(self._constant(data) for data in segment.data)
+
+    def _pure(self, segment):
+        # type: (TagSegment) -> bool
+        """Check if a filter segment calls a pure filter"""
+        return str(segment.data[0]) in self.filters
+
+    def _evaluate(self, segment, base=_FAILED):
+        # type: (TagSegment, Any) -> Any
+        """Evaluate a constant segment, or apply a constant filter segment to
+        the base value"""
+        try:
+            value = segment.render(self.constants.copy(), self.global_vars)
+            return value if base is _FAILED else value(base)
+        except Exception: # pylint: disable=broad-except
+            return _FAILED
+
+    def _fold_filters(self, segment):
+        # type: (TagSegmentOutput) -> TagSegmentOutput
+        """Apply the leading constant filters of an output segment to its
+        base value if it is a constant"""
+        base, *filters = segment.data
+        base = value = self.fold(base)
+        nfolded = 0
+        if not isinstance(base, TagSegment):
+            for i, filt in enumerate(filters):
+                if not self._constant(filt):
+                    break
+                value = self._evaluate(filt, value)
+                if value is _FAILED:
+                    break
+                # the values in between are not kept if they are mutable
+                if isinstance(value, CONSTANT_TYPES):
+                    base, nfolded = value, i + 1
+        data = (base, *self._fold_all(filters[nfolded:]))
+        if nfolded or any(new is not old
+                          for new, old in zip(data, segment.data)):
+            return segment.__class__(*data)
+        return segment
+
+    @staticmethod
+    def _literal(tag, content):
+        # type: (Tag, str) -> TagLITERAL
+        """Create a literal tag in place of a tag"""
+        literal = TagLITERAL('LITERAL',
+                             content,
+                             tag.context,
+                             False,
+                             False,
+                             tag.parser)
+        literal.parent = tag.parent
+        return literal
+
+    def _optimize_children(self, tag):
+        # type: (Tag) -> None
+        """Optimize the children of a tag, replacing or removing them if
+        needed, prune the dead branches and merge the literals next to
+        each other"""
+        # the exact classes, as for the handlers, since the subclasses
+        # (i.e. the tags of python mode) parse and render differently
+        # pylint: disable=protected-access,unidiomatic-typecheck
+        optimized = [] # type: List[Tag]
+        for child in tag.children:
+            handler = self.HANDLERS.get(type(child))
+            # the parsing might be held (i.e. inside a block)
+            if handler and not (child.PARSER and child.parsed is None):
+                child = getattr(self, handler)(child)
+                if child is None:
+                    continue
+            self._optimize_children(child)
+            optimized.append(child)
+
+        # the younger siblings are pruned with their eldest ones, which are
+        # taken before pruning changes the links between the siblings
+        eldests = [child for child in optimized if not child.prev]
+        children = [] # type: List[Tag]
+        for eldest in eldests:
+            for child in self._prune_branches(eldest):
+                if type(child) is not TagLITERAL:
+                    children.append(child)
+                    continue
+                # with the whitespaces stripped
+                content = child._render(None, None)
+                if not content:
+                    continue
+                if children and type(children[-1]) is TagLITERAL:
+                    children[-1] = self._literal(
+                        children[-1], children[-1].content + content
+                    )
+                elif child.open_compact or child.close_compact:
+                    children.append(self._literal(child, content))
+                else:
+                    children.append(child)
+        tag.children[:] = children
+
+    def _prune_branches(self, tag):
+        # type: (Tag) -> List[Tag]
+        """Prune the branches never taken of a tag and its younger siblings
+        (i.e. if/elsif/else)
+
+        The branches with blocks in them are kept, so that they are still
+        replaced by the templates extending this one. Nothing is pruned
+        unless `fold_constants` is on.
+
+        Args:
+            tag: The eldest tag of the branches
+
+        Returns:
+            The tags to put in place of the branches, which are the
+            children of the branch if it is always taken
+        """
+        branches = [] # type: List[Tag]
+        while tag:
+            branches.append(tag)
+            tag = tag.next
+        if not self.fold_constants:
+            return branches
+
+        kept = [] # type: List[Tag]
+        taken = None # type: Optional[bool]
+        for branch in branches:
+            taken = self._taken(branch)
+            if taken is not False:
+                kept.append(branch)
+            if taken:
+                break
+
+        if taken and len(kept) == 1 and not self._has_tags(
+                kept[0].children, ('break', 'continue')
+        ):
+            # the eldest branch kept is always taken, whose children are
+            # put in place unless the loops would check break/continue
+            # after each of them, instead of after the branch
+            if self._has_tags((branch for branch in branches
+                               if branch is not kept[0]), ('block', )):
+                return branches
+            for child in kept[0].children:
+                child.parent = kept[0].parent
+            return kept[0].children
+
+        if len(kept) == len(branches) or self._has_tags(
+                (branch for branch in branches if branch not in kept),
+                ('block', )
+        ):
+            return branches
+        for elder, younger in zip(kept, kept[1:]):
+            elder.next = younger
+            younger.prev = elder
+        if kept:
+            kept[0].prev = kept[-1].next = None
+        return kept
+
+    def _taken(self, tag):
+        # type: (Tag) -> Optional[bool]
+        """Check if the branch of a tag is always or never taken when
+        rendered by its elder siblings
+
+        Returns:
+            True or False if it is always or never taken, None if it is
+            only known when rendering
+        """
+        # the exact classes, see _optimize_children
+        # pylint: disable=protected-access,unidiomatic-typecheck
+        eldest = tag.eldest
+        if eldest and type(eldest) not in (TagIf, TagFor, TagWhen):
+            # unless renders no younger siblings in standard mode, and
+            # the others (i.e. custom tags) are not known here
+            return False if type(eldest) is TagUnless else None
+        if type(tag) is TagElse:
+            return True
+        # the parsing might be held (i.e. inside a block)
+        if tag.parsed is None:
+            return None
+        if type(tag) is TagFor:
+            # the else branch is rendered if nothing to loop over
+            return False if self._empty_loop(tag) else None
+        if (type(tag) not in (TagIf, TagElsif, TagUnless) or
+                isinstance(tag.parsed, TagSegment)):
+            return None
+        taken = tag._render_expr({}, {})
+        return not taken if type(tag) is TagUnless else taken
+
+    def _empty_loop(self, tag):
+        # type: (Tag) -> bool
+        """Check if a for tag loops over a constant empty iterable"""
+        # pylint: disable=protected-access
+        _, atom, args = tag.parsed
+        if not self.fold_constants or not self._constant(
+                (atom, *(argvalue for _, argvalue in args))
+        ):
+            return False
+        try:
+            return not tag._iterable(self.constants.copy(),
+                                     self.global_vars)
+        except Exception: # pylint: disable=broad-except
+            return False
+
+    def _bound_names(self, root):
+        # type: (Tag) -> Optional[Set[str]]
+        """Get the names of the variables bound by the tags in a tree
+
+        Returns:
+            The names, or None if any variable might be bound
+        """
+        names = set() # type: Set[str]
+        tags = [root]
+        while tags:
+            tag = tags.pop()
+            tags.extend(tag.children)
+            if isinstance(tag, TagExtends):
+                tags.append(tag.flattened)
+            if type(tag) in self.UNBOUND:
+                continue
+            binding = self.BINDINGS.get(type(tag))
+            # the parsing might be held (i.e. inside a block)
+            if binding is None or tag.parsed is None:
+                return None
+            names.update(getattr(self, binding)(tag))
+        return names
+
+    @staticmethod
+    def _bound_assign(tag):
+        # type: (Tag) -> Iterable[str]
+        """The variable assigned"""
+        return (tag.parsed[0], )
+
+    @staticmethod
+    def _bound_capture(tag):
+        # type: (Tag) -> Iterable[str]
+        """The variable captured"""
+        return (str(tag.parsed), )
+
+    @staticmethod
+    def _bound_counter(tag):
+        # type: (Tag) -> Iterable[str]
+        """The variables of the increment/decrement tags"""
+        return (f'__incremental__{tag.parsed}',
+                f'__decremental__{tag.parsed}')
+
+    @staticmethod
+    def _bound_loop(tag):
+        # type: (Tag) -> Iterable[str]
+        """The variable of the loop and the forloop object"""
+        return (tag.parsed[0], 'forloop')
+
+    @staticmethod
+    def _bound_include(tag): # pylint: disable=unused-argument
+        # type: (Tag) -> Iterable[str]
+        """The variable of the include parameters"""
+        return ('include', )
+
+    @staticmethod
+    def _has_tags(tags, names):
+        # type: (Iterable[Tag], Tuple[str]) -> bool
+        """Check if there are tags with the names (i.e. blocks) in the tags
+        or their descendants"""
+        tags = list(tags)
+        while tags:
+            tag = tags.pop()
+            if tag.name in names:
+                return True
+            tags.extend(tag.children)
+        return False
+
+    def _fold_output(self, tag):
+        # type: (Tag) -> Tag
+        """Fold the output, turning it into a literal if it is constant"""
+        output = self.fold(tag.parsed)
+        if isinstance(output, TagSegment):
+            tag.parsed = output
+            return tag
+        return self._literal(tag, '' if output is None else str(output))
+
+    def _fold_assign(self, tag):
+        # type: (Tag) -> Tag
+        """Fold the output to assign"""
+        varname, output = tag.parsed
+        output = self.fold(output)
+        if not isinstance(output, TagSegment):
+            output = TagSegmentOutput(output)
+        tag.parsed = varname, output
+        return tag
+
+    def _fold_test(self, tag):
+        # type: (Tag) -> Tag
+        """Fold the condition of the if/elsif/unless tags"""
+        # None means not parsed for the tags
+        test = self.fold(tag.parsed)
+        tag.parsed = False if test is None else test
+        return tag
+
+    @staticmethod
+    def _remove(tag): # pylint: disable=unused-argument
+        # type: (Tag) -> None
+        """Remove the tags rendering nothing"""
+        return None
+
+    def _remove_comment(self, tag):
+        # type: (Tag) -> Optional[Tag]
+        """Remove the comment tag, unless there are blocks in it to be
+        replaced by the templates extending this one"""
+        return tag if self._has_tags(tag.children, ('block', )) else None
+
+    def _optimize_raw(self, tag):
+        # type: (TagRaw) -> TagLITERAL
+        """Turn the raw tag into a literal"""
+        # pylint: disable=protected-access
+        return self._literal(tag, ''.join(child._render(None, None)
+                                          for child in tag.children))
+
+    def _optimize_extends(self, tag):
+        # type: (TagExtends) -> TagExtends
+        """Optimize the tree flattened with the mother template
+
+        The top-level tags not copied by `flatten_tree` are shared with the
+        mother tree (or are the blocks of this template), so that they are
+        copied before being optimized.
+        """
+        flattened = tag.flattened
+        shared = [child for child in flattened.children
+                  if child.parent is not flattened]
+        copies = dict(zip(shared, copy_tags(shared, flattened)))
+        flattened.children = [copies.get(child, child)
+                              for child in flattened.children]
+        self._optimize_children(flattened)
+        return tag
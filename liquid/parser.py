@@ -1,9 +1,10 @@
 """The parser for liquidpy"""
 from collections import deque
-from diot import Diot
 from .config import LIQUID_LOG_INDENT
 from .nodes import NodeScanner
-from .utils import logger
+from .optimizer import Optimizer
+from .utils import logger, Context
+from .environment import Environment
 from .tags import tag_manager
 from .exceptions import LiquidSyntaxError
 
@@ -32,6 +33,15 @@ class Visitor:
         # use to hold the compact
         self._prev_tag = None
 
+    def __getstate__(self):
+        # type: () -> Tuple[None, Dict[str, Any]]
+        """Leave out the states only used while parsing when pickled"""
+        return None, {'root': self.root,
+                      'stack': deque(),
+                      'blocks': self.blocks,
+                      'has_mother': self.has_mother,
+                      '_prev_tag': None}
+
     def visit(self, tag):
         # type: (Tag) -> None
         """Visit the tag
@@ -155,28 +165,42 @@ class Parser:
     Attibutes:
         NODESCANNER_CLASS: The node scanner class
         VISITOR_CLASS: The visitor class
+        OPTIMIZER_CLASS: The optimizer class, to optimize the parsed
+            template. The tree is kept as parsed in debug mode, so that
+            the rendering of each tag is logged
 
         config: The configuration
         context: The context
         parent: The parent parser
         nodescanner: The node scanner
         visitor: The visitor for tags
+        env: The environment to resolve the templates included or extended
 
     Args:
         meta: The template meta data
         config: The configuration
         context: The context
         level: The level of the parser
+        env: The environment, a new one with the configuration if not given
     """
-    __slots__ = ('config', 'context', 'parent', 'nodescanner', 'visitor')
+    __slots__ = ('config', 'context', 'parent', 'nodescanner', 'visitor',
+                 'env')
 
     NODESCANNER_CLASS = NodeScanner # type: Type[NodeScanner]
     VISITOR_CLASS = Visitor # type: Type[Visitor]
+    OPTIMIZER_CLASS = Optimizer # type: Type[Optimizer]
 
-    def __init__(self, meta, config, context=None, level=0):
-        # type: (TemplateMeta, Dict, Optional[Diot], Optional[int]) -> None
+    def __init__(self, # pylint: disable=too-many-arguments
+                 meta,
+                 config,
+                 context=None,
+                 level=0,
+                 env=None):
+        # type: (TemplateMeta, Dict, Optional[Context], Optional[int],
+        #        Optional[Environment]) -> None
         self.config = config
-        self.context = context or Diot(
+        self.env = env or Environment(config)
+        self.context = context or Context(
             name=meta.name,
             path=meta.path,
             stream=meta.stream,
@@ -196,6 +220,17 @@ class Parser:
             parser=self
         ))
 
+    def __getstate__(self):
+        # type: () -> Tuple[None, Dict[str, Any]]
+        """Leave out the node scanner when pickled, which is only used
+        while parsing"""
+        return None, {'config': self.config,
+                      'context': self.context,
+                      'parent': self.parent,
+                      'nodescanner': None,
+                      'visitor': self.visitor,
+                      'env': self.env}
+
     def parse(self):
         # type: () -> Tag
         """Parser the template for later rendering.
@@ -213,6 +248,8 @@ class Parser:
 
             if scanned is False:
                 self.visitor.root.parse()
+                if not self.config.debug:
+                    self.OPTIMIZER_CLASS(self).optimize(self.visitor.root)
                 logger.debug('%s  END PARSING.',
                              self.context.level * LIQUID_LOG_INDENT)
                 break
@@ -0,0 +1,116 @@
+"""The analyzer for python mode"""
+# pylint: disable=relative-beyond-top-level
+import builtins
+from ..analyzer import Analyzer as AnalyzerStandard
+from .filters import filter_manager
+from .tags.tag__inherited import (
+    TagOUTPUT,
+    TagBreak,
+    TagCase,
+    TagCOMMENT,
+    TagConfig,
+    TagContinue,
+    TagCycle,
+    TagElsif,
+    TagWhen
+)
+from .tags.tag_assign import TagAssign
+from .tags.tag_else import TagElse
+from .tags.tag_for import TagFor
+from .tags.tag_if import TagIf
+from .tags.tag_unless import TagUnless
+from .tags.tag_while import TagWhile
+from .tags.transformer import (
+    TagSegmentFilter,
+    TagSegmentGetAttr,
+    TagSegmentGetItem,
+    TagSegmentLambda
+)
+from ..utils import NOTHING, Scope
+
+class Analyzer(AnalyzerStandard):
+    """Find the references of a parsed template in python mode
+
+    The python, import and from tags are not known to the analyzer, since
+    the code in them could refer to anything. The names of the python's
+    builtins are not taken as variables from the context.
+    """
+    HANDLERS = AnalyzerStandard.HANDLERS.copy()
+    HANDLERS.update({
+        TagAssign: '_analyze_assign',
+        TagCOMMENT: '_skip',
+        TagConfig: '_skip',
+        TagFor: '_analyze_loop',
+    })
+
+    SEGMENT_HANDLERS = AnalyzerStandard.SEGMENT_HANDLERS.copy()
+    SEGMENT_HANDLERS.update({
+        TagSegmentFilter: '_walk_filter',
+        TagSegmentLambda: '_walk_lambda',
+    })
+
+    KNOWN = AnalyzerStandard.KNOWN + (
+        TagOUTPUT,
+        TagAssign,
+        TagBreak,
+        TagCase,
+        TagCOMMENT,
+        TagConfig,
+        TagContinue,
+        TagCycle,
+        TagElse,
+        TagElsif,
+        TagFor,
+        TagIf,
+        TagUnless,
+        TagWhen,
+        TagWhile,
+    )
+
+    FILTER_MANAGER = filter_manager
+    GETATTR_SEGMENT = TagSegmentGetAttr
+    GETITEM_SEGMENT = TagSegmentGetItem
+    BUILTINS = frozenset(dir(builtins))
+
+    def _walk_filter(self, segment, bindings):
+        # type: (TagSegment, Scope) -> None
+        """Walk the filters called by names, the lambdas and the ternary
+        filters, with the placeholder `_` bound in the arguments"""
+        if len(segment) != 2:
+            # lambda or ternary
+            self._walk(segment.data, bindings)
+            return
+
+        name, args = segment.data
+        filter_type = 'normal'
+        if isinstance(name, tuple):
+            name, filter_type = name
+        if isinstance(name, tuple):
+            # star or keyword filters, i.e. `*varname` or `**varname`
+            name, filter_type = name
+        if filter_type == 'complex':
+            self._walk(name, bindings)
+        elif filter_type not in ('dot', 'subscript'):
+            self._filter(str(name), bindings)
+        if args not in (None, NOTHING):
+            self._walk(args, Scope(bindings, {'_': None}))
+
+    def _walk_lambda(self, segment, bindings):
+        # type: (TagSegmentLambda, Scope) -> None
+        """Walk the body of a lambda with its arguments bound"""
+        arglist, body = segment.data
+        names = {} # type: Dict[str, None]
+        for name, default in arglist.data if arglist else ():
+            names[str(name)] = None
+            self._walk(default, bindings)
+        self._walk(body, Scope(bindings, names))
+
+    def _analyze_loop(self, tag, bindings):
+        # type: (Tag, Scope) -> None
+        varnames, value = tag.parsed
+        self._walk(value, bindings)
+        iterable = self._alias(value, bindings)
+        inside = Scope(bindings, dict.fromkeys(varnames))
+        if len(varnames) == 1 and iterable is not None:
+            inside[varnames[0]] = f'{iterable}[]'
+        self._analyze_children(tag, inside)
@@ -0,0 +1,24 @@
+"""The compiler for python mode"""
+# pylint: disable=relative-beyond-top-level
+from ..compiler import Compiler as CompilerStandard
+from .tags.tag__inherited import TagOUTPUT, TagCOMMENT
+from .tags.tag_assign import TagAssign
+
+class Compiler(CompilerStandard):
+    """Compile the parsed templates in python mode"""
+    HANDLERS = CompilerStandard.HANDLERS.copy()
+    HANDLERS.update({
+        TagOUTPUT: '_compile_output',
+        TagCOMMENT: '_compile_nothing',
+        TagAssign: '_compile_assign_local',
+    })
+
+    def _compile_assign_local(self, tag, local_vars, write):
+        # type: (Tag, str, str) -> None
+        # pylint: disable=unused-argument
+        """Assign the rendered output to the local variables only"""
+        varname, output = tag.parsed
+        with self._try(tag):
+            self._emit(f'{local_vars}[{varname!r}] = '
+                       f'{self._const(output, "seg")}.render('
+                       f'{local_vars}, global_vars)')
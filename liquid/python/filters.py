@@ -5,6 +5,7 @@ class FilterManager(FilterManagerStandard):
     """A manager for filters in extended mode"""
     INSTANCE = None
     filters = FilterManagerStandard.filters.copy() # type: Dict[str, Callable]
+    pure = FilterManagerStandard.pure.copy() # type: Set[str]
 
 # pylint: disable=invalid-name
 filter_manager = FilterManager()
@@ -17,13 +18,15 @@ def _no_emptydrop(name):
         if isinstance(ret, EmptyDrop):
             return args[0]
         return ret
-    filter_manager.register(name)(new_filter)
+    filter_manager.register(name, pure=name in filter_manager.pure)(
+        new_filter
+    )
 
 for filter_name in ('reverse', 'sort', 'sort_natural', 'slice',
                     'uniq', 'where', 'first', 'last', 'compact'):
     _no_emptydrop(filter_name)
 
-@filter_manager.register
+@filter_manager.register(pure=True)
 def getitem(base, index):
     """Get an item from the base value"""
     return base[index]
@@ -33,11 +36,15 @@ def render(base, **envs):
     """Render a template in python mode"""
     import sys
     from ..liquid import LiquidPython
-    from ..config import LIQUID_FILTERS_ENVNAME
+    from ..config import LIQUID_FILTERS_ENVNAME, LIQUID_FRAME_ENVNAME
+    from ..utils import Scope
     frame = sys._getframe(2)
     local_vars = frame.f_locals['local_vars']
     global_vars = frame.f_locals['global_vars'].copy()
-    global_vars.update(local_vars)
+    global_vars.update(local_vars.merged()
+                       if isinstance(local_vars, Scope)
+                       else local_vars)
     global_vars.update(envs)
     del global_vars[LIQUID_FILTERS_ENVNAME]
+    global_vars.pop(LIQUID_FRAME_ENVNAME, None)
     return LiquidPython(base).render(**global_vars)
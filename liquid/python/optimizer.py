@@ -0,0 +1,148 @@
+"""The optimizer for python mode"""
+# pylint: disable=relative-beyond-top-level
+from ..optimizer import Optimizer as OptimizerStandard, _FAILED
+from .filters import filter_manager
+from .tags.tag__inherited import (
+    TagOUTPUT,
+    TagBreak,
+    TagCase,
+    TagCOMMENT,
+    TagConfig,
+    TagContinue,
+    TagCycle,
+    TagElsif,
+    TagWhen
+)
+from .tags.tag_assign import TagAssign
+from .tags.tag_else import TagElse
+from .tags.tag_for import TagFor
+from .tags.tag_if import TagIf
+from .tags.tag_unless import TagUnless
+from .tags.tag_while import TagWhile
+from .tags.transformer import (
+    TagSegmentAnd,
+    TagSegmentExpr,
+    TagSegmentFactor,
+    TagSegmentFilter,
+    TagSegmentGetAttr,
+    TagSegmentGetItem,
+    TagSegmentIfelse,
+    TagSegmentList,
+    TagSegmentNot,
+    TagSegmentOr,
+    TagSegmentPower,
+    TagSegmentSlice,
+    TagSegmentTuple,
+    TagSegmentVar
+)
+from ..tags.transformer import (
+    TagSegment,
+    TagSegmentArguments,
+    TagSegmentComparison,
+    TagSegmentOutput
+)
+from ..utils import NOTHING
+
+class Optimizer(OptimizerStandard):
+    """Fold the constants in a parsed template in python mode
+
+    The function calls are never evaluated at parse time, since the
+    functions are not known to be pure.
+    """
+    HANDLERS = OptimizerStandard.HANDLERS.copy()
+    HANDLERS.update({
+        TagOUTPUT: '_fold_output',
+        TagAssign: '_fold_assign',
+        TagCOMMENT: '_remove',
+        TagConfig: '_remove',
+        TagElse: '_fold_test',
+        TagElsif: '_fold_test',
+        TagIf: '_fold_test',
+        TagUnless: '_fold_test',
+    })
+
+    SEGMENTS = (
+        TagSegmentAnd,
+        TagSegmentArguments,
+        TagSegmentComparison,
+        TagSegmentExpr,
+        TagSegmentFactor,
+        TagSegmentFilter,
+        TagSegmentGetAttr,
+        TagSegmentGetItem,
+        TagSegmentIfelse,
+        TagSegmentList,
+        TagSegmentNot,
+        TagSegmentOr,
+        TagSegmentOutput,
+        TagSegmentPower,
+        TagSegmentSlice,
+        TagSegmentTuple,
+    )
+
+    FILTER_SEGMENT = TagSegmentFilter
+    FILTER_MANAGER = filter_manager
+    VAR_SEGMENT = TagSegmentVar
+
+    BINDINGS = OptimizerStandard.BINDINGS.copy()
+    BINDINGS.update({
+        TagAssign: '_bound_assign',
+        TagFor: '_bound_loop',
+    })
+
+    UNBOUND = OptimizerStandard.UNBOUND + (
+        TagOUTPUT,
+        TagBreak,
+        TagCase,
+        TagCOMMENT,
+        TagConfig,
+        TagContinue,
+        TagCycle,
+        TagElse,
+        TagElsif,
+        TagIf,
+        TagUnless,
+        TagWhen,
+        TagWhile,
+    )
+
+    def _pure(self, segment):
+        # type: (TagSegment) -> bool
+        """Only the filters called by names (`varname: arguments`) can be
+        pure, not the lambdas, the ternary filters or the other types"""
+        if len(segment) != 2:
+            return False
+        name = segment.data[0]
+        return (isinstance(name, TagSegmentVar) and
+                str(name) in self.filters)
+
+    def _taken(self, tag):
+        # type: (Tag) -> Optional[bool]
+        # the exact classes, since TagElse and TagUnless are subclasses of
+        # TagIf here
+        # pylint: disable=unidiomatic-typecheck
+        if type(tag) is TagElse and tag.parsed is NOTHING:
+            return True
+        # the parsing might be held (i.e. inside a block)
+        if tag.parsed is None:
+            return None
+        if type(tag) is TagFor:
+            # the else branch is rendered if nothing to loop over
+            return False if self._empty_loop(tag) else None
+        if (type(tag) not in (TagIf, TagElsif, TagElse, TagUnless) or
+                isinstance(tag.parsed, TagSegment)):
+            return None
+        return bool(tag.parsed) is not (type(tag) is TagUnless)
+
+    @staticmethod
+    def _bound_loop(tag):
+        # type: (Tag) -> Iterable[str]
+        return tag.parsed[0]
+
+    def _empty_loop(self, tag):
+        # type: (Tag) -> bool
+        _, value = tag.parsed
+        if not self.fold_constants or not self._constant(value):
+            return False
+        value = self._evaluate(value)
+        return value is not _FAILED and not value
@@ -1,6 +1,7 @@
 """BLock parser to parse the text into blocks in python mode"""
 # pylint: disable=relative-beyond-top-level
 from .tags import tag_manager # pylint: disable=unused-import
+from .optimizer import Optimizer
 from ..parser import Parser as ParserStandard
 from ..nodes import (
     Node as NodeStandard,
@@ -30,3 +31,4 @@ class Parser(ParserStandard):
     # pylint: disable=too-few-public-methods
     """Parsing text into blocks in python mode"""
     NODESCANNER_CLASS = NodeScanner
+    OPTIMIZER_CLASS = Optimizer
@@ -71,7 +71,10 @@ class TagCase(TagOUTPUT, use_parser=True):
     """The case tag"""
     VOID = False
     __init__ = TagCaseStandard.__init__
-    _render = TagCaseStandard._render
+    _render_to = TagCaseStandard._render_to
+    _render_whens_to = TagCaseStandard._render_whens_to
+    _render_to_async = TagCaseStandard._render_to_async
+    _render_whens_to_async = TagCaseStandard._render_whens_to_async
 
 @tag_manager.register
 class TagWhen(TagOUTPUT, use_parser=True):
@@ -79,7 +82,8 @@ class TagWhen(TagOUTPUT, use_parser=True):
     VOID = TagWhenStandard.VOID
     PARENT = TagWhenStandard.PARENT_TAGS
     ELDER_TAGS = TagWhenStandard.ELDER_TAGS
-    _render = TagWhenStandard._render
+    _render_to = TagWhenStandard._render_to
+    _render_to_async = TagWhenStandard._render_to_async
 
 @v_args(inline=True)
 class TagConfigTransformer(TagTransformer, TagConfigTransformerStandard):
@@ -50,9 +50,18 @@ class TagElse(TagIf):
             )
 
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
         if self.parsed is NOTHING:
-            return self._render_children(local_vars, global_vars)
+            self._render_children_to(write, local_vars, global_vars)
+        else:
+            super()._render_to(write, local_vars, global_vars)
 
-        return super()._render(local_vars, global_vars)
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if self.parsed is NOTHING:
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
+        else:
+            await super()._render_to_async(write, local_vars, global_vars)
@@ -2,7 +2,8 @@
 from lark import v_args
 from .transformer import TagTransformer
 from .inherited import Tag, tag_manager
-from ...tags.transformer import render_segment
+from ...tags.transformer import render_segment, render_segment_async
+from ...utils import render_frame, LoopState, Scope
 
 @v_args(inline=True)
 class TagForTransformer(TagTransformer):
@@ -17,30 +18,60 @@ class TagForTransformer(TagTransformer):
 class TagFor(Tag):
     """The for tag
 
-    Attributes:
-        flag_break: The flag for break statement
-        flag_continue: The flag for continue statement
-        cycles: The cycle object for cycle tags
+    The flags for break/continue statements are kept in the render frame,
+    see `liquid.utils.LoopState`.
     """
-    __slots__ = Tag.__slots__ + ('flag_break', 'flag_continue')
 
     START = 'tag_for'
     GRAMMAR = 'tag_for: var ("," var)* "in" output'
     TRANSFORMER = TagForTransformer()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.flag_break = False      # type: bool
-        self.flag_continue = False   # type: bool
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            self._render_loop_to(write, local_vars, global_vars, state)
 
+    def _render_loop_to(self, write, local_vars, global_vars, state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop with the flags set by break/continue tags"""
+        varnames, value = self.parsed
+        value = render_segment(value, local_vars, global_vars)
+        local_vars_inside = Scope(local_vars, {})
+        for elem in value:
+            if not isinstance(elem, (tuple, list)):
+                elem = (elem,)
+            for i, varname in enumerate(varnames):
+                local_vars_inside[varname] = elem[i]
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
+            for child in self.children:
+                child.render_to(write, local_vars_inside, global_vars)
+                if state.flag_continue or state.flag_break:
+                    state.flag_continue = False
+                    break
+            if state.flag_break:
+                break
 
+        if not value or not state.flag_break: # for ... else
+            self._render_next_to(write, local_vars, global_vars, True)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            await self._render_loop_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             state)
+
+    async def _render_loop_to_async(self,
+                                    write,
+                                    local_vars,
+                                    global_vars,
+                                    state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop in an asyncio event loop"""
         varnames, value = self.parsed
-        value = render_segment(value, local_vars, global_vars)
-        local_vars_inside = local_vars.copy()
+        value = await render_segment_async(value, local_vars, global_vars)
+        local_vars_inside = Scope(local_vars, {})
         for elem in value:
             if not isinstance(elem, (tuple, list)):
                 elem = (elem,)
@@ -48,15 +79,17 @@ class TagFor(Tag):
                 local_vars_inside[varname] = elem[i]
 
             for child in self.children:
-                child_rendered, _ = child.render(local_vars_inside,
-                                                 global_vars)
-                rendered += child_rendered
-                if self.flag_continue or self.flag_break:
-                    self.flag_continue = False
+                await child.render_to_async(write,
+                                            local_vars_inside,
+                                            global_vars)
+                if state.flag_continue or state.flag_break:
+                    state.flag_continue = False
                     break
-            if self.flag_break:
+            if state.flag_break:
                 break
 
-        if not value or not self.flag_break: # for ... else
-            rendered += self._render_next(local_vars, global_vars, True)
-        return rendered
+        if not value or not state.flag_break: # for ... else
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
@@ -1,7 +1,7 @@
 """Tag if"""
 from .transformer import TagTransformer
 from .inherited import tag_manager, BASE_GRAMMAR
-from ...tags.transformer import render_segment
+from ...tags.transformer import render_segment, render_segment_async
 from ...tags.tag_if import TagIf as TagIfStandard
 
 @tag_manager.register
@@ -15,16 +15,21 @@ class TagIf(TagIfStandard):
     TRANSFORMER = TagTransformer()
     BASE_GRAMMAR = BASE_GRAMMAR
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if render_segment(self.parsed, local_vars, global_vars):
+            self._render_children_to(write, local_vars, global_vars)
+        else:
+            self._render_next_to(write, local_vars, global_vars, True)
 
-        expr = render_segment(self.parsed, local_vars, global_vars)
-        from_elder = True
-        if expr:
-            # don't go next
-            from_elder = False
-            rendered += self._render_children(local_vars, global_vars)
-
-        rendered += self._render_next(local_vars, global_vars, from_elder)
-        return rendered
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if await render_segment_async(self.parsed, local_vars, global_vars):
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
+        else:
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
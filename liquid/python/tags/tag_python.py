@@ -33,3 +33,14 @@ class TagPython(Tag):
         return exec(textwrap.dedent(str(children_rendered)),
                     global_vars,
                     local_vars) or ''
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        # pylint: disable=exec-used
+        if self.VOID:
+            return exec(self.content, global_vars, local_vars) or ''
+        children_rendered = await self._render_children_async(local_vars,
+                                                              global_vars)
+        return exec(textwrap.dedent(str(children_rendered)),
+                    global_vars,
+                    local_vars) or ''
@@ -1,21 +1,28 @@
 """Tag unless"""
 from .inherited import tag_manager
 from .tag_if import TagIf
-from ...tags.transformer import render_segment
+from ...tags.transformer import render_segment, render_segment_async
 
 @tag_manager.register
 class TagUnless(TagIf, use_parser=True):
     """Tag unless, with no emptydrop stuff"""
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if not render_segment(self.parsed, local_vars, global_vars):
+            self._render_children_to(write, local_vars, global_vars)
+        else:
+            self._render_next_to(write, local_vars, global_vars, True)
 
-        expr = render_segment(self.parsed, local_vars, global_vars)
-        from_elder = True
-        if not expr:
-            # don't go next
-            from_elder = False
-            rendered += self._render_children(local_vars, global_vars)
-
-        rendered += self._render_next(local_vars, global_vars, from_elder)
-        return rendered
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if not await render_segment_async(self.parsed,
+                                          local_vars,
+                                          global_vars):
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
+        else:
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
@@ -2,43 +2,85 @@
 import copy
 from .inherited import tag_manager
 from .tag_if import TagIf
-from ...tags.transformer import render_segment
+from ...tags.transformer import render_segment, render_segment_async
+from ...utils import render_frame, LoopState, Scope
 
 @tag_manager.register
 class TagWhile(TagIf):
-    """The for tag
+    """The while tag
 
-    Attributes:
-        flag_break: The flag for break statement
-        flag_continue: The flag for continue statement
+    The flags for break/continue statements are kept in the render frame,
+    see `liquid.utils.LoopState`.
     """
-    __slots__ = TagIf.__slots__ + ('flag_break', 'flag_continue')
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.flag_continue = False # type: bool
-        self.flag_break = False    # type: bool
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            self._render_loop_to(write, local_vars, global_vars, state)
 
-
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
+    def _render_loop_to(self, write, local_vars, global_vars, state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop with the flags set by break/continue tags"""
         value = render_segment(self.parsed, local_vars, global_vars)
         value0 = copy.copy(value)
-        local_vars_copy = None
+        local_vars_inside = None
+        while value:
+            if local_vars_inside is None:
+                local_vars_inside = Scope(local_vars, {})
+            for child in self.children:
+                child.render_to(write, local_vars_inside, global_vars)
+                if state.flag_break or state.flag_continue:
+                    state.flag_continue = False
+                    break
+            if state.flag_break:
+                break
+
+            value = render_segment(self.parsed,
+                                   local_vars_inside,
+                                   global_vars)
+
+        if not value0 or not state.flag_break: # while ... else
+            self._render_next_to(write, local_vars, global_vars, True)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            await self._render_loop_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             state)
+
+    async def _render_loop_to_async(self,
+                                    write,
+                                    local_vars,
+                                    global_vars,
+                                    state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop in an asyncio event loop"""
+        value = await render_segment_async(self.parsed,
+                                           local_vars,
+                                           global_vars)
+        value0 = copy.copy(value)
+        local_vars_inside = None
         while value:
-            local_vars_copy = local_vars_copy or local_vars.copy()
+            if local_vars_inside is None:
+                local_vars_inside = Scope(local_vars, {})
             for child in self.children:
-                child_rendered, _ = child.render(local_vars_copy, global_vars)
-                rendered += child_rendered
-                if self.flag_break or self.flag_continue:
-                    self.flag_continue = False
+                await child.render_to_async(write,
+                                            local_vars_inside,
+                                            global_vars)
+                if state.flag_break or state.flag_continue:
+                    state.flag_continue = False
                     break
-            if self.flag_break:
+            if state.flag_break:
                 break
 
-            value = render_segment(self.parsed, local_vars_copy, global_vars)
+            value = await render_segment_async(self.parsed,
+                                               local_vars_inside,
+                                               global_vars)
 
-        if not value0 or not self.flag_break: # while ... else
-            rendered += self._render_next(local_vars, global_vars, True)
-        return rendered
+        if not value0 or not state.flag_break: # while ... else
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
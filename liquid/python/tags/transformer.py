@@ -4,13 +4,15 @@ from functools import partialmethod
 from lark import v_args, Token
 from ...config import LIQUID_FILTERS_ENVNAME
 from ...tags.transformer import (
+    await_value,
     render_segment,
+    render_segment_async,
     TagSegment,
     TagSegmentComparison,
     TagSegmentVar as TagSegmentVarStandard,
     TagTransformer as TagTransformerStandard
 )
-from ...utils import NOTHING
+from ...utils import NOTHING, Scope
 from ...filters import EmptyDrop
 
 class TagSegmentVar(TagSegmentVarStandard):
@@ -24,6 +26,11 @@ class TagSegmentVar(TagSegmentVarStandard):
             return local_vars.get(varname, global_vars.get(varname))
         return var
 
+    async def render_async(self, local_vars, global_vars):
+        """Get the value of a variable from envs and wait for it"""
+        return await await_value(self._lookup(local_vars, global_vars),
+                                 global_vars)
+
 class TagSegmentIfelse(TagSegment):
     """The ternary operation in python: `A if cond else B`"""
     def render(self, local_vars, global_vars):
@@ -35,6 +42,21 @@ class TagSegmentIfelse(TagSegment):
             return render_segment(self.data[0], local_vars, global_vars)
         return render_segment(self.data[2], local_vars, global_vars)
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """Render the segment with the given envs in an asyncio event loop
+        """
+        cond = await render_segment_async(self.data[1],
+                                          local_vars,
+                                          global_vars)
+        if cond:
+            return await render_segment_async(self.data[0],
+                                              local_vars,
+                                              global_vars)
+        return await render_segment_async(self.data[2],
+                                          local_vars,
+                                          global_vars)
+
 class TagSegmentOr(TagSegment):
     """Or statement in python"""
     def render(self, local_vars, global_vars):
@@ -46,6 +68,15 @@ class TagSegmentOr(TagSegment):
                 return data
         return False
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        for data in self.data:
+            data = await render_segment_async(data, local_vars, global_vars)
+            if data:
+                return data
+        return False
+
 class TagSegmentAnd(TagSegment):
     """And statement in python"""
     def render(self, local_vars, global_vars):
@@ -59,6 +90,17 @@ class TagSegmentAnd(TagSegment):
             lastdata = data
         return lastdata
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        lastdata = None
+        for data in self.data:
+            data = await render_segment_async(data, local_vars, global_vars)
+            if not data:
+                return data
+            lastdata = data
+        return lastdata
+
 class TagSegmentNot(TagSegment):
     """Not statement in python"""
     def render(self, local_vars, global_vars):
@@ -66,21 +108,43 @@ class TagSegmentNot(TagSegment):
         """render the segment"""
         return not render_segment(self.data[0], local_vars, global_vars)
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        return not await render_segment_async(self.data[0],
+                                              local_vars,
+                                              global_vars)
+
 class TagSegmentGetAttr(TagSegment):
     """Getattr operation in python"""
     def render(self, local_vars, global_vars):
         # type: (dict, dict) -> Any
         """render the segment"""
         obj = render_segment(self.data[0], local_vars, global_vars)
+        return self._getattr(obj, self.data[1])
+
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment and wait for the attribute"""
+        obj = await render_segment_async(self.data[0],
+                                         local_vars,
+                                         global_vars)
+        return await await_value(self._getattr(obj, self.data[1]),
+                                 global_vars)
+
+    @staticmethod
+    def _getattr(obj, attr):
+        # type: (Any, str) -> Any
+        """Get the attribute, or the item of obj"""
         try:
-            return getattr(obj, self.data[1])
+            return getattr(obj, attr)
         except AttributeError as exc:
             try:
-                return obj[self.data[1]]
+                return obj[attr]
             except (KeyError, TypeError):
                 raise AttributeError(
                     f'{type(obj).__name__!r} object has '
-                    f'no attribute {self.data[1]!r}'
+                    f'no attribute {attr!r}'
                 ).with_traceback(exc.__traceback__) from None
 
 class TagSegmentGetItem(TagSegment):
@@ -93,39 +157,71 @@ class TagSegmentGetItem(TagSegment):
             render_segment(self.data[1], local_vars, global_vars)
         ]
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment and wait for the item"""
+        obj = await render_segment_async(self.data[0],
+                                         local_vars,
+                                         global_vars)
+        subscript = await render_segment_async(self.data[1],
+                                               local_vars,
+                                               global_vars)
+        return await await_value(obj[subscript], global_vars)
+
 class TagSegmentExpr(TagSegment):
     """Expressions in python"""
     def render(self, local_vars, global_vars):
         # type: (dict, dict) -> Any
         """render the segment"""
-        sign = str(self.data[0])
         ret = render_segment(self.data[1], local_vars, global_vars)
         for data in self.data[2:]:
-            data = render_segment(data, local_vars, global_vars)
-            if sign == '|':
-                ret |= data
-            elif sign == '^':
-                ret ^= data
-            elif sign == '&':
-                ret &= data
-            elif sign == '<<':
-                ret <<= data
-            elif sign == '>>':
-                ret >>= data
-            elif sign == '+':
-                ret += data
-            elif sign == '-':
-                ret -= data
-            elif sign == '*':
-                ret *= data
-            elif sign == '@': # pragma: no cover
-                ret @= data
-            elif sign == '/':
-                ret /= data
-            elif sign == '%':
-                ret %= data
-            elif sign == '//':
-                ret //= data
+            ret = self._operate(
+                ret, render_segment(data, local_vars, global_vars)
+            )
+        return ret
+
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        ret = await render_segment_async(self.data[1],
+                                         local_vars,
+                                         global_vars)
+        for data in self.data[2:]:
+            ret = self._operate(
+                ret,
+                await render_segment_async(data, local_vars, global_vars)
+            )
+        return ret
+
+    def _operate(self, ret, data):
+        # type: (Any, Any) -> Any
+        """Apply the operator to the rendered operands"""
+        # pylint: disable=too-many-branches
+        sign = str(self.data[0])
+        if sign == '|':
+            ret |= data
+        elif sign == '^':
+            ret ^= data
+        elif sign == '&':
+            ret &= data
+        elif sign == '<<':
+            ret <<= data
+        elif sign == '>>':
+            ret >>= data
+        elif sign == '+':
+            ret += data
+        elif sign == '-':
+            ret -= data
+        elif sign == '*':
+            ret *= data
+        elif sign == '@': # pragma: no cover
+            ret @= data
+        elif sign == '/':
+            ret /= data
+        elif sign == '%':
+            ret %= data
+        elif sign == '//':
+            ret //= data
 
         return ret
 
@@ -138,6 +234,17 @@ class TagSegmentPower(TagSegment):
         data2 = render_segment(self.data[1], local_vars, global_vars)
         return data1 ** data2
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        data1 = await render_segment_async(self.data[0],
+                                           local_vars,
+                                           global_vars)
+        data2 = await render_segment_async(self.data[1],
+                                           local_vars,
+                                           global_vars)
+        return data1 ** data2
+
 class TagSegmentFactor(TagSegment):
     """Factor expression in python"""
 
@@ -146,6 +253,19 @@ class TagSegmentFactor(TagSegment):
         """render the segment"""
         factor_op, factor = self.data
         factor = render_segment(factor, local_vars, global_vars)
+        return self._apply(factor_op, factor)
+
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        factor_op, factor = self.data
+        factor = await render_segment_async(factor, local_vars, global_vars)
+        return self._apply(factor_op, factor)
+
+    @staticmethod
+    def _apply(factor_op, factor):
+        # type: (str, Any) -> Any
+        """Apply the unary operator to the rendered factor"""
         if factor_op == '-':
             return -factor
         if factor_op == '~':
@@ -168,6 +288,19 @@ class TagSegmentFuncCall(TagSegment):
         args, kwargs = render_segment(self.data[1], local_vars, global_vars)
         return func(*args, **kwargs)
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment and wait for the result of the call"""
+        func = await render_segment_async(self.data[0],
+                                          local_vars,
+                                          global_vars)
+        if self.data[1] is None:
+            return await await_value(func(), global_vars)
+        args, kwargs = await render_segment_async(self.data[1],
+                                                  local_vars,
+                                                  global_vars)
+        return await await_value(func(*args, **kwargs), global_vars)
+
 class TagSegmentTuple(TagSegment):
     """Tuple literals in python"""
     def render(self, local_vars, global_vars):
@@ -178,6 +311,16 @@ class TagSegmentTuple(TagSegment):
         return tuple(render_segment(data, local_vars, global_vars)
                      for data in self.data[0])
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        if not self.data or self.data[0] is NOTHING:
+            return ()
+        return tuple([
+            await render_segment_async(data, local_vars, global_vars)
+            for data in self.data[0]
+        ])
+
 class TagSegmentList(TagSegment):
     """List literals in python"""
     def render(self, local_vars, global_vars):
@@ -188,6 +331,14 @@ class TagSegmentList(TagSegment):
         return list(render_segment(data, local_vars, global_vars)
                     for data in self.data[0])
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        if not self.data or self.data[0] is NOTHING:
+            return []
+        return [await render_segment_async(data, local_vars, global_vars)
+                for data in self.data[0]]
+
 class TagSegmentSet(TagSegment):
     """Set literals in python"""
     def render(self, local_vars, global_vars):
@@ -196,6 +347,12 @@ class TagSegmentSet(TagSegment):
         return set(render_segment(data, local_vars, global_vars)
                    for data in self.data)
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        return {await render_segment_async(data, local_vars, global_vars)
+                for data in self.data}
+
 class TagSegmentDict(TagSegment):
     """Dict literals in python"""
     def render(self, local_vars, global_vars):
@@ -207,6 +364,15 @@ class TagSegmentDict(TagSegment):
             for key, val in self.data
         }
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        return {
+            await render_segment_async(key, local_vars, global_vars):
+            await render_segment_async(val, local_vars, global_vars)
+            for key, val in self.data
+        }
+
 class TagSegmentSlice(TagSegment):
     """Slice objects in python"""
     def render(self, local_vars, global_vars):
@@ -217,21 +383,52 @@ class TagSegmentSlice(TagSegment):
         return slice(*(render_segment(data, local_vars, global_vars)
                        for data in self.data))
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop"""
+        if len(self.data) == 1:
+            return await render_segment_async(self.data[0],
+                                              local_vars,
+                                              global_vars)
+        return slice(*[
+            await render_segment_async(data, local_vars, global_vars)
+            for data in self.data
+        ])
+
 class TagSegmentLambda(TagSegment):
     """Lambda objects in python"""
     def render(self, local_vars, global_vars):
         # type: (dict, dict) -> Any
         """render the segment"""
-        arglist, body = self.data
+        arglist = self.data[0]
         al_args, al_kwargs = arglist.render(
             local_vars, global_vars, as_is=True
         ) if arglist else ([], {})
+        return self._lambda(local_vars, global_vars, al_args, al_kwargs)
+
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop
+
+        Only the default values of the arguments are waited for. The
+        lambda function is called synchronously (i.e. by the filters), so
+        the awaitable values in its body are left as they are.
+        """
+        arglist = self.data[0]
+        al_args, al_kwargs = await arglist.render_async(
+            local_vars, global_vars, as_is=True
+        ) if arglist else ([], {})
+        return self._lambda(local_vars, global_vars, al_args, al_kwargs)
+
+    def _lambda(self, local_vars, global_vars, al_args, al_kwargs):
+        # type: (dict, dict, List[str], Dict[str, Any]) -> Callable
+        """Make the lambda function with the rendered arguments"""
+        body = self.data[1]
         al_kwargs_keys = list(al_kwargs.keys())
         len_al_args = len(al_args)
 
         def lambdafunc(*args, **kwargs):
-            local_vars_inside = local_vars.copy()
-            local_vars_inside.update(al_kwargs)
+            local_vars_inside = Scope(local_vars, al_kwargs)
             local_vars_inside.update(kwargs)
             for i, arg in enumerate(args):
                 if i < len_al_args:
@@ -277,6 +474,21 @@ class TagSegmentFilter(TagSegment):
             raise self._no_such_filter(name_token, type(exc)) from None
         return filter_func
 
+    async def _get_filter_by_name_async(self, local_vars, global_vars,
+                                        name_token, complex=False):
+        # pylint: disable=redefined-builtin
+        if not complex:
+            return self._get_filter_by_name(local_vars,
+                                            global_vars,
+                                            name_token)
+        try:
+            filter_func = await render_segment_async(name_token,
+                                                     local_vars,
+                                                     global_vars)
+        except Exception as exc:
+            raise self._no_such_filter(name_token, type(exc)) from None
+        return filter_func
+
     def _render_lambda(self, local_vars, global_vars):
         return self.data[0].render(local_vars, global_vars)
 
@@ -302,6 +514,27 @@ class TagSegmentFilter(TagSegment):
 
         return filter_ternary
 
+    def _render_ternary_async(self, local_vars, global_vars):
+        condfilter, truth, falsity = self.data
+
+        async def apply(filter_seg, base):
+            filter_func = await filter_seg.render_async(local_vars,
+                                                        global_vars)
+            return await await_value(filter_func(base), global_vars)
+
+        async def filter_ternary(base):
+            cond = await apply(condfilter, base) if condfilter else base
+            branch = truth if cond else falsity
+            if isinstance(branch, TagSegmentFilter):
+                return await apply(branch, base)
+            if branch is None:
+                return base
+            return await render_segment_async(branch,
+                                              local_vars,
+                                              global_vars)
+
+        return filter_ternary
+
     def _render_normal(self,  # pylint: disable=too-many-arguments
                        local_vars,
                        global_vars,
@@ -311,16 +544,35 @@ class TagSegmentFilter(TagSegment):
         if filter_arg is None:
             filter_args, filter_kwargs = [], {}
         else:
-            local_vars_copy = local_vars.copy()
-            local_vars_copy['_'] = NOTHING
             filter_args, filter_kwargs = filter_arg.render(
-                local_vars_copy, global_vars
+                Scope(local_vars, {'_': NOTHING}), global_vars
             )
 
         filter_func = self._get_filter_by_name(
             local_vars, global_vars, filter_name, filter_type == 'complex'
         )
+        return self._normal_function(filter_func, filter_args, filter_kwargs)
+
+    async def _render_normal_async(self,  # pylint: disable=too-many-arguments
+                                   local_vars,
+                                   global_vars,
+                                   filter_name,
+                                   filter_arg,
+                                   filter_type):
+        if filter_arg is None:
+            filter_args, filter_kwargs = [], {}
+        else:
+            filter_args, filter_kwargs = await filter_arg.render_async(
+                Scope(local_vars, {'_': NOTHING}), global_vars
+            )
 
+        filter_func = await self._get_filter_by_name_async(
+            local_vars, global_vars, filter_name, filter_type == 'complex'
+        )
+        return self._normal_function(filter_func, filter_args, filter_kwargs)
+
+    @staticmethod
+    def _normal_function(filter_func, filter_args, filter_kwargs):
         def filter_function(base):
             args = filter_args
             if NOTHING in args:
@@ -331,6 +583,13 @@ class TagSegmentFilter(TagSegment):
             return filter_func(*args, **filter_kwargs)
         return filter_function
 
+    @staticmethod
+    def _subname(filter_name):
+        # start, keyword
+        if isinstance(filter_name, tuple):
+            return filter_name
+        return filter_name, 'normal'
+
     def _render_other(self,  # pylint: disable=too-many-arguments
                       local_vars,
                       global_vars,
@@ -343,6 +602,42 @@ class TagSegmentFilter(TagSegment):
             filter_args, filter_kwargs = filter_arg.render(
                 local_vars, global_vars
             )
+        filter_func = None
+        if filter_type not in ('dot', 'subscript'):
+            subname, subtype = self._subname(filter_name)
+            filter_func = self._get_filter_by_name(
+                local_vars, global_vars, subname, subtype == 'complex'
+            )
+        return self._other_function(filter_name, filter_type, filter_func,
+                                    filter_args, filter_kwargs)
+
+    async def _render_other_async(self,  # pylint: disable=too-many-arguments
+                                  local_vars,
+                                  global_vars,
+                                  filter_name,
+                                  filter_arg,
+                                  filter_type):
+        if filter_arg is None:
+            filter_args, filter_kwargs = [], {}
+        else:
+            filter_args, filter_kwargs = await filter_arg.render_async(
+                local_vars, global_vars
+            )
+        filter_func = None
+        if filter_type not in ('dot', 'subscript'):
+            subname, subtype = self._subname(filter_name)
+            filter_func = await self._get_filter_by_name_async(
+                local_vars, global_vars, subname, subtype == 'complex'
+            )
+        return self._other_function(filter_name, filter_type, filter_func,
+                                    filter_args, filter_kwargs)
+
+    def _other_function(self,  # pylint: disable=too-many-arguments
+                        filter_name,
+                        filter_type,
+                        named_filter,
+                        filter_args,
+                        filter_kwargs):
         filtname = str(filter_name)
 
         def filter_function(base):
@@ -364,17 +659,10 @@ class TagSegmentFilter(TagSegment):
                     ) from None
 
                 return filter_func(*filter_args, **filter_kwargs)
-            # start, keyword
-            subtype = 'normal'
-            subname = filter_name
-            if isinstance(filter_name, tuple):
-                subname, subtype = filter_name
-            filter_func = self._get_filter_by_name(
-                local_vars, global_vars, subname, subtype == 'complex'
-            )
+
             if filter_type == 'star':
-                return filter_func(*base, *filter_args, **filter_kwargs)
-            return filter_func(*filter_args, **base, **filter_kwargs)
+                return named_filter(*base, *filter_args, **filter_kwargs)
+            return named_filter(*filter_args, **base, **filter_kwargs)
 
         return filter_function
 
@@ -400,6 +688,34 @@ class TagSegmentFilter(TagSegment):
 
         return self._render_ternary(local_vars, global_vars)
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """render the segment in an asyncio event loop
+
+        The result of the filter returned is not waited for, which is done
+        by the output segment.
+        """
+        if len(self) == 1: # lambda
+            return await self.data[0].render_async(local_vars, global_vars)
+
+        if len(self) == 2: # varname: arguments
+            filter_name, filter_arg = self.data
+            filter_type = 'normal'
+            if isinstance(filter_name, tuple):
+                filter_name, filter_type = filter_name
+
+            if filter_type in ('normal', 'complex'):
+                return await self._render_normal_async(
+                    local_vars, global_vars,
+                    filter_name, filter_arg, filter_type
+                )
+
+            return await self._render_other_async(local_vars, global_vars,
+                                                  filter_name, filter_arg,
+                                                  filter_type)
+
+        return self._render_ternary_async(local_vars, global_vars)
+
 @v_args(inline=True)
 class TagTransformer(TagTransformerStandard):
     """Transformer for python grammar"""
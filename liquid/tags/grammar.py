@@ -93,7 +93,7 @@ class Grammar:
         Args:
             other: The other grammar
         """
-        other_grammar = (other if isinstance(other, Grammar)
+        other_grammar = (other.grammar if isinstance(other, Grammar)
                          else self._load(other))
         for name, content in other_grammar.items():
             if (name[0] == '%' and
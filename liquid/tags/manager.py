@@ -105,5 +105,21 @@ class TagManager(Singleton):
             return None
         return self.tags[tagname if tagname == name else 'END']
 
+    def warmup(self):
+        # type: () -> int
+        """Build the parsers of all the registered tags
+
+        The parsers are built on first use by default. This is for the ones
+        who would rather pay the cost up front, i.e. servers.
+
+        Returns:
+            The number of the tag parsers
+        """
+        parsers = {tag_class.PARSER for tag_class in self.tags.values()
+                   if tag_class.PARSER is not None}
+        for parser in parsers:
+            parser.build()
+        return len(parsers)
+
 # pylint: disable=invalid-name
 tag_manager = TagManager() # type: TagManager
@@ -6,7 +6,7 @@ from lark import LarkError
 from .grammar import Grammar
 from .transformer import TagTransformer
 from ..config import LIQUID_LOG_INDENT
-from ..utils import shorten, logger, RequiredTags, get_tag_parser
+from ..utils import shorten, logger, RequiredTags, LazyTagParser
 from ..exceptions import LiquidSyntaxError, LiquidRenderError
 
 
@@ -14,7 +14,8 @@ class Tag: # pylint: disable=too-many-instance-attributes
     """The base class for all tags.
 
     Subclass should provide `start`, `grammar`, `transformer`, `base_grammar`
-    via `__init_subclass__` to initialize a PARSER for the tag.
+    via `__init_subclass__` to initialize a PARSER for the tag. The PARSER
+    is built lazily on first use.
 
     If start is None, meaning no parser needed for this tag.
 
@@ -34,6 +35,10 @@ class Tag: # pylint: disable=too-many-instance-attributes
         RAW: Whether all content should be treated as raw
         PARSER: Parser to parse the content
         BASE_GRAMMAR: The base grammar
+        SHARED_PARSER: Whether to share the parser with the other tags with
+            the same BASE_GRAMMAR. Tags with items starting with a name
+            right after an expression should not, since names and keywords
+            are not told apart in the shared parser.
 
         parsing_self: Whether this tag needs further parsing, or just hold it
         parsing_children: Whether we should parse then children,
@@ -72,6 +77,7 @@ class Tag: # pylint: disable=too-many-instance-attributes
     GRAMMAR = None
     TRANSFORMER = TagTransformer()
     BASE_GRAMMAR = Grammar(Path(__file__).parent / 'grammar.lark')
+    SHARED_PARSER = True
 
 
     PARSING_SELF = True
@@ -84,7 +90,7 @@ class Tag: # pylint: disable=too-many-instance-attributes
                  open_compact,
                  close_compact,
                  parser):
-        # type: (str, str, Diot, bool, bool, "Parser") -> None
+        # type: (str, str, Context, bool, bool, "Parser") -> None
         self.name = hitname
         self.content = content
         self.context = context
@@ -102,7 +108,8 @@ class Tag: # pylint: disable=too-many-instance-attributes
         # type: (bool) -> None
         """Initialize a parser for subclass
         If use_parser is False, always try to generate a new parser for the
-        subclass, otherwise, use the parent class's parser
+        subclass, otherwise, use the parent class's parser.
+        The parser is not built until it is used (see `LazyTagParser`).
         """
         if use_parser:
             # let it inherit
@@ -111,10 +118,11 @@ class Tag: # pylint: disable=too-many-instance-attributes
         if not cls.START:
             cls.PARSER = None
         else:
-            cls.PARSER = get_tag_parser(cls.START,
-                                        cls.GRAMMAR,
-                                        cls.TRANSFORMER,
-                                        cls.BASE_GRAMMAR)
+            cls.PARSER = LazyTagParser(cls.START,
+                                       cls.GRAMMAR,
+                                       cls.TRANSFORMER,
+                                       cls.BASE_GRAMMAR,
+                                       cls.SHARED_PARSER)
 
     # pylint: disable=inconsistent-return-statements
     def parse(self, force=False):
@@ -259,59 +267,196 @@ class Tag: # pylint: disable=too-many-instance-attributes
             return True
         return self.prev and self.is_elder(self.prev)
 
-    def _render_children(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        """Render the children
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """Write the rendered content of the tag
+
+        Tags with children write them with the same writer, so that the
+        content of the whole template is joined only once. Other tags
+        (i.e. custom tags) only need to implement `_render`.
+        """
+        write(str(self._render(local_vars, global_vars)))
+
+    def _render_children_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """Write the rendered children
 
         This will be done recursively to render the whole template
         """
-        rendered = ''
         for child in self.children:
-            # local vars updated
-            child_rendered, local_vars = child.render(local_vars, global_vars)
-            rendered += child_rendered
-        return rendered
+            child.render_to(write, local_vars, global_vars)
+
+    def _render_next_to(self, write, local_vars, global_vars, from_elder):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Write my rendered next sibling"""
+        if self.next:
+            self.next.render_to(write, local_vars, global_vars, from_elder)
+
+    def _render_children(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        """Render the children into a string"""
+        rendered = []
+        self._render_children_to(rendered.append, local_vars, global_vars)
+        return ''.join(rendered)
 
     def _render_next(self, local_vars, global_vars, from_elder):
-        """Render my next sibling"""
-        if not self.next:
-            return ''
-        return self.next.render(local_vars, global_vars, from_elder)[0]
+        # type: (dict, dict, bool) -> str
+        """Render my next sibling into a string"""
+        rendered = []
+        self._render_next_to(rendered.append,
+                             local_vars,
+                             global_vars,
+                             from_elder)
+        return ''.join(rendered)
+
+    def render_to(self, write, local_vars, global_vars, from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Render the tag with the rendered pieces written by a writer
+        (i.e. `list.append`)
+
+        Args:
+            write: The writer
+            local_vars: The local variables
+            global_vars: The global variables
+            from_elder: Whether the render is called from the elder tag
+                If I have elder sibling tag, I can't run independently
+                I am controlled by it
+        """
+        if self.prev and not from_elder:
+            return
+        logger.debug('%s  Rendering %r',
+                     (self.context.level) * LIQUID_LOG_INDENT,
+                     self)
+        try:
+            self._render_to(write, local_vars, global_vars)
+        except Exception as exc:
+            raise self._render_error(exc) from None
 
     def render(self, local_vars, global_vars, from_elder=False):
         # type: (dict, dict, bool) -> Tuple[str, dict]
         """Render the tag
 
+        The rendered pieces are written to a list, which is joined once,
+        see `render_to`.
+
         Args:
             local_vars: The local variables
             global_vars: The global variables
             from_elder: Whether the render is called from the elder tag
-                If I have elder sibling tag, I can't run independently
-                I am controlled by it
 
         Returns:
             The rendered string and local variables (maybe modified)
         """
+        rendered = []
+        self.render_to(rendered.append, local_vars, global_vars, from_elder)
+        return ''.join(rendered), local_vars
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """The coroutine version of `_render`, used by `render_to_async`
+
+        Tags rendering segments should render them with `render_async`, so
+        that the awaitable values are awaited. The tags implementing only
+        `_render` are rendered by it, with the awaitable values left as
+        they are.
+        """
+        return self._render(local_vars, global_vars)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """The coroutine version of `_render_to`
+
+        The tags overriding `_render_to` but not this one are rendered by
+        `_render_to`, with the awaitable values left as they are.
+        """
+        if type(self)._render_to is not Tag._render_to:
+            self._render_to(write, local_vars, global_vars)
+            return
+        write(str(await self._render_async(local_vars, global_vars)))
+
+    async def _render_children_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """Write the rendered children in an asyncio event loop"""
+        for child in self.children:
+            await child.render_to_async(write, local_vars, global_vars)
+
+    async def _render_next_to_async(self,
+                                    write,
+                                    local_vars,
+                                    global_vars,
+                                    from_elder):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Write my rendered next sibling in an asyncio event loop"""
+        if self.next:
+            await self.next.render_to_async(write,
+                                            local_vars,
+                                            global_vars,
+                                            from_elder)
+
+    async def _render_children_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        """Render the children into a string in an asyncio event loop"""
+        rendered = []
+        await self._render_children_to_async(rendered.append,
+                                             local_vars,
+                                             global_vars)
+        return ''.join(rendered)
+
+    async def render_to_async(self,
+                              write,
+                              local_vars,
+                              global_vars,
+                              from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Render the tag in an asyncio event loop, see `render_to`
+
+        The awaitable values are awaited where they are used, by the
+        `render_async` methods of the segments (see
+        `Liquid.render_async`).
+
+        Args:
+            write: The writer
+            local_vars: The local variables
+            global_vars: The global variables
+            from_elder: Whether the render is called from the elder tag
+        """
         if self.prev and not from_elder:
-            return '', local_vars
+            return
         logger.debug('%s  Rendering %r',
                      (self.context.level) * LIQUID_LOG_INDENT,
                      self)
         try:
-            rendered = self._render(local_vars, global_vars)
+            await self._render_to_async(write, local_vars, global_vars)
         except Exception as exc:
-            if hasattr(exc, 'lineno'):
-                colno = getattr(exc, 'colno', 1)
-                if exc.lineno > 1:
-                    self.context.lineno += exc.lineno - 1
-                    self.context.colno = colno - 1
-                else:
-                    self.context.colno += colno - 1
-
-            raise LiquidRenderError(
-                f'KeyError: {exc}' if isinstance(exc, KeyError) else str(exc),
-                self.context,
-                self.parser
-            ).with_traceback(exc.__traceback__) from None
-        else:
-            return str(rendered), local_vars
+            raise self._render_error(exc) from None
+
+    def _render_error(self, exc):
+        # type: (Exception) -> LiquidRenderError
+        """Turn an exception raised while rendering into a LiquidRenderError
+
+        The error is located in the template by the line and column numbers
+        the exception carries, if any. They are added to a copy of the
+        context, since the tag may be shared by the renders of a cached
+        template.
+
+        Args:
+            exc: The exception raised while rendering
+
+        Returns:
+            The LiquidRenderError to raise
+        """
+        context = self.context
+        if hasattr(exc, 'lineno'):
+            context = context.copy()
+            colno = getattr(exc, 'colno', 1)
+            if exc.lineno > 1:
+                context.lineno += exc.lineno - 1
+                context.colno = colno - 1
+            else:
+                context.colno += colno - 1
+
+        return LiquidRenderError(
+            f'KeyError: {exc}' if isinstance(exc, KeyError) else str(exc),
+            context,
+            self.parser
+        ).with_traceback(exc.__traceback__)
@@ -19,11 +19,20 @@ class TagLITERAL(Tag):
             content = content.rstrip()
         return content
 
-    def render(self, local_vars, global_vars, from_elder=False):
-        # type: (dict, dict, bool) -> Tuple[str, dict]
+    def render_to(self, write, local_vars, global_vars, from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
         """Render the literals"""
         logger.debug('[dim italic]%s  Rendering %r[/dim italic]',
                      (self.context.level) * LIQUID_LOG_INDENT,
                      self,
                      extra={"markup": True})
-        return str(self._render(local_vars, global_vars)), local_vars
+        write(self._render(local_vars, global_vars))
+
+    async def render_to_async(self,
+                              write,
+                              local_vars,
+                              global_vars,
+                              from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Render the literals in an asyncio event loop"""
+        self.render_to(write, local_vars, global_vars, from_elder)
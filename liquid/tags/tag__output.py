@@ -17,3 +17,8 @@ class TagOUTPUT(Tag):
         # type: (dict, dict) -> str
         rendered = self.parsed.render(local_vars, global_vars)
         return str(rendered) if rendered is not None else ''
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        rendered = await self.parsed.render_async(local_vars, global_vars)
+        return str(rendered) if rendered is not None else ''
@@ -10,8 +10,14 @@ class TagROOT(Tag):
     """The root tag as a container of all child tags"""
     def parse(self, force=False): # pylint: disable=unused-argument
         # type: (bool) -> None
-        """Exclude block tags from parsing, until they are replaced"""
+        """Parse the children of the blocks, which are held while parsing
+
+        For a template extending another one, the blocks are placed in the
+        tree of the mother template instead (see `TagExtends.flatten`).
+        """
         if not self.parser.visitor.has_mother:
+            for block in self.parser.visitor.blocks.values():
+                block.parse_children(base_level=block.context.level)
             return
 
         root_children = []
@@ -31,18 +37,39 @@ class TagROOT(Tag):
                 )
         # pylint: disable=attribute-defined-outside-init
         self.children = root_children
+        for child in root_children:
+            if child.name == 'extends':
+                child.flatten()
+
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        self._render_children_to(write, local_vars, global_vars)
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        return self._render_children(local_vars, global_vars)
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        await self._render_children_to_async(write, local_vars, global_vars)
 
     # pylint: disable=unused-argument
-    def render(self, local_vars, global_vars, from_elder=False):
-        # type: (dict, dict, bool) -> Tuple[str, dict]
+    def render_to(self, write, local_vars, global_vars, from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
         """Render the children of root"""
         logger.debug('%s- RENDERING %r',
                      (self.context.level) * LIQUID_LOG_INDENT,
                      self)
         # get logger back
         self.parser.config.update_logger()
-        return str(self._render(local_vars, global_vars)), local_vars
+        self._render_to(write, local_vars, global_vars)
+
+    # pylint: disable=unused-argument
+    async def render_to_async(self,
+                              write,
+                              local_vars,
+                              global_vars,
+                              from_elder=False):
+        # type: (Callable[[str], Any], dict, dict, bool) -> None
+        """Render the children of root in an asyncio event loop"""
+        logger.debug('%s- RENDERING %r',
+                     (self.context.level) * LIQUID_LOG_INDENT,
+                     self)
+        self.parser.config.update_logger()
+        await self._render_to_async(write, local_vars, global_vars)
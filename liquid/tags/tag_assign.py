@@ -33,3 +33,10 @@ class TagAssign(Tag):
         output = output.render(local_vars, global_vars)
         local_vars[varname] = global_vars[varname] = output
         return  ''
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        varname, output = self.parsed
+        output = await output.render_async(local_vars, global_vars)
+        local_vars[varname] = global_vars[varname] = output
+        return  ''
@@ -14,6 +14,12 @@ class TagBlock(TagCapture, use_parser=True):
     """The block tag"""
     PARSING_CHILDREN = False
 
+    def parse(self, force=False):
+        # type: (bool) -> Optional[bool]
+        """Parse the name of the block, even if it is inside another block,
+        so that the nested blocks can be replaced as well"""
+        return super().parse(force=True)
+
     def __repr__(self):
         # type: () -> str
         """The representation of the tag"""
@@ -28,6 +34,10 @@ class TagBlock(TagCapture, use_parser=True):
                 f"line {self.context.lineno + 1}, "
                 f"column {self.context.colno + 1})>")
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        return self._render_children(local_vars, global_vars)
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        self._render_children_to(write, local_vars, global_vars)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        await self._render_children_to_async(write, local_vars, global_vars)
@@ -8,7 +8,7 @@
 """
 from .manager import tag_manager
 from .tag import Tag
-from ..utils import RequiredTags
+from ..utils import RequiredTags, render_frame
 from ..exceptions import LiquidSyntaxError
 
 @tag_manager.register
@@ -30,5 +30,5 @@ class TagBreak(Tag):
 
     def _render(self, local_vars, global_vars):
         # type: (dict, dict) -> str
-        self.closest_parent.flag_break = True
+        render_frame(global_vars).states[self.closest_parent].flag_break = True
         return ''
@@ -23,3 +23,11 @@ class TagCapture(Tag):
         local_vars[var] = global_vars[var] = child
 
         return ''
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        var = str(self.parsed)
+        child = await self._render_children_async(local_vars, global_vars)
+        local_vars[var] = global_vars[var] = child
+
+        return ''
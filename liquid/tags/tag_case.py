@@ -14,28 +14,49 @@
 """
 from .manager import tag_manager
 from .tag__output import TagOUTPUT
+from ..utils import render_frame
 from ..exceptions import LiquidSyntaxError
 
 @tag_manager.register
 class TagCase(TagOUTPUT, use_parser=True):
-    """The case class"""
+    """The case class
+
+    The value to compare is kept in the render frame for the when tags.
+    """
     VOID = False # type: str
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.data = None
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        data = self.parsed.render(local_vars, global_vars)
+        with render_frame(global_vars).state(self, data):
+            self._render_whens_to(write, local_vars, global_vars)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        data = await self.parsed.render_async(local_vars, global_vars)
+        with render_frame(global_vars).state(self, data):
+            await self._render_whens_to_async(write, local_vars, global_vars)
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        self.data = self.parsed.render(
-            local_vars, global_vars
+    def _render_whens_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """Render the children until the first when tag"""
+        for child in self.children:
+            child.render_to(write, local_vars, global_vars)
+            if child.name == 'when':
+                return
+        raise LiquidSyntaxError(
+            f'No children found in tag: {self!r}',
+            self.context, self.parser
         )
-        rendered = ''
+
+    async def _render_whens_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        """Render the children until the first when tag in an asyncio
+        event loop"""
         for child in self.children:
-            child_rendered, _ = child.render(local_vars, global_vars)
-            rendered += child_rendered
+            await child.render_to_async(write, local_vars, global_vars)
             if child.name == 'when':
-                return rendered
+                return
         raise LiquidSyntaxError(
             f'No children found in tag: {self!r}',
             self.context, self.parser
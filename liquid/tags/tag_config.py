@@ -35,6 +35,7 @@ class TagConfig(Tag):
     config_item: var ("=" constant)?
     '''
     TRANSFORMER = TagConfigTransformer()
+    SHARED_PARSER = False
 
     def parse(self, force=False):
         # type: (bool) -> None
@@ -8,11 +8,14 @@
 """
 from .manager import tag_manager
 from .tag_break import TagBreak
+from ..utils import render_frame
 
 @tag_manager.register
 class TagContinue(TagBreak):
     """Class for tag continue"""
     def _render(self, local_vars, global_vars):
         # type: (dict, dict) -> str
-        self.closest_parent.flag_continue = True
+        render_frame(global_vars).states[
+            self.closest_parent
+        ].flag_continue = True
         return ''
@@ -11,8 +11,10 @@
 from lark import v_args
 from .manager import tag_manager
 from .tag import Tag
-from .transformer import TagTransformer, render_segment
-from ..utils import RequiredTags
+from .transformer import (TagTransformer,
+                          render_segment,
+                          render_segment_async)
+from ..utils import RequiredTags, render_frame
 from ..exceptions import LiquidRenderError
 
 @v_args(inline=True)
@@ -25,7 +27,11 @@ class TagCycleTransformer(TagTransformer):
 
 @tag_manager.register
 class TagCycle(Tag):
-    """The cycle tag"""
+    """The cycle tag
+
+    The cursor is kept in the render frame, so that it starts over for
+    each render.
+    """
     VOID = True
     PARENT_TAGS = RequiredTags('for')
 
@@ -33,55 +39,73 @@ class TagCycle(Tag):
     GRAMMAR = 'tag_cycle: [(constant|var) ":"] arguments'
     TRANSFORMER = TagCycleTransformer()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._group = None
-        self._args = None
+    def _state(self, local_vars, global_vars):
+        # type: (dict, dict) -> List[Any]
+        """Get the state of the cycle for the current render
 
-    def group(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        """Get the group of the cycle"""
-        if self._group is None:
-            self._group = render_segment(
-                self.parsed[0], local_vars, global_vars
-            )
-        return self._group
+        The group and the arguments are evaluated once for each render.
 
-    def args(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        """Get the args of the cycle"""
-        if self._args is None:
-            args, kwargs = self.parsed[1].render(local_vars, global_vars)
-            if kwargs:
-                raise LiquidRenderError("No keyword arguments allowed.",
-                                        self.context, self.parser)
-            self._args = args
-        return self._args
-
-    def get_value(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        """Get current value of the cycle, and
-        increment the cursor"""
-        args = self.args(local_vars, global_vars)
-        at = self.parsed[2] # pylint: disable=invalid-name
+        Returns:
+            The group, the arguments and the cursor
+        """
+        frame = render_frame(global_vars)
+        try:
+            return frame.states[self]
+        except KeyError:
+            pass
 
-        ret = args[at % len(args)]
-        self.parsed[2] = at + 1
-        return str(ret)
+        group = render_segment(self.parsed[0], local_vars, global_vars)
+        args, kwargs = self.parsed[1].render(local_vars, global_vars)
+        return self._new_state(frame, group, args, kwargs)
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        parent = self.closest_parent
-        group = self.group(local_vars, global_vars)
-        args = self.args(local_vars, global_vars)
+    async def _state_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> List[Any]
+        """Get the state of the cycle for the current render in an asyncio
+        event loop"""
+        frame = render_frame(global_vars)
+        try:
+            return frame.states[self]
+        except KeyError:
+            pass
 
-        if group not in parent.cycles:
-            parent.cycles[group] = self
-        elif parent.cycles[group].args(local_vars, global_vars) != args:
+        group = await render_segment_async(self.parsed[0],
+                                           local_vars,
+                                           global_vars)
+        args, kwargs = await self.parsed[1].render_async(local_vars,
+                                                         global_vars)
+        return self._new_state(frame, group, args, kwargs)
+
+    def _new_state(self, frame, group, args, kwargs):
+        # type: (RenderFrame, Any, List[Any], Dict[str, Any]) -> List[Any]
+        """Check the rendered group and arguments and keep the new state
+        of the cycle in the frame"""
+        if kwargs:
+            raise LiquidRenderError("No keyword arguments allowed.",
+                                    self.context, self.parser)
+
+        key = (self.closest_parent, group)
+        if key not in frame.cycles:
+            frame.cycles[key] = args
+        elif frame.cycles[key] != args:
             raise LiquidRenderError(
                 'Different arguments for cycle under '
                 f'the same group: {group}',
                 self.context, self.parser
             )
+        return frame.states.setdefault(self, [group, args, 0])
+
+    def _render(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        return self._next(self._state(local_vars, global_vars))
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        return self._next(await self._state_async(local_vars, global_vars))
 
-        return self.get_value(local_vars, global_vars)
+    @staticmethod
+    def _next(state):
+        # type: (List[Any]) -> str
+        """Get the current value of the cycle and move the cursor"""
+        _, args, at = state # pylint: disable=invalid-name
+        state[2] = at + 1
+        return str(args[at % len(args)])
@@ -4,23 +4,94 @@
 {% extends ... %}
 ```
 """
-from diot import Diot
+from copy import copy
 from .manager import tag_manager
 from .tag import Tag
-from ..utils import template_meta, find_template
-from ..exceptions import LiquidSyntaxError, LiquidRenderError
+from ..exceptions import LiquidSyntaxError
+
+def _render_tree(parser):
+    # type: (Parser) -> Tuple[Tag, Dict[str, Tag]]
+    """Get the tree to render for a parsed template and the blocks in it
+
+    For a template extending another one, it is the flattened tree of the
+    extends tag, otherwise the tree parsed.
+    """
+    if parser.visitor.has_mother:
+        for child in parser.visitor.root.children:
+            if child.name == 'extends':
+                return child.flattened, child.blocks
+    return parser.visitor.root, parser.visitor.blocks
+
+def _has_blocks(tag, blocks):
+    # type: (Tag, Dict[str, Tag]) -> bool
+    """Check if there are blocks to replace in a tag or its descendants"""
+    if tag.name == 'block' and tag.parsed in blocks:
+        return True
+    return any(_has_blocks(child, blocks) for child in tag.children)
+
+def _copy_tree(tag, parent, blocks, copies):
+    # type: (Tag, Tag, Dict[str, Tag], Dict[Tag, Tag]) -> Tag
+    """Copy a tag and its descendants, with the blocks replaced"""
+    if tag.name == 'block' and tag.parsed in blocks:
+        return blocks[tag.parsed]
+    tag_copy = copies[tag] = copy(tag)
+    tag_copy.parent = parent
+    tag_copy.children = [_copy_tree(child, tag_copy, blocks, copies)
+                         for child in tag.children]
+    return tag_copy
+
+def flatten_tree(root, blocks):
+    # type: (Tag, Dict[str, Tag]) -> Tag
+    """Get a new tree of a mother template with the blocks replaced
+
+    The mother tree is not modified. The top-level tags with no blocks to
+    replace in them are shared by the new tree, and the others are copied
+    with their descendants and their elder or younger siblings, so that
+    the tags in the copies refer to their copied parents and siblings
+    (i.e. `break` to its `for`).
+
+    Args:
+        root: The root tag of the mother template
+        blocks: The blocks to replace, keyed by their names
+
+    Returns:
+        The root tag of the new tree
+    """
+    touched = set() # type: Set[Tag]
+    for child in root.children:
+        if _has_blocks(child, blocks):
+            touched.add(child.eldest or child)
+
+    copies = {} # type: Dict[Tag, Tag]
+    new_root = copy(root)
+    new_root.children = [
+        _copy_tree(child, new_root, blocks, copies)
+        if (child.eldest or child) in touched
+        else child
+        for child in root.children
+    ]
+    for tag, tag_copy in copies.items():
+        tag_copy.prev = copies.get(tag.prev)
+        tag_copy.next = copies.get(tag.next)
+    return new_root
 
 @tag_manager.register
 class TagExtends(Tag):
-    """The extends tag"""
-    __slots__ = Tag.__slots__ + ('block_parsed', )
+    """The extends tag
+
+    The mother template is parsed once by the environment and shared. The
+    blocks of this template are placed in a flattened copy of the tree of
+    it (see `flatten_tree`) when this template is parsed.
+    """
+    __slots__ = Tag.__slots__ + ('flattened', 'blocks')
 
     VOID = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.parser.visitor.has_mother = True
-        self.block_parsed = False
+        self.flattened = None
+        self.blocks = {}
 
     def parse(self, force=False): # pylint: disable=unused-argument
         # type: (bool) -> None
@@ -38,73 +109,72 @@ class TagExtends(Tag):
         ):
             content = content[1:-1]
 
-        try:
-            mother = find_template(
-                content,
-                self.context.path,
-                self.parser.config.extends_dir
-            )
-            if not mother or not mother.is_file():
-                raise OSError
-        except OSError:
+        env = self.parser.env
+        meta = env.find(content,
+                        self.context.path,
+                        self.parser.config.extends_dir)
+        if meta is None:
             raise LiquidSyntaxError(
                 'Mother template does not exist.', self.context, self.parser
-            ) from None
+            )
 
-        meta = template_meta(mother)
+        # shared, since the mother tree is never modified
         # pylint: disable=attribute-defined-outside-init
-        self.parsed = self.parser.__class__(
-            meta,
-            self.parser.config,
-            Diot(name=meta.name,
-                 path=meta.path,
-                 stream=meta.stream,
-                 lineno=0,
-                 colno=0,
-                 level=self.context.level+1)
-        )
-        self.parsed.parse()
-        self.parsed.parent = self.parser
+        self.parsed = env.shared(meta,
+                                 self.parser.__class__,
+                                 self.parser.config,
+                                 self.context.level + 1,
+                                 self.parser)
         # get the logger back
         self.parsed.config.update_logger()
 
+    def flatten(self):
+        # type: () -> None
+        """Place the blocks of this template in a flattened copy of the
+        tree of the mother template, and parse their children
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
+        The mother template may extend another one, whose tree is already
+        flattened, so that chains of any depth are resolved. The blocks
+        nested in the blocks of this template are allowed to be new ones.
+
+        Raises:
+            LiquidSyntaxError: When a block does not exist in the mother
+                template
+        """
+        mother_root, mother_blocks = _render_tree(self.parsed)
+        blocks = self.parser.visitor.blocks
+        for blockname, block in blocks.items():
+            mother_block = mother_blocks.get(blockname)
+            if mother_block is None and block.parent.name != 'ROOT':
+                # a new block nested in another one, which can be replaced
+                # by the templates extending this one
+                continue
+            if mother_block is None:
+                raise LiquidSyntaxError(
+                    f'Block {str(blockname)!r} does not exist '
+                    'in mother template',
+                    block.context, block.parser
+                )
+            # use the compacts of mother blocks
+            block.open_compact = mother_block.open_compact
+            block.close_compact = mother_block.close_compact
+            # update the level to align with mother's logging structure
+            block.context.level = mother_block.context.level
+            block.parse_children(base_level=block.context.level)
+
+        self.flattened = flatten_tree(mother_root, blocks)
+        self.blocks = {**mother_blocks, **blocks}
+
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
         """make sure the template is in the format of:
         {% extends ... %}
         {% block 1 %}...{% endblock %}
         {% block 2 %}...{% endblock %}
         there are no other tags other than a config/comment tag
         """
-        # replace mother's blocks with self.parser's
-        if not self.block_parsed:
-            for blockname, block in self.parser.visitor.blocks.items():
-                # block: current_block (replacement)
-                # mother_block: mother's block (to replace)
-                if blockname not in self.parsed.visitor.blocks:
-                    raise LiquidRenderError(
-                        f'Block {blockname!r} does not exist '
-                        'in mother template',
-                        block.context, block.parser
-                    )
-                mother_blocks = self.parsed.visitor.blocks
-                mother_block = mother_blocks[blockname]
-                # get the children of the block's parent
-                siblings = mother_block.parent.children
-                # get the index of the block in parent's children
-                block_index = siblings.index(mother_block)
-                # use the compacts of mother blocks
-                block.open_compact = mother_block.open_compact
-                block.close_compact = mother_block.close_compact
-                # replace it with current block
-                siblings[block_index] = block
-                mother_blocks[blockname] = block
-                # update the level to align with mother's logging structure
-                block.context.level = mother_block.context.level
-            self.block_parsed = True
-
-        for blockname, block in self.parsed.visitor.blocks.items():
-            block.parse_children(base_level=block.context.level)
+        self.flattened.render_to(write, local_vars, global_vars)
 
-        return self.parsed.visitor.root.render(local_vars, global_vars)[0]
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        await self.flattened.render_to_async(write, local_vars, global_vars)
@@ -7,18 +7,90 @@
 ```
 """
 
-from collections import namedtuple
 from lark import v_args
 from .manager import tag_manager
 from .tag import Tag
-from .transformer import TagTransformer, render_segment
+from .transformer import (TagTransformer,
+                          render_segment,
+                          render_segment_async)
+from ..utils import render_frame, LoopState, Scope
 
 
-ForLoop = namedtuple( # pylint: disable=invalid-name
-    'ForLoop',
-    ['first', 'index', 'index0', 'last',
-     'length', 'rindex', 'rindex0']
-)
+class ForLoop:
+    """The forloop object, shared by all the iterations of a loop
+
+    Only the 0-based index is updated when iterating, the other fields
+    are computed when they are accessed.
+
+    Attributes:
+        index0: The 0-based index of the current iteration
+        length: The number of the iterations
+
+    Args:
+        length: The number of the iterations
+    """
+    __slots__ = ('index0', 'length')
+
+    FIELDS = ('first', 'index', 'index0', 'last',
+              'length', 'rindex', 'rindex0')
+
+    def __init__(self, length):
+        # type: (int) -> None
+        self.index0 = 0
+        self.length = length
+
+    @property
+    def first(self):
+        # type: () -> bool
+        """Whether this is the first iteration"""
+        return self.index0 == 0
+
+    @property
+    def index(self):
+        # type: () -> int
+        """The 1-based index of the current iteration"""
+        return self.index0 + 1
+
+    @property
+    def last(self):
+        # type: () -> bool
+        """Whether this is the last iteration"""
+        return self.index0 == self.length - 1
+
+    @property
+    def rindex(self):
+        # type: () -> int
+        """The 1-based index counting from the end"""
+        return self.length - self.index0
+
+    @property
+    def rindex0(self):
+        # type: () -> int
+        """The 0-based index counting from the end"""
+        return self.length - self.index0 - 1
+
+    def __repr__(self):
+        # type: () -> str
+        fields = ', '.join(f'{field}={getattr(self, field)!r}'
+                           for field in self.FIELDS)
+        return f'{self.__class__.__name__}({fields})'
+
+def _uses_forloop(tag):
+    # type: (Tag) -> bool
+    """Whether the descendants of a tag might access the forloop object
+
+    The includes, the blocks and the tags from outside this package are
+    assumed to access it, since their contents are not known here.
+    """
+    for child in tag.children:
+        if child.name in ('LITERAL', 'raw'):
+            continue
+        if (child.name in ('include', 'block') or
+                not type(child).__module__.startswith('liquid.') or
+                'forloop' in child.content or
+                _uses_forloop(child)):
+            return True
+    return False
 
 @v_args(inline=True)
 class TagForTransformer(TagTransformer):
@@ -44,12 +116,17 @@ class TagForTransformer(TagTransformer):
 class TagFor(Tag):
     """The for tag
 
+    The flags for break/continue statements are kept in the render frame,
+    see `liquid.utils.LoopState`.
+
+    The forloop object is only created if the body of the loop might
+    access it (see `uses_forloop`).
+
     Attributes:
-        flag_break: The flag for break statement
-        flag_continue: The flag for continue statement
-        cycles: The cycle object for cycle tags
+        _uses_forloop: Whether the body accesses the forloop object, None
+            if it has not been checked yet
     """
-    __slots__ = Tag.__slots__ + ('flag_break', 'flag_continue', 'cycles')
+    __slots__ = Tag.__slots__ + ('_uses_forloop', )
 
     START = 'tag_for'
     GRAMMAR = '''
@@ -63,23 +140,51 @@ class TagFor(Tag):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.flag_break = False      # type: bool
-        self.flag_continue = False   # type: bool
-        self.cycles = {}             # type: Dict[str, TagCycle]
+        self._uses_forloop = None
 
+    @property
+    def uses_forloop(self):
+        # type: () -> bool
+        """Whether the body of the loop might access the forloop object
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        # pylint: disable=too-many-locals
-        rendered = ''
+        The children are only complete after the whole template is parsed,
+        so this is checked the first time the loop is rendered or compiled.
+        """
+        if self._uses_forloop is None:
+            self._uses_forloop = _uses_forloop(self)
+        return self._uses_forloop
 
-        varname, atom, args = self.parsed
+    def _iterable(self, local_vars, global_vars):
+        # type: (dict, dict) -> List[Any]
+        """Get the list of items to loop over, with the for arguments
+        (limit, offset and reversed) applied"""
+        _, atom, args = self.parsed
         obj = render_segment(atom, local_vars, global_vars)
         forargs = {'limit': None, 'offset': None, 'reversed': False}
         for argname, argvalue in args:
             argvalue = render_segment(argvalue, local_vars, global_vars)
             forargs[str(argname)] = argvalue
 
+        return self._apply_args(obj, forargs)
+
+    async def _iterable_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> List[Any]
+        """Get the list of items to loop over in an asyncio event loop"""
+        _, atom, args = self.parsed
+        obj = await render_segment_async(atom, local_vars, global_vars)
+        forargs = {'limit': None, 'offset': None, 'reversed': False}
+        for argname, argvalue in args:
+            argvalue = await render_segment_async(argvalue,
+                                                  local_vars,
+                                                  global_vars)
+            forargs[str(argname)] = argvalue
+
+        return self._apply_args(obj, forargs)
+
+    @staticmethod
+    def _apply_args(obj, forargs):
+        # type: (Iterable[Any], Dict[str, Any]) -> List[Any]
+        """Apply the for arguments to the object to loop over"""
         # parameters
         if forargs['limit'] is not None and forargs['offset'] is not None:
             obj = obj[
@@ -94,32 +199,74 @@ class TagFor(Tag):
             obj = reversed(obj)
 
         # make it avaiable for generators
-        obj = list(obj)
+        return list(obj)
+
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            self._render_loop_to(write, local_vars, global_vars, state)
+
+    def _render_loop_to(self, write, local_vars, global_vars, state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop with the flags set by break/continue tags"""
+        varname = self.parsed[0]
+        obj = self._iterable(local_vars, global_vars)
+        local_vars_inside = Scope(local_vars, {})
+        forloop = None
+        if self.uses_forloop:
+            forloop = local_vars_inside['forloop'] = ForLoop(len(obj))
+        for i, var in enumerate(obj):
+            local_vars_inside[varname] = var
+            if forloop is not None:
+                forloop.index0 = i
+            for child in self.children:
+                child.render_to(write, local_vars_inside, global_vars)
+                if state.flag_break or state.flag_continue:
+                    state.flag_continue = False
+                    break
+            if state.flag_break:
+                break
+
+        if not obj:
+            self._render_next_to(write, local_vars, global_vars, True)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        with render_frame(global_vars).state(self, LoopState()) as state:
+            await self._render_loop_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             state)
 
-        forlen = len(obj)
-        local_vars_inside = local_vars.copy()
+    async def _render_loop_to_async(self,
+                                    write,
+                                    local_vars,
+                                    global_vars,
+                                    state):
+        # type: (Callable[[str], Any], dict, dict, LoopState) -> None
+        """Render the loop in an asyncio event loop"""
+        varname = self.parsed[0]
+        obj = await self._iterable_async(local_vars, global_vars)
+        local_vars_inside = Scope(local_vars, {})
+        forloop = None
+        if self.uses_forloop:
+            forloop = local_vars_inside['forloop'] = ForLoop(len(obj))
         for i, var in enumerate(obj):
             local_vars_inside[varname] = var
-            # forloop object
-            local_vars_inside['forloop'] = ForLoop(
-                first=i == 0,
-                index=i + 1,
-                index0=i,
-                last=i == forlen - 1,
-                length=forlen,
-                rindex=forlen - i,
-                rindex0=forlen - i - 1
-            )
+            if forloop is not None:
+                forloop.index0 = i
             for child in self.children:
-                child_rendered, _ = child.render(local_vars_inside,
-                                                 global_vars)
-                rendered += child_rendered
-                if self.flag_break or self.flag_continue:
-                    self.flag_continue = False
+                await child.render_to_async(write,
+                                            local_vars_inside,
+                                            global_vars)
+                if state.flag_break or state.flag_continue:
+                    state.flag_continue = False
                     break
-            if self.flag_break:
+            if state.flag_break:
                 break
 
         if not obj:
-            rendered += self._render_next(local_vars, global_vars, True)
-        return rendered
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
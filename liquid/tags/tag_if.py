@@ -9,7 +9,7 @@
 
 from .manager import tag_manager
 from .tag import Tag
-from .transformer import render_segment
+from .transformer import render_segment, render_segment_async
 from ..filters import EmptyDrop
 
 @tag_manager.register
@@ -19,7 +19,21 @@ class TagIf(Tag):
 
     def _render_expr(self, local_vars, global_vars):
         # type: (dict, dict) -> bool
-        expr = render_segment(self.parsed, local_vars, global_vars)
+        return self._truthy(
+            render_segment(self.parsed, local_vars, global_vars)
+        )
+
+    async def _render_expr_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> bool
+        """Render the condition in an asyncio event loop"""
+        return self._truthy(
+            await render_segment_async(self.parsed, local_vars, global_vars)
+        )
+
+    @staticmethod
+    def _truthy(expr):
+        # type: (Any) -> bool
+        """Tell whether the rendered condition is truthy in liquid"""
         # Strings, even when empty, are truthy.
         # See: https://shopify.github.io/liquid/basics/truthy-and-falsy/#truthy
         if isinstance(expr, str):
@@ -32,17 +46,21 @@ class TagIf(Tag):
             expr = False
         return bool(expr)
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
-
-        expr = self._render_expr(local_vars, global_vars)
-
-        from_elder = True
-        if expr:
-            rendered += self._render_children(local_vars, global_vars)
-            # don't go next
-            from_elder = False
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if self._render_expr(local_vars, global_vars):
+            self._render_children_to(write, local_vars, global_vars)
+        else:
+            self._render_next_to(write, local_vars, global_vars, True)
 
-        rendered += self._render_next(local_vars, global_vars, from_elder)
-        return rendered
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if await self._render_expr_async(local_vars, global_vars):
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
+        else:
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
@@ -2,16 +2,26 @@
 
 ```liquid
 {% include ... %}
+{% include {{ ... }} %}
 ```
 """
-from diot import Diot
+from io import StringIO
+from threading import RLock
 from lark import v_args
 from .manager import tag_manager
 from .tag import Tag
-from .transformer import TagTransformer, render_segment
-from ..utils import template_meta, find_template
+from .transformer import (TagTransformer,
+                          TagSegment,
+                          render_segment,
+                          render_segment_async)
+from ..cache import template_cache, include_cache
+from ..utils import Scope
 from ..exceptions import LiquidSyntaxError
 
+# Parsing the templates included by the paths evaluated when rendering,
+# only one of the threads parses a template missing in the cache
+INCLUDE_LOCK = RLock()
+
 @v_args(inline=True)
 class TagIncludeTransformer(TagTransformer):
     """The transformer for tag include"""
@@ -26,63 +36,192 @@ class TagIncludeTransformer(TagTransformer):
 
 @tag_manager.register
 class TagInclude(Tag):
-    """The extends tag"""
+    """The include tag
+
+    The path can be an output (`{{ ... }}`) evaluated when rendering. The
+    template is then resolved by the loader of the environment and parsed
+    (and compiled if `compile` is on) once per process, kept in
+    `template_cache` and shared by all the include tags resolving to it.
+    The resolution is kept in `include_cache` and not checked again.
+    Invalidating the path of the template in `template_cache` gets it
+    parsed again, and in `include_cache` gets it resolved again.
+
+    The included template is rendered with a `Scope` on top of the local
+    variables holding `include`, instead of a copy of them. With
+    `inline_include` on, the tree of the included template is placed in
+    this tag when parsed and rendered in place. This does not apply to the
+    paths evaluated when rendering. Without `compile`, it only saves
+    rendering the root of the included template, since the scope and the
+    parameters are still needed at each `include`. With `compile` on, the
+    included template is compiled into the function of this one, instead
+    of a function of its own called at each `include`.
+
+    Attributes:
+        inlined: The tags of the included template to render in place,
+            or None if it is not inlined
+    """
+    __slots__ = Tag.__slots__ + ('inlined', )
+
     VOID = True
 
     START = 'tag_include'
     GRAMMAR = """
-    tag_include: (string|/[^\\s]+/) (include_item)*
+    tag_include: ("{{" output "}}"|string|/[^\\s{][^\\s]*/) (include_item)*
     include_item: varname "=" test
     """
     TRANSFORMER = TagIncludeTransformer()
+    SHARED_PARSER = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inlined = None
+
+    @property
+    def dynamic(self):
+        # type: () -> bool
+        """Whether the path is evaluated when rendering"""
+        return isinstance(self.parsed[0], TagSegment)
 
     def parse(self, force=False):
         # type: (bool) -> None
         """Parse the include template"""
-        if not super().parse(force):
+        if not super().parse(force) or self.dynamic:
             return
         path = self.parsed[0] # pylint: disable=access-member-before-definition
         path = str(path)
-        try:
-            include_template = find_template(
-                path,
-                self.context.path,
-                self.parser.config.include_dir
-            )
-            if not include_template or not include_template.is_file():
-                raise OSError
-        except OSError:
+        env = self.parser.env
+        meta = env.find(path,
+                        self.context.path,
+                        self.parser.config.include_dir)
+        if meta is None:
             raise LiquidSyntaxError(
                 f'Cannot find template: {path!r} ({self!r})',
                 self.context, self.parser
-            ) from None
-
-        meta = template_meta(include_template)
-
-        inc_parser = self.parser.__class__(
-            meta,
-            self.parser.config,
-            Diot(name=meta.name,
-                 stream=meta.stream,
-                 path=meta.path,
-                 colno=0,
-                 lineno=0,
-                 level=self.context.level + 1)
-        )
-        inc_parser.parse()
-        inc_parser.parent = self.parser
-        inc_parser.config.update_logger()
+            )
+
+        # parsed once in the environment, shared by the tags including it
+        inc_parser = env.shared(meta,
+                                self.parser.__class__,
+                                self.parser.config,
+                                self.context.level + 1,
+                                self.parser)
+        self.parser.config.update_logger()
         # pylint: disable=attribute-defined-outside-init
         self.parsed = inc_parser, self.parsed[1]
+        if self.parser.config.inline_include:
+            self.inlined = inc_parser.visitor.root.children
+
+    def _load(self, name):
+        # type: (str) -> Tuple[Tag, Optional[Callable]]
+        """Get the parsed and compiled template by the evaluated path
+
+        Args:
+            name: The evaluated path
+
+        Returns:
+            The root tag of the parsed template and the compiled function
+            if `compile` is on
+
+        Raises:
+            OSError: When the template cannot be found
+        """
+        env = self.parser.env
+        config = self.parser.config
+        # the include_dir is part of the configuration
+        key = (self.parser.__class__.__name__,
+               name,
+               self.context.path,
+               template_cache.config_key(config),
+               repr(env.loader))
+        template_key = include_cache.get(key)
+        cached = (template_cache.get(template_key)
+                  if template_key is not None
+                  else None)
+        if cached is not None:
+            return cached
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
+        with INCLUDE_LOCK:
+            meta = env.find(name, self.context.path, config.include_dir)
+            if meta is None:
+                raise OSError(f'Cannot find template: {name!r}')
+            try:
+                source = meta.stream.read()
+            finally:
+                if meta.should_close:
+                    meta.stream.close()
+
+            template_key = template_cache.key(self.parser.__class__,
+                                              source,
+                                              meta,
+                                              config,
+                                              env)
+            cached = template_cache.get(template_key)
+            if cached is None:
+                # shared by the templates including it, no parent to show
+                # in the exceptions
+                parsed = env.parse(meta._replace(stream=StringIO(source),
+                                                 should_close=False),
+                                   self.parser.__class__,
+                                   config,
+                                   self.context.level + 1).visitor.root
+                config.update_logger()
+                compiled = None
+                if config.compile:
+                    from ..compiler import Compiler
+                    compiled = Compiler(parsed).compile()
+                cached = parsed, compiled
+                template_cache.set(template_key, cached)
+            include_cache.set(key, template_key, (meta.path, ))
+        return cached
+
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
         inc_parser, items = self.parsed
         items = dict(items)
         for varname, value in items.items():
             items[varname] = render_segment(value, local_vars, global_vars)
 
-        local_vars_copy = local_vars.copy()
-        local_vars_copy['include'] = items
+        scope = Scope(local_vars, {'include': items})
+        if self.inlined is not None:
+            for child in self.inlined:
+                child.render_to(write, scope, global_vars)
+            return
+
+        if not self.dynamic:
+            inc_parser.visitor.root.render_to(write, scope, global_vars)
+            return
+
+        root, compiled = self._load(
+            str(render_segment(inc_parser, local_vars, global_vars))
+        )
+        if compiled is None:
+            root.render_to(write, scope, global_vars)
+        else:
+            compiled(scope, global_vars, write)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        inc_parser, items = self.parsed
+        items = dict(items)
+        for varname, value in items.items():
+            items[varname] = await render_segment_async(value,
+                                                        local_vars,
+                                                        global_vars)
+
+        scope = Scope(local_vars, {'include': items})
+        if self.inlined is not None:
+            for child in self.inlined:
+                await child.render_to_async(write, scope, global_vars)
+            return
+
+        if not self.dynamic:
+            await inc_parser.visitor.root.render_to_async(write,
+                                                          scope,
+                                                          global_vars)
+            return
 
-        return inc_parser.visitor.root.render(local_vars_copy, global_vars)[0]
+        # the compiled function renders synchronously
+        root, _ = self._load(str(
+            await render_segment_async(inc_parser, local_vars, global_vars)
+        ))
+        await root.render_to_async(write, scope, global_vars)
@@ -23,3 +23,8 @@ class TagIncrement(TagCapture, use_parser=True):
         value = local_vars.get(var, 0)
         local_vars[var] = value + 1
         return str(value)
+
+    async def _render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> str
+        # not the one of TagCapture
+        return self._render(local_vars, global_vars)
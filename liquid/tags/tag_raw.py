@@ -23,6 +23,10 @@ class TagRaw(Tag):
                 self.parser
             )
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        return self._render_children(local_vars, global_vars)
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        self._render_children_to(write, local_vars, global_vars)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        await self._render_children_to_async(write, local_vars, global_vars)
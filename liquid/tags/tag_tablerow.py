@@ -14,7 +14,8 @@ from lark import v_args
 from .manager import tag_manager
 from .tag import Tag
 from .tag_for import TagForTransformer
-from .transformer import render_segment
+from .transformer import render_segment, render_segment_async
+from ..utils import Scope
 
 
 TablerowObject = namedtuple( # pylint: disable=invalid-name
@@ -49,11 +50,8 @@ class TagTablerow(Tag):
     START = 'tag_tablerow'
 
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        # pylint: disable=too-many-locals
-        rendered = ''
-
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
         itername, expr, args = self.parsed
         obj = expr.render(local_vars, global_vars)
         args = dict(args)
@@ -70,6 +68,50 @@ class TagTablerow(Tag):
         if cols:
             cols = render_segment(cols, local_vars, global_vars)
 
+        local_vars_inside = Scope(local_vars, {})
+        for i, row in enumerate(self._rows(obj, limit, offset, cols)):
+            write(f'<tr class="row{i+1}">')
+            for j, col in enumerate(row):
+                local_vars_inside[itername] = col
+                write(f'<td class="col{j+1}">')
+                self._render_children_to(write,
+                                         local_vars_inside,
+                                         global_vars)
+                write('</td>')
+
+            write('</tr>')
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        itername, expr, args = self.parsed
+        obj = await expr.render_async(local_vars, global_vars)
+        args = {
+            argname: await render_segment_async(argvalue,
+                                                local_vars,
+                                                global_vars)
+            for argname, argvalue in args
+        }
+
+        local_vars_inside = Scope(local_vars, {})
+        for i, row in enumerate(self._rows(obj,
+                                           args.get('limit', None),
+                                           args.get('offset', None),
+                                           args.get('cols', None))):
+            write(f'<tr class="row{i+1}">')
+            for j, col in enumerate(row):
+                local_vars_inside[itername] = col
+                write(f'<td class="col{j+1}">')
+                await self._render_children_to_async(write,
+                                                     local_vars_inside,
+                                                     global_vars)
+                write('</td>')
+
+            write('</tr>')
+
+    @staticmethod
+    def _rows(obj, limit, offset, cols):
+        # type: (Iterable[Any], int, int, int) -> List[List[Any]]
+        """Split the items into the rows with the arguments applied"""
         if offset is not None and limit is not None:
             obj = obj[offset : (offset + limit)]
         elif offset is not None:
@@ -83,17 +125,4 @@ class TagTablerow(Tag):
 
         cols = cols or lenobj
         # chunks
-        rows = [obj[i:i + cols] for i in range(0, lenobj, cols)]
-        local_vars_inside = local_vars.copy()
-        for i, row in enumerate(rows):
-            rendered += f'<tr class="row{i+1}">'
-            for j, col in enumerate(row):
-                local_vars_inside[itername] = col
-                rendered += f'<td class="col{j+1}">'
-                rendered += self._render_children(local_vars_inside,
-                                                  global_vars)
-                rendered += '</td>'
-
-            rendered += '</tr>'
-
-        return rendered
+        return [obj[i:i + cols] for i in range(0, lenobj, cols)]
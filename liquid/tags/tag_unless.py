@@ -12,18 +12,15 @@ from .tag_if import TagIf
 @tag_manager.register
 class TagUnless(TagIf, use_parser=True):
     """The unless tag"""
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        rendered = ''
-
-        expr = self._render_expr(local_vars, global_vars)
-
-        # from_elder = True
-        if not expr:
-            # don't go next
-            # from_elder = False
-            rendered += self._render_children(local_vars, global_vars)
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if not self._render_expr(local_vars, global_vars):
+            self._render_children_to(write, local_vars, global_vars)
         # {% else %} not supported in standard mode
-        # if self.next:
-        #    rendered += self._render_next(local_vars, global_vars, from_elder)
-        return rendered
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        if not await self._render_expr_async(local_vars, global_vars):
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
@@ -14,7 +14,7 @@
 """
 from .manager import tag_manager
 from .tag__output import TagOUTPUT
-from ..utils import RequiredTags, OptionalTags
+from ..utils import RequiredTags, OptionalTags, render_frame
 
 @tag_manager.register
 class TagWhen(TagOUTPUT, use_parser=True):
@@ -24,9 +24,23 @@ class TagWhen(TagOUTPUT, use_parser=True):
     PARENT_TAGS = RequiredTags('case')
     ELDER_TAGS = OptionalTags('when')
 
-    def _render(self, local_vars, global_vars):
-        # type: (dict, dict) -> str
-        data = self.PARSER.parse(self.content).render(local_vars, global_vars)
-        if data == self.closest_parent.data:
-            return self._render_children(local_vars, global_vars)
-        return self._render_next(local_vars, global_vars, True)
+    def _render_to(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        data = self.parsed.render(local_vars, global_vars)
+        if data == render_frame(global_vars).states[self.closest_parent]:
+            self._render_children_to(write, local_vars, global_vars)
+        else:
+            self._render_next_to(write, local_vars, global_vars, True)
+
+    async def _render_to_async(self, write, local_vars, global_vars):
+        # type: (Callable[[str], Any], dict, dict) -> None
+        data = await self.parsed.render_async(local_vars, global_vars)
+        if data == render_frame(global_vars).states[self.closest_parent]:
+            await self._render_children_to_async(write,
+                                                 local_vars,
+                                                 global_vars)
+        else:
+            await self._render_next_to_async(write,
+                                             local_vars,
+                                             global_vars,
+                                             True)
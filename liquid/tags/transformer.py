@@ -6,9 +6,12 @@ from collections import OrderedDict
 from lark import v_args, Transformer
 from ..config import LIQUID_FILTERS_ENVNAME
 from ..filters import EmptyDrop
-from ..utils import NOTHING
+from ..utils import NOTHING, Scope, render_frame
 from ..exceptions import LiquidNameError
 
+# the mark of the variables not found in the local variables
+_UNDEFINED = object()
+
 def render_segment(tagseg, local_vars, global_vars):
     # type: (dict, dict) -> Any
     """Try to render a segment
@@ -27,6 +30,50 @@ def render_segment(tagseg, local_vars, global_vars):
         return tagseg.render(local_vars, global_vars)
     return tagseg
 
+async def render_segment_async(tagseg, local_vars, global_vars):
+    # type: (Any, dict, dict) -> Any
+    """Try to render a segment in an asyncio event loop
+
+    The same as `render_segment`, but the segment is rendered by
+    `render_async`, so that the awaitable values in it are awaited.
+
+    Args:
+        local_vars: The local variables
+        global_vars: The global_vars
+
+    Returns:
+        The rendered value
+    """
+    if isinstance(tagseg, TagSegment):
+        return await tagseg.render_async(local_vars, global_vars)
+    return tagseg
+
+async def await_value(value, global_vars):
+    # type: (Any, dict) -> Any
+    """Wait for the value if it is awaitable, otherwise return the value
+    itself
+
+    The results are kept in the render frame, since a coroutine cannot be
+    awaited again, i.e. for a variable used more than once.
+
+    Args:
+        value: The value of a variable, an attribute or a filter call
+        global_vars: The global_vars
+
+    Returns:
+        The result of the awaitable or the value itself
+    """
+    # cheaper than inspect.isawaitable(), which is called for every value
+    if not hasattr(type(value), '__await__'):
+        return value
+    awaited = render_frame(global_vars).awaited
+    key = id(value)
+    if key not in awaited:
+        # the awaitable is kept, so that the id is not reused by another
+        # one during the render
+        awaited[key] = value, await value
+    return awaited[key][1]
+
 class TagSegment(ABC):
     """Base class for segment classes
 
@@ -62,6 +109,16 @@ class TagSegment(ABC):
         # pylint: disable=unused-argument
         """Render the segment with the given envs"""
 
+    async def render_async(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """Render the segment with the given envs in an asyncio event loop
+
+        The awaitable values are awaited where they are used (see
+        `Liquid.render_async`). The segments implementing only `render`
+        are rendered by it, with the awaitable values left as they are.
+        """
+        return self.render(local_vars, global_vars)
+
 class TagSegmentVar(TagSegment):
     """segment for variables"""
     __slots__ = ('_data', 'line', 'column')
@@ -84,11 +141,36 @@ class TagSegmentVar(TagSegment):
 
     def render(self, local_vars, global_vars):
         """Get the value of a variable from envs"""
+        var = self._lookup(local_vars, global_vars)
+        if isinstance(var, (tuple, list)) and len(var) == 0:
+            return EmptyDrop()
+        return var
+
+    async def render_async(self, local_vars, global_vars):
+        """Get the value of a variable from envs and wait for it"""
+        var = await await_value(self._lookup(local_vars, global_vars),
+                                global_vars)
+        if isinstance(var, (tuple, list)) and len(var) == 0:
+            return EmptyDrop()
+        return var
+
+    def _lookup(self, local_vars, global_vars):
+        # type: (dict, dict) -> Any
+        """Get the value of the variable as it is
+
+        Raises:
+            LiquidNameError: When the variable is not defined
+        """
         vname_token = self.data[0]
         varname = str(vname_token)
-        if varname in local_vars:
-            var = local_vars[varname]
-        else:
+        var = dict.get(local_vars, varname, _UNDEFINED)
+        # walk up the scopes without the method calls of `Scope`, which the
+        # subclasses of it might override
+        # pylint: disable=unidiomatic-typecheck
+        while var is _UNDEFINED and type(local_vars) is Scope:
+            local_vars = local_vars.parent
+            var = dict.get(local_vars, varname, _UNDEFINED)
+        if var is _UNDEFINED:
             try:
                 var = global_vars[varname]
             except KeyError:
@@ -98,18 +180,29 @@ class TagSegmentVar(TagSegment):
                 error.lineno = vname_token.line
                 error.colno = vname_token.column
                 raise error from None
-        if isinstance(var, (tuple, list)) and len(var) == 0:
-            return EmptyDrop()
         return var
 
 class TagSegmentComparison(TagSegment):
     """Comparison segment"""
     def render(self, local_vars, global_vars):
         """Render the segment"""
-        # pylint: disable=too-many-return-statements
         left, op, right = self.data
         left = render_segment(left, local_vars, global_vars)
         right = render_segment(right, local_vars, global_vars)
+        return self._compare(left, op, right)
+
+    async def render_async(self, local_vars, global_vars):
+        """Render the segment in an asyncio event loop"""
+        left, op, right = self.data
+        left = await render_segment_async(left, local_vars, global_vars)
+        right = await render_segment_async(right, local_vars, global_vars)
+        return self._compare(left, op, right)
+
+    @staticmethod
+    def _compare(left, op, right):
+        # type: (Any, str, Any) -> Any
+        """Compare the rendered values with the operator"""
+        # pylint: disable=too-many-return-statements,invalid-name
         if op == "<":
             return left < right
         if op == ">":
@@ -148,6 +241,20 @@ class TagSegmentGetItem(TagSegment):
         except KeyError:
             return EmptyDrop()
 
+    async def render_async(self, local_vars, global_vars):
+        """Try to get the value of the getitem operation and wait for it"""
+        obj, subscript = self.data
+        obj = await render_segment_async(obj, local_vars, global_vars)
+        subscript = await render_segment_async(subscript,
+                                               local_vars,
+                                               global_vars)
+
+        try:
+            value = obj[subscript]
+        except KeyError:
+            return EmptyDrop()
+        return await await_value(value, global_vars)
+
 class TagSegmentGetAttr(TagSegment):
     """segment for `obj.attr`"""
 
@@ -155,8 +262,19 @@ class TagSegmentGetAttr(TagSegment):
         """Try to get the value of the getattr operation"""
         obj, attr = self.data
         obj = render_segment(obj, local_vars, global_vars)
-        attr = str(attr)
+        return self._getattr(obj, str(attr))
 
+    async def render_async(self, local_vars, global_vars):
+        """Try to get the value of the getattr operation and wait for it"""
+        obj, attr = self.data
+        obj = await render_segment_async(obj, local_vars, global_vars)
+        return await await_value(self._getattr(obj, str(attr)),
+                                 global_vars)
+
+    @staticmethod
+    def _getattr(obj, attr):
+        # type: (Any, str) -> Any
+        """Get the attribute, or the item, size, first or last of obj"""
         try:
             return getattr(obj, attr)
         except AttributeError as attre:
@@ -182,6 +300,14 @@ class TagSegmentRange(TagSegment):
 
         return list(range(int(start), int(end) + 1))
 
+    async def render_async(self, local_vars, global_vars):
+        """Render the range segment in an asyncio event loop"""
+        start, end = self.data
+        start = await render_segment_async(start, local_vars, global_vars)
+        end = await render_segment_async(end, local_vars, global_vars)
+
+        return list(range(int(start), int(end) + 1))
+
 class TagSegmentOutput(TagSegment):
     """Output inside {{ ... }}"""
     def render(self, local_vars, global_vars):
@@ -196,6 +322,19 @@ class TagSegmentOutput(TagSegment):
 
         return base
 
+    async def render_async(self, local_vars, global_vars):
+        """Render the output segment, waiting for the results of the
+        filters"""
+        base = await render_segment_async(self.data[0],
+                                          local_vars,
+                                          global_vars)
+        for filter_seg in self.data[1:]:
+            filter_func = await filter_seg.render_async(local_vars,
+                                                        global_vars)
+            base = await await_value(filter_func(base), global_vars)
+
+        return base
+
 class TagSegmentArguments(TagSegment):
     """Arguments segment"""
     # pylint: disable=arguments-differ
@@ -224,6 +363,25 @@ class TagSegmentArguments(TagSegment):
                 )
         return args, kwargs
 
+    async def render_async(self, local_vars, global_vars, as_is=False):
+        # type: (dict, dict, bool) -> Tuple[List[str], Dict[str, Any]]
+        """Render the segment in an asyncio event loop, see `render`"""
+        args = []
+        kwargs = OrderedDict()
+        for test1, test2 in self.data:
+            test1name = str(test1)
+
+            if test2 is NOTHING:
+                args.append(test1name if as_is
+                            else await render_segment_async(test1,
+                                                            local_vars,
+                                                            global_vars))
+            else:
+                kwargs[test1name] = await render_segment_async(
+                    test2, local_vars, global_vars
+                )
+        return args, kwargs
+
 class TagSegmentLogical(TagSegment):
     """Logical segment"""
     def render(self, local_vars, global_vars):
@@ -234,16 +392,54 @@ class TagSegmentLogical(TagSegment):
             return test1 and test2
         return test1 or test2
 
+    async def render_async(self, local_vars, global_vars):
+        test1, and_or, test2 = self.data
+        test1 = await render_segment_async(test1, local_vars, global_vars)
+        test2 = await render_segment_async(test2, local_vars, global_vars)
+        if and_or == 'and':
+            return test1 and test2
+        return test1 or test2
+
 class TagSegmentFilter(TagSegment):
     """Filter segment"""
     def render(self, local_vars, global_vars):
-        filter_name, filter_args = self.data
+        filter_args = self.data[1]
 
-        args, kwargs = [], {}
+        rendered_args = None
         if filter_args is not NOTHING:
             rendered_args = render_segment(filter_args, local_vars, global_vars)
-            if rendered_args is not None:
-                args, kwargs = rendered_args
+        return self._filter_func(rendered_args, global_vars)
+
+    async def render_async(self, local_vars, global_vars):
+        """Render the filter in an asyncio event loop
+
+        The result of the filter returned is not waited for, which is done
+        by the output segment.
+        """
+        filter_args = self.data[1]
+
+        rendered_args = None
+        if filter_args is not NOTHING:
+            rendered_args = await render_segment_async(filter_args,
+                                                       local_vars,
+                                                       global_vars)
+        return self._filter_func(rendered_args, global_vars)
+
+    def _filter_func(self, rendered_args, global_vars):
+        # type: (Optional[Tuple[List, Dict]], dict) -> Callable
+        """Get the function to call the filter with the base value
+
+        Args:
+            rendered_args: The rendered arguments of the filter
+            global_vars: The global variables
+
+        Returns:
+            The function to call the filter
+        """
+        filter_name = self.data[0]
+        args, kwargs = [], {}
+        if rendered_args is not None:
+            args, kwargs = rendered_args
 
         filtname = str(filter_name)
 
@@ -1,20 +1,75 @@
 """Utilities for liquidpy"""
+# pylint: disable=too-many-lines
+import os
+import time
+import pickle
+import hashlib
 import logging
 from io import StringIO
 from pathlib import Path
 from textwrap import shorten as tw_shorten
-from collections import namedtuple
+from threading import Lock, RLock
+from contextlib import contextmanager
+from collections import namedtuple, OrderedDict
 from rich.logging import RichHandler
 from rich.syntax import Syntax
 from rich.console import Console
-from lark import Lark
+from lark import (Lark, Transformer, UnexpectedToken,
+                  __version__ as lark_version)
 from .config import (LIQUID_LOGGER_NAME,
+                     LIQUID_FRAME_ENVNAME,
                      LIQUID_EXC_MAX_STACKS,
-                     LIQUID_EXC_CODE_CONTEXT)
+                     LIQUID_EXC_CODE_CONTEXT,
+                     LIQUID_CACHE_SIZE,
+                     LIQUID_PATH_CACHE_TTL,
+                     LIQUID_PARSER_CACHE_DIR)
 from .exceptions import LiquidNameError
 
 TemplateMeta = namedtuple('TemplateMeta',
                           ['name', 'path', 'stream', 'should_close'])
+PathCacheInfo = namedtuple('PathCacheInfo',
+                           ['hits', 'misses', 'stats', 'currsize'])
+
+class Context:
+    """The context of a parser, a node or a tag, locating it in a template
+
+    It works like a Diot with fixed keys, but is much cheaper to create
+    and copy, since one is created for each node of a template.
+
+    Attributes:
+        name: The name of the template
+        path: The path of the template
+        stream: The stream of the template
+        lineno: The line number (0-based)
+        colno: The column number (0-based)
+        level: The level, used to indent the logs
+    """
+    __slots__ = ('name', 'path', 'stream', 'lineno', 'colno', 'level')
+
+    def __init__(self, # pylint: disable=too-many-arguments
+                 name,
+                 path,
+                 stream,
+                 lineno=0,
+                 colno=0,
+                 level=0):
+        # type: (str, str, IO, int, int, int) -> None
+        self.name = name
+        self.path = path
+        self.stream = stream
+        self.lineno = lineno
+        self.colno = colno
+        self.level = level
+
+    def copy(self):
+        # type: () -> Context
+        """Copy the context"""
+        return self.__class__(self.name, self.path, self.stream,
+                              self.lineno, self.colno, self.level)
+
+    def __repr__(self):
+        return (f'<Context({self.name!r}, line {self.lineno + 1}, '
+                f'column {self.colno + 1}, level {self.level})>')
 
 class Nothing:
     # pylint: disable=too-few-public-methods
@@ -27,8 +82,140 @@ class Nothing:
     def __repr__(self):
         return 'NOTHING'
 
+    def __reduce__(self):
+        # keep it unique when pickled, i.e. with the parsed templates
+        return 'NOTHING'
+
 NOTHING = Nothing()
 
+class RenderFrame:
+    """The states of the tags for one render
+
+    The parsed templates are shared (i.e. by the cached Liquid objects and
+    the threads rendering them), so the states that change while
+    rendering are kept here instead of on the tags. A frame is created for
+    each render and passed along in the global variables.
+
+    Attributes:
+        states: The states of the tags, keyed by the tags
+        cycles: The arguments of the cycle groups, keyed by the loop tags
+            and the group names
+        awaited: The awaitable values and their results, keyed by the ids
+            of them, see `liquid.tags.transformer.await_value`
+    """
+    __slots__ = ('states', 'cycles', 'awaited')
+
+    def __init__(self):
+        self.states = {} # type: Dict[Tag, Any]
+        self.cycles = {} # type: Dict[Tuple[Tag, Any], List[Any]]
+        self.awaited = {} # type: Dict[int, Tuple[Awaitable, Any]]
+
+    @contextmanager
+    def state(self, tag, state):
+        # type: (Tag, Any) -> Iterator[Any]
+        """Set the state of a tag while it is being rendered
+
+        The previous state is restored afterwards, in case that the tag is
+        rendered recursively (i.e. by a template including itself).
+
+        Args:
+            tag: The tag
+            state: The state of the tag
+
+        Yields:
+            The state
+        """
+        prev = self.states.get(tag, NOTHING)
+        self.states[tag] = state
+        try:
+            yield state
+        finally:
+            if prev is NOTHING:
+                del self.states[tag]
+            else:
+                self.states[tag] = prev
+
+class LoopState:
+    # pylint: disable=too-few-public-methods
+    """The flags of a loop being rendered, set by break/continue tags
+
+    Attributes:
+        flag_break: The flag for break statement
+        flag_continue: The flag for continue statement
+    """
+    __slots__ = ('flag_break', 'flag_continue')
+
+    def __init__(self):
+        self.flag_break = False    # type: bool
+        self.flag_continue = False # type: bool
+
+def render_frame(global_vars):
+    # type: (dict) -> RenderFrame
+    """Get the render frame from the global variables, a new one is
+    created if there is not (i.e. a tag rendered directly)"""
+    try:
+        return global_vars[LIQUID_FRAME_ENVNAME]
+    except KeyError:
+        return global_vars.setdefault(LIQUID_FRAME_ENVNAME, RenderFrame())
+
+# the mark of the variables not found in a scope
+_MISSING = object()
+
+class Scope(dict):
+    """The local variables of a scope (i.e. a loop, an included template, a
+    lambda or the arguments of a filter), on top of the ones outside of it
+
+    The variables set go to this scope, and the ones not found here are
+    looked up in the parent, which is not copied. It works the same as a
+    copy of the parent, which costs as many variables as the parent has.
+
+    The scopes nested (i.e. loops in loops) are chained, so that a
+    variable outside of them is looked up in each scope up the chain,
+    which is one more dict lookup per level, instead of one copy of the
+    variables per loop.
+
+    Attributes:
+        parent: The local variables outside of the scope
+
+    Args:
+        parent: The local variables outside of the scope
+        variables: The variables of this scope
+    """
+    __slots__ = ('parent', )
+
+    def __init__(self, parent, variables=()):
+        # type: (Mapping[str, Any], Any) -> None
+        super().__init__(variables)
+        self.parent = parent
+
+    def __missing__(self, key):
+        # type: (str) -> Any
+        return self.parent[key]
+
+    def __contains__(self, key):
+        # type: (Any) -> bool
+        return dict.__contains__(self, key) or key in self.parent
+
+    def get(self, key, default=None):
+        # type: (str, Any) -> Any
+        value = dict.get(self, key, _MISSING)
+        if value is _MISSING:
+            return self.parent.get(key, default)
+        return value
+
+    def copy(self):
+        # type: () -> Scope
+        return self.__class__(self.parent, self)
+
+    def merged(self):
+        # type: () -> Dict[str, Any]
+        """Get all the variables visible in the scope as a dict"""
+        parent = self.parent
+        merged = (parent.merged() if isinstance(parent, Scope)
+                  else dict(parent))
+        merged.update(dict.items(self))
+        return merged
+
 class _PositionalTuple(tuple):
     def __new__(cls, *args):
         return super().__new__(cls, args)
@@ -85,13 +272,15 @@ def template_meta(template):
     """
     if isinstance(template, str):
         path = None # type: Optional[Path]
-        try:
-            path = Path(template)
-            if not path.is_file():
-                raise OSError
-        except OSError:
-            # filename too long or other OSError
-            path = None
+        # no need to look up the ones that are clearly sources
+        if not any(mark in template for mark in ('\n', '{{', '{%')):
+            try:
+                path = Path(template)
+                if not path_resolver.is_file(path):
+                    raise OSError
+            except OSError:
+                # filename too long or other OSError
+                path = None
 
         if not path:
             return TemplateMeta('<string>',
@@ -161,7 +350,7 @@ def shorten(text, width, placeholder=' ...'):
     return string_to_check[:-1] + placeholder
 
 def _exc_stack_code(context):
-    # type: (Diot) -> str
+    # type: (Context) -> str
     console = Console(file=StringIO())
     console.print(f"{context.path!r}, line {context.lineno + 1}, "
                   f"column {context.colno + 1}")
@@ -200,7 +389,7 @@ def _exc_stack_code(context):
     return console.file.getvalue() + "\n"
 
 def excmsg_with_context(msg, context, parser):
-    # type: (str, Diot, Parser) -> str
+    # type: (str, Context, Parser) -> str
     """Assemble the exception message with context
 
     Args:
@@ -227,11 +416,17 @@ def excmsg_with_context(msg, context, parser):
     return '\n'.join(msgs)
 
 def get_tag_parser(start, grammar, transformer, base_grammar=None):
-    # type: (Union[str, Path], TagTransformer, str, Optional[Grammar]) -> Lark
+    # type: (Union[str, List[str]], Any, TagTransformer, Optional[Grammar])
+    #   -> Lark
     """Get the lark parser for tags
 
+    Generating the LALR tables is expensive, so they are saved in
+    `LIQUID_PARSER_CACHE_DIR` and loaded from there next time. The files
+    are named by the hash of the grammar, so that a changed grammar gets
+    its tables regenerated.
+
     Args:
-        start: The start rule name
+        start: The start rule name, or a list of them
         grammar: The new grammar
         transformer: The transformer for the parser
         base_grammar: The base grammar
@@ -248,21 +443,573 @@ def get_tag_parser(start, grammar, transformer, base_grammar=None):
         from .tags.grammar import Grammar
         lark_grammar = Grammar(grammar)
 
-    return Lark(str(lark_grammar),
+    lark_grammar = str(lark_grammar)
+    cache = parser_cache_file(start, lark_grammar)
+    try:
+        # lark pickles the transformer with the tables
+        pickle.dumps(transformer)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        cache = False
+    try:
+        return _get_lark(start, lark_grammar, transformer, cache)
+    except OSError as oserr: # pragma: no cover
+        # unable to write the cache file
+        logger.debug('Failed to cache the tag parser to %s: %s',
+                     cache, oserr)
+        return _get_lark(start, lark_grammar, transformer, False)
+
+class SharedTagParser:
+    """A lark parser with multiple start rules, shared by the tags with the
+    same base grammar
+
+    The tag grammars are merged into the base grammar and the transformers
+    into one transformer class, so that the base rules are only built
+    once into the LALR tables for all the tags in a mode. Tags joining
+    after the parser is built get it rebuilt on next use.
+
+    Attributes:
+        INSTANCES: The shared parsers by the base grammars
+        LOCK: The lock to create the shared parsers
+
+        base_grammar: The base grammar
+        rules: The rules added by the tags
+        starts: The start rules of the tags
+        transformers: The transformer classes of the tags
+        parser: The lark parser, None if it has not been built yet
+        terminals: The terminals each start rule can reach in the parser
+        lock: The lock for joining and building
+
+    Args:
+        base_grammar: The base grammar
+    """
+    INSTANCES = {} # type: Dict[Grammar, SharedTagParser]
+    LOCK = Lock()
+
+    __slots__ = ('base_grammar', 'rules', 'starts', 'transformers',
+                 'parser', 'terminals', 'lock')
+
+    def __init__(self, base_grammar):
+        # type: (Grammar) -> None
+        self.base_grammar = base_grammar
+        self.rules = base_grammar.__class__('')
+        self.starts = set() # type: Set[str]
+        self.transformers = [] # type: List[Type[TagTransformer]]
+        self.parser = None # type: Optional[Lark]
+        self.terminals = {} # type: Dict[str, FrozenSet[str]]
+        self.lock = RLock()
+
+    @classmethod
+    def join(cls, start, grammar, transformer, base_grammar):
+        # type: (str, Any, TagTransformer, Optional[Grammar])
+        #   -> Optional[SharedTagParser]
+        """Get the shared parser for a tag
+
+        Args:
+            start: The start rule name
+            grammar: The new grammar
+            transformer: The transformer for the parser
+            base_grammar: The base grammar
+
+        Returns:
+            The shared parser, or None if the tag cannot share it, i.e.
+            its grammar changes the rules of the base grammar or other tags.
+        """
+        if base_grammar is None:
+            return None
+        with cls.LOCK:
+            shared = cls.INSTANCES.get(base_grammar)
+            if shared is None:
+                shared = cls.INSTANCES[base_grammar] = cls(base_grammar)
+        return shared if shared.add(start, grammar, transformer) else None
+
+    @staticmethod
+    def transformer_class(transformers):
+        # type: (List[Type[TagTransformer]]) -> Type[TagTransformer]
+        """Merge the transformer classes into one
+
+        Raises:
+            TypeError: if the classes cannot be merged
+        """
+        bases = []
+        for trans in transformers:
+            if trans not in bases and not any(issubclass(base, trans)
+                                              for base in bases):
+                bases = [base for base in bases if not issubclass(trans, base)]
+                bases.append(trans)
+        if len(bases) == 1:
+            return bases[0]
+        bases = tuple(bases)
+        return type('SharedTagTransformer', bases, {
+            # make it picklable
+            '__reduce__': lambda self: (_shared_transformer, (bases, ))
+        })
+
+    def add(self, start, grammar, transformer):
+        # type: (str, Any, TagTransformer) -> bool
+        """Add a tag to this parser
+
+        Args:
+            start: The start rule name
+            grammar: The new grammar
+            transformer: The transformer for the parser
+
+        Returns:
+            Whether the tag is added
+        """
+        rules = (grammar if isinstance(grammar, self.base_grammar.__class__)
+                 else self.base_grammar.__class__(grammar or ''))
+        with self.lock:
+            new_rules = self.base_grammar.__class__('')
+            for name, content in rules.grammar.items():
+                if name[0] == '%':
+                    new_rules.grammar[name] = content
+                elif name in self.base_grammar.grammar:
+                    return False
+                elif name not in self.rules.grammar:
+                    new_rules.grammar[name] = content
+                elif self.rules.grammar[name] != content:
+                    return False
+
+            transformers = self.transformers
+            if transformer.__class__ not in transformers:
+                transformers = transformers + [transformer.__class__]
+            try:
+                merged = self.transformer_class(transformers)
+                # the transformer has its own state
+                if vars(merged()) != vars(transformer):
+                    return False
+            except TypeError:
+                return False
+            # no transformer gets its methods overriden by the others
+            for trans in transformers:
+                for klass in trans.__mro__:
+                    if klass in Transformer.__mro__:
+                        continue
+                    for name in vars(klass):
+                        if (name[:2] != '__' and
+                                _lookup(merged, name) is not _lookup(trans,
+                                                                     name)):
+                            return False
+
+            self.rules.update(new_rules)
+            self.starts.add(start)
+            self.transformers = transformers
+            self.parser = None
+            self.terminals = {}
+            return True
+
+    @property
+    def built(self):
+        # type: () -> bool
+        """Whether the parser has been built"""
+        return self.parser is not None
+
+    def build(self):
+        # type: () -> Lark
+        """Build the parser if it has not been built yet
+
+        Returns:
+            The lark parser
+        """
+        parser = self.parser
+        if parser is None:
+            with self.lock:
+                if self.parser is None:
+                    self.parser = get_tag_parser(
+                        sorted(self.starts),
+                        self.rules,
+                        self.transformer_class(self.transformers)(),
+                        self.base_grammar
+                    )
+                parser = self.parser
+        return parser
+
+    def foreign(self, parser, start, terminal):
+        # type: (Lark, str, str) -> bool
+        """Check if a terminal is only reachable from the start rules of
+        the other tags
+
+        Args:
+            parser: The lark parser built
+            start: The start rule of the tag
+            terminal: The name of the terminal
+
+        Returns:
+            True if the tag's own grammar cannot produce the terminal
+        """
+        terminals = self.terminals.get(start)
+        if terminals is None:
+            expansions = {} # type: Dict[str, List[Symbol]]
+            for rule in parser.rules:
+                expansions.setdefault(rule.origin.name, []).extend(
+                    rule.expansion
+                )
+            reached = {start}
+            stack = [start]
+            terms = {'$END'}
+            while stack:
+                for symbol in expansions.get(stack.pop(), ()):
+                    if symbol.is_term:
+                        terms.add(symbol.name)
+                    elif symbol.name not in reached:
+                        reached.add(symbol.name)
+                        stack.append(symbol.name)
+            terminals = self.terminals[start] = frozenset(terms)
+        return terminal not in terminals
+
+def _lookup(klass, name):
+    # type: (Type, str) -> Any
+    """Look up an attribute of a class without binding it"""
+    for base in klass.__mro__:
+        if name in vars(base):
+            return vars(base)[name]
+    return None # pragma: no cover
+
+def _shared_transformer(transformers):
+    # type: (Tuple[Type[TagTransformer]]) -> TagTransformer
+    """Get the merged transformer for the shared parsers, used to unpickle
+    them"""
+    return SharedTagParser.transformer_class(transformers)()
+
+class LazyTagParser:
+    """The parser of a tag class, built on first use
+
+    Most templates use only a few tags, so the parsers are not built when
+    the tag classes are defined. Tags with the same base grammar share a
+    `SharedTagParser`, unless the tag changes the rules of the others.
+    Building is guarded by a lock, so that the parser is built only once
+    even if the tags are parsed by multiple threads at the same time.
+
+    Attributes:
+        start: The start rule name
+        shared: The shared parser, or None if the tag has its own parser
+
+    Args:
+        start: The start rule name
+        grammar: The new grammar
+        transformer: The transformer for the parser
+        base_grammar: The base grammar
+        shared: Whether to try to share the parser with other tags
+    """
+    __slots__ = ('start', 'shared', 'args', 'parser', 'lock')
+
+    def __init__(self, # pylint: disable=too-many-arguments
+                 start,
+                 grammar,
+                 transformer,
+                 base_grammar=None,
+                 shared=True):
+        # type: (str, Any, TagTransformer, Optional[Grammar], bool) -> None
+        self.start = start
+        self.shared = (SharedTagParser.join(start, grammar,
+                                            transformer, base_grammar)
+                       if shared
+                       else None) # type: Optional[SharedTagParser]
+        self.args = (start, grammar, transformer, base_grammar)
+        self.parser = None # type: Optional[Lark]
+        self.lock = Lock()
+
+    @property
+    def built(self):
+        # type: () -> bool
+        """Whether the parser has been built"""
+        if self.shared:
+            return self.shared.built
+        return self.parser is not None
+
+    def build(self):
+        # type: () -> Lark
+        """Build the parser if it has not been built yet
+
+        Returns:
+            The lark parser
+        """
+        if self.shared:
+            return self.shared.build()
+        return self._build_own()
+
+    def _build_own(self):
+        # type: () -> Lark
+        """Build the parser of the tag itself"""
+        if self.parser is None:
+            with self.lock:
+                if self.parser is None:
+                    self.parser = get_tag_parser(*self.args)
+        return self.parser
+
+    def parse(self, text):
+        # type: (str) -> Any
+        """Parse the content of a tag
+
+        Args:
+            text: The content of the tag
+
+        Returns:
+            The transformed parse tree
+        """
+        if self.shared:
+            parser = self.shared.build()
+            try:
+                return parser.parse(text, start=self.start)
+            except UnexpectedToken as exc:
+                # The LALR states are merged across the start rules in the
+                # shared parser, a token only known by the other tags could
+                # make it reject valid content. Leave that to the tag's own
+                # parser, the other errors are real syntax errors.
+                if not self.shared.foreign(parser,
+                                           self.start,
+                                           exc.token.type):
+                    raise
+        return self._build_own().parse(text)
+
+def parser_cache_file(start, grammar):
+    # type: (str, str) -> Union[str, bool]
+    """Get the file to cache the LALR tables of a tag parser
+
+    The cache directory defaults to `liquidpy` in `$XDG_CACHE_HOME` or
+    `~/.cache`, resolved here instead of at import, since the home
+    directory may not be known, i.e. for a user without one.
+
+    Args:
+        start: The start rule name
+        grammar: The grammar of the parser
+
+    Returns:
+        The path to the cache file, or False if the cache is disabled or
+        the cache directory cannot be resolved or created.
+    """
+    if LIQUID_PARSER_CACHE_DIR is None:
+        try:
+            cachedir = Path(os.environ.get('XDG_CACHE_HOME')
+                            or Path.home() / '.cache') / 'liquidpy'
+        except (RuntimeError, KeyError):
+            return False
+    elif not LIQUID_PARSER_CACHE_DIR:
+        return False
+    else:
+        cachedir = Path(LIQUID_PARSER_CACHE_DIR)
+    try:
+        cachedir.mkdir(parents=True, exist_ok=True)
+    except OSError: # pragma: no cover
+        return False
+    digest = hashlib.sha256(
+        f'{lark_version}:{start}:{grammar}'.encode()
+    ).hexdigest()
+    return str(cachedir / f'tag-parser-{digest}.lark')
+
+def _get_lark(start, grammar, transformer, cache):
+    # type: (Union[str, List[str]], str, TagTransformer, Union[str, bool])
+    #   -> Lark
+    """Create the lark object"""
+    return Lark(grammar,
                 parser='lalr',
                 start=start,
                 debug=False,
+                cache=cache,
                 maybe_placeholders=True,
                 # pylint: disable=not-callable
                 transformer=transformer)
 
+class PathResolver:
+    """Resolve the paths of the templates with the results memoized
+
+    The results are keyed by the name, the current path and the search
+    paths. Whether a path is a file or a directory is answered by the
+    listing of its parent directory, which is also kept, and checked by
+    the file system when the listing misses it. The results and the
+    listings are checked again after `ttl` seconds: the listing is only
+    renewed when the modification time of the directory changes, so that
+    the candidates found cost one stat for each directory instead of one
+    for each candidate.
+
+    Attributes:
+        ttl: The seconds before the results and the listings are checked
+            again
+        maxsize: The max number of the results and the listings to keep
+        hits: The number of the lookups answered by the memoized results
+        misses: The number of the lookups resolved again
+        stats: The number of the stats and the listings of directories
+
+    Args:
+        ttl: The seconds before the results and the listings are checked
+            again
+        maxsize: The max number of the results and the listings to keep
+    """
+
+    def __init__(self, ttl=LIQUID_PATH_CACHE_TTL, maxsize=LIQUID_CACHE_SIZE):
+        # type: (float, int) -> None
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.stats = 0
+        # key => (result, checked)
+        self._results = OrderedDict() # type: OrderedDict
+        # directory => [files, dirs, mtime, checked]
+        self._listings = OrderedDict() # type: OrderedDict
+        self._lock = RLock()
+
+    def _remember(self, cache, key, value):
+        # type: (OrderedDict, Any, Any) -> None
+        """Save an entry, dropping the least recently used ones"""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max(self.maxsize, 0):
+            cache.popitem(last=False)
+
+    def _mtime(self, directory):
+        # type: (str) -> Optional[int]
+        """Get the modification time of a directory, None if it is not"""
+        self.stats += 1
+        try:
+            return os.stat(directory).st_mtime_ns
+        except (OSError, ValueError):
+            return None
+
+    def _listing(self, directory):
+        # type: (str) -> List
+        """Get the files and the directories under a directory"""
+        directory = os.path.abspath(directory)
+        now = time.monotonic()
+        listing = self._listings.get(directory)
+        if listing is not None:
+            if now - listing[3] < self.ttl:
+                self._listings.move_to_end(directory)
+                return listing
+            if self._mtime(directory) == listing[2]:
+                listing[3] = now
+                self._listings.move_to_end(directory)
+                return listing
+
+        files, dirs = set(), set()
+        mtime = self._mtime(directory)
+        if mtime is not None:
+            self.stats += 1
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            dirs.add(entry.name)
+                        elif entry.is_file():
+                            files.add(entry.name)
+            except OSError:
+                pass
+        listing = [files, dirs, mtime, now]
+        self._remember(self._listings, directory, listing)
+        return listing
+
+    def _check(self, path, index):
+        # type: (Union[str, Path], int) -> bool
+        """Check a path by the listing of its parent, index 0 for files
+        and 1 for directories"""
+        path = Path(path)
+        if path.name not in ('', '.', '..'):
+            with self._lock:
+                listing = self._listing(path.parent)
+            if path.name in listing[index]:
+                return True
+            if listing[2] is None:
+                # the parent directory does not exist
+                return False
+        # not in the listing: i.e. the name in another case on a
+        # case-insensitive file system, or created since the listing
+        self.stats += 1
+        return path.is_file() if index == 0 else path.is_dir()
+
+    def is_file(self, path):
+        # type: (Union[str, Path]) -> bool
+        """Check if a path is a file"""
+        try:
+            return self._check(path, 0)
+        except (OSError, ValueError):
+            return False
+
+    def is_dir(self, path):
+        # type: (Union[str, Path]) -> bool
+        """Check if a path is a directory"""
+        try:
+            return self._check(path, 1)
+        except (OSError, ValueError):
+            return False
+
+    def _memoized(self, key, resolve):
+        # type: (Tuple, Callable[[], Any]) -> Any
+        """Get the memoized result or resolve it again"""
+        with self._lock:
+            now = time.monotonic()
+            try:
+                result, checked = self._results[key]
+            except KeyError:
+                pass
+            else:
+                if now - checked < self.ttl:
+                    self.hits += 1
+                    self._results.move_to_end(key)
+                    return result
+            self.misses += 1
+            result = resolve()
+            self._remember(self._results, key, (result, now))
+            return result
+
+    def find_template(self, path, curr_path, config_paths):
+        # type: (str, Optional[Union[str, Path]], List[Union[str, Path]])
+        #   -> Optional[Path]
+        """Find the template by given path, see `find_template`"""
+        path = Path(path)
+        if path.is_absolute():
+            return path
+
+        curr_path = Path(curr_path).parent if curr_path else Path('.')
+        candidates = [*config_paths, curr_path]
+
+        def resolve():
+            for cpath in candidates:
+                thepath = Path(cpath) / path
+                if self.is_file(thepath):
+                    return thepath
+            return None
+
+        return self._memoized(
+            ('template', str(path), tuple(str(cpath) for cpath in candidates)),
+            resolve
+        )
+
+    def find_dir(self, path, curr_path):
+        # type: (str, Optional[Union[str, Path]]) -> Optional[Path]
+        """Find the directory by given path, see `find_dir`"""
+        path = Path(path)
+        if path.is_absolute():
+            return path
+
+        curr_path = Path(curr_path).parent if curr_path else Path('.')
+        ret = curr_path / path
+        return self._memoized(('dir', str(ret)),
+                              lambda: ret if self.is_dir(ret) else None)
+
+    def info(self):
+        # type: () -> PathCacheInfo
+        """Get the statistics of the memoized paths"""
+        with self._lock:
+            return PathCacheInfo(self.hits, self.misses, self.stats,
+                                 len(self._results))
+
+    def clear(self):
+        # type: () -> None
+        """Forget all the paths and the listings and reset the counters"""
+        with self._lock:
+            self._results.clear()
+            self._listings.clear()
+            self.hits = self.misses = self.stats = 0
+
 def find_template(path, curr_path, config_paths):
     # type: (str, Optional[Union[str, Path]], List[Union[str, Path]])
     #   -> Optional[Path]
     """Find the template by given path
 
-    curr_path will always be the first one to look up. If it is None (template
-    from a string, for example), current working directory will be used.
+    config_paths are looked up first, and then the directory of curr_path.
+    If curr_path is None (template from a string, for example), current
+    working directory will be used. The results are memoized by
+    `path_resolver`.
 
     Args:
         path: The path to look up
@@ -272,27 +1019,14 @@ def find_template(path, curr_path, config_paths):
     Returns:
         The path found either directory.
     """
-    path = Path(path)
-    if path.is_absolute():
-        return path
-
-    if not curr_path: # pragma: no cover
-        curr_path = Path('.')
-    else:
-        curr_path = Path(curr_path).parent
-
-    config_paths = config_paths + [curr_path]
-    for cpath in config_paths:
-        thepath = Path(cpath) / path
-        if thepath.is_file():
-            return thepath
-    return None
+    return path_resolver.find_template(path, curr_path, config_paths)
 
 def find_dir(path, curr_path):
     # type: (str, Optional[Union[str, Path]]) -> Optional[Path]
     """Find the directory by given path
 
-    If path is relative, find one relative to curr_path.
+    If path is relative, find one relative to curr_path. The results are
+    memoized by `path_resolver`.
 
     Args:
         path: The path to look up
@@ -301,15 +1035,9 @@ def find_dir(path, curr_path):
     Returns:
         The directory found
     """
-    path = Path(path)
-    if path.is_absolute():
-        return path
-
-    curr_path = Path(curr_path).parent if curr_path else Path('.')
-
-    ret = curr_path / path
-    return ret if ret.is_dir() else None
+    return path_resolver.find_dir(path, curr_path)
 
 # pylint: disable=invalid-name
+path_resolver = PathResolver() # type: PathResolver
 logger = logging.getLogger(LIQUID_LOGGER_NAME)
 logger.addHandler(RichHandler(show_time=False, show_path=False))
@@ -0,0 +1,283 @@
+"""The character-wise node scanner, superseded by
+`liquid.nodes.NodeScanner`, to check and benchmark the latter against"""
+from liquid.config import LIQUID_LOG_INDENT
+from liquid.nodes import NodeLiteral, NodeOutput, NodeTag
+from liquid.python.parser import NodeScanner as NodeScannerPython
+from liquid.utils import logger
+from liquid.exceptions import LiquidSyntaxError
+
+class NodeScannerLegacy:
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """Scanning for the nodes character by character
+
+    This is the original scanner, superseded by `liquid.nodes.NodeScanner`.
+    It is kept as a reference implementation to check and benchmark the
+    latter against.
+
+    Attributes:
+        LITERAL: The literal node
+        NODES: The possible nodes
+        OPEN_CHARS: The start characters of open tags for those nodes
+            This is to speed up the lookup for a potential hit of a node
+
+        context: The context of the potential node
+        open_context: Where the open tag hits
+        hit: The node we hit
+            This will be only fit when there is only one type of node hit
+        literal_buffer: The buffer for literal nodes
+            This will not consume the potential node
+        opentag_buffer: The buffer for open tags
+        closetag_buffer: The buffer for close tags
+        content_buffer: The buffer for content of potential nodes
+        escape: Whether the previous character is an escape (`\\`)
+        rawtag: The matched raw tag name
+        parser: The parser
+    """
+
+    __slots__ = ('context', 'open_context', 'hit', 'literal_buffer',
+                 'opentag_buffer', 'content_buffer', 'closetag_buffer',
+                 'escape', 'rawtag', 'parser')
+
+
+    LITERAL = NodeLiteral          # type: NodeLiteral
+    NODES = (NodeOutput, NodeTag)  # type: Tuple[Type[Node]]
+    OPEN_CHARS = set(tag[0] for node in NODES
+                     for tag in node.OPEN_TAG) # type: Set[str]
+
+    def __init__(self, context, parser):
+        # type: (Context, "Parser") -> None
+
+        self.context = context      # type: Context
+        self.open_context = None    # type: Context
+        self.hit = None             # type: Optional[Node]
+        self.literal_buffer = ''    # type: str
+        self.opentag_buffer = None  # type: str
+        self.closetag_buffer = None # type: str
+        self.content_buffer = None  # type: str
+        self.escape = None          # type: bool
+        self.rawtag = None          # type: Optional[str]
+        self.parser = parser        # type: Parser
+        self._clear_state()
+
+    def _clear_state(self):
+        """Clear the hit state."""
+        self.hit = None
+        self.opentag_buffer = ''
+        self.closetag_buffer = ''
+        self.content_buffer = ''
+
+    def _summarize(self, end=False):
+        """Summarize the residue"""
+
+        # we don't have any node hit, summarize the literal
+        if not self.hit:
+            # context is mutable, have to copy it to keep current context
+            literal = (self.literal_buffer + self.opentag_buffer
+                       if end
+                       else self.literal_buffer) # type: str
+            self.literal_buffer = ''
+            if literal:
+                node = self.LITERAL(literal, self.open_context, self.parser)
+                logger.debug('[dim italic]%s  Found %r[/dim italic]',
+                             self.context.level * LIQUID_LOG_INDENT,
+                             node.tag,
+                             extra={"markup": True})
+                return node
+            return not end
+
+        # We got a hit, if no closetag hit yet,
+        # we need to summarize previous literals
+        if not self.closetag_buffer:
+            if self.literal_buffer:
+                node = self.LITERAL(self.literal_buffer,
+                                    self.open_context,
+                                    self.parser)
+                self.literal_buffer = ''
+                logger.debug('[dim italic]%s  Found %r[/dim italic]',
+                             self.context.level * LIQUID_LOG_INDENT,
+                             node.tag,
+                             extra={"markup": True})
+                self.open_context = self.context.copy()
+                self.open_context.colno -= len(self.opentag_buffer)
+                return node
+            if not end:
+                return True
+        if self.closetag_buffer in self.hit.CLOSE_TAG:
+            # let's see if we are inside a raw tag
+            if self.rawtag:
+                # NodeTag
+                if (not self.hit.name and
+                        self.content_buffer.strip() == 'end' + self.rawtag):
+                    self.rawtag = None
+                else:
+                    self.literal_buffer += (self.opentag_buffer +
+                                            self.content_buffer +
+                                            self.closetag_buffer)
+                    logger.debug('[dim italic]%s  Gave up %r (inside raw tag)'
+                                 '[/dim italic]',
+                                 self.context.level * LIQUID_LOG_INDENT,
+                                 self.hit.__name__,
+                                 extra={"markup": True})
+                    self._clear_state()
+                    if not end:
+                        return True
+
+            node = self.hit(self.content_buffer,
+                            self.open_context,
+                            self.parser,
+                            self.opentag_buffer,
+                            self.closetag_buffer) # type: Type[Node]
+
+            logger.debug('%s  Found %r',
+                         self.context.level * LIQUID_LOG_INDENT,
+                         node.tag)
+            if node.raw:
+                self.rawtag = node.name
+
+            self._clear_state()
+            return node
+
+        context = self.open_context or self.context
+        raise LiquidSyntaxError(
+            f'Unclosed node {self.hit.__name__} ({context.name}, '
+            f'line {context.lineno + 1}, '
+            f'column {context.colno + 1})',
+            context,
+            self.parser
+        )
+
+    def _open_node(self, char):
+        # type: (str) -> Optional[bool]
+        """check if char is opening a node only when one definite
+        type of node hit"""
+        if ((not self.opentag_buffer and not char in self.OPEN_CHARS) or
+                self.content_buffer):
+            return False
+
+        opentag = self.opentag_buffer + char # type: str
+        # See if we already have a hit, see if we hit '-'
+        if self.hit:
+            return opentag in self.hit.OPEN_TAG
+
+        potential_hits = [node for node in self.NODES
+                          if any(tag.startswith(opentag)
+                                 for tag in node.OPEN_TAG)]
+
+        if len(potential_hits) == 1:
+            self.hit = potential_hits[0]
+            return True
+        if len(potential_hits) > 1:
+            return None
+        return False
+
+    def _close_node(self, char):
+        # type: (str) -> Optional[bool]
+        """Check if a char is closing a node"""
+
+        closetag = self.closetag_buffer + char # type: str
+        if closetag in self.hit.CLOSE_TAG:
+            return True
+        if any(ctag.startswith(closetag) for ctag in self.hit.CLOSE_TAG):
+            return None
+        return False
+
+    def _add_to_buffer(self, char):
+        # type: (str) -> Union[bool, Type[Node]]
+        """Add character to buffer, and decide whether we should do a summary
+        on the state"""
+        # When should we do a summary:
+        # 1. When a potential hit is determined (ie `{%` hit)
+        # 2. When a hit closes (ie `%}` hit)
+        # 3. Stream end hit
+        if self.escape:
+            char = f'\\{char}'
+            self.escape = False
+
+        if not self.hit:
+            opened = self._open_node(char) # type: Optional[bool]
+            if opened is True: # pragma: no cover
+                self.opentag_buffer += char
+                ret = self._summarize()
+                logger.debug('[dim italic]%s  Opened potential node: %s '
+                             '(line: %s, column: %s)[/dim italic]',
+                             self.context.level * LIQUID_LOG_INDENT,
+                             self.hit.__name__,
+                             self.open_context.lineno + 1,
+                             self.open_context.colno + 1,
+                             extra={"markup": True})
+                return ret
+
+            if opened is False:
+                self.literal_buffer += self.opentag_buffer + char
+                self.opentag_buffer = ''
+
+            else: # hit potentially, multiple node types hit
+                self.opentag_buffer += char
+
+        elif self._open_node(char) is False:
+            closed = self._close_node(char)
+            if closed is True:
+                self.closetag_buffer += char
+                node = self._summarize()
+                if isinstance(node, bool):
+                    return node
+                self.open_context = self.context.copy()
+                logger.debug('[dim italic]%s  Closed node: %s[/dim italic]',
+                             self.context.level * LIQUID_LOG_INDENT,
+                             f"{node.__class__.__name__}({node.tag.name})"
+                             if isinstance(node, NodeTag)
+                             else node.name,
+                             extra={"markup": True})
+                return node
+
+            if closed is False:
+                self.content_buffer += self.closetag_buffer + char
+                self.closetag_buffer = ''
+
+            else: # potentially closed
+                self.closetag_buffer += char
+
+        else: # we hit '-'
+            self.opentag_buffer += char
+        return True
+
+    def consume(self, stream):
+        # type: (IO) -> Union[bool, Type[Node]]
+        """Consume the character of a stream
+
+        if it is empty, then we hit the end of the stream.
+        Otherwise, we need to update the context, and add the character to the
+        buffer.
+
+        Args:
+            stream: The stream to consume
+
+        Returns:
+            True: we should continue consuming
+            False: we should stop consuming (we hit the end of the stream)
+            Node: A complete node hit
+        """
+        char = stream.read(1) # type: str
+        if not char:
+            return self._summarize(end=True)
+
+        if char == '\n':
+            self.context.lineno += 1
+            self.context.colno = 0
+            return self._add_to_buffer(char)
+        if char == '\\':
+            self.escape = not self.escape
+            self.context.colno += 1
+            if not self.escape:
+                return self._add_to_buffer(char)
+        else:
+            self.context.colno += 1
+            return self._add_to_buffer(char)
+
+        return True
+
+class NodeScannerLegacyPython(NodeScannerLegacy):
+    # pylint: disable=too-few-public-methods
+    """The character-wise scanner allowing NodeComment: {# ... #}"""
+    NODES = NodeScannerPython.NODES
+    OPEN_CHARS = NodeScannerLegacy.OPEN_CHARS
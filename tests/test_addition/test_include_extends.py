@@ -31,10 +31,9 @@ def test_mother_not_exists():
     ).render()
 
 def test_block_not_exists():
-    with pytest.raises(LiquidRenderError) as exc:
-        Liquid(
-            HERE / 'templates' / 'noblock.liquid'
-    ).render()
+    # blocks are placed in the mother template when parsed
+    with pytest.raises(LiquidSyntaxError, match="Block 'z' does not exist"):
+        Liquid(HERE / 'templates' / 'noblock.liquid')
 
 def test_include_extends():
     tpl = HERE / 'templates' / 'curr3.liquid'
@@ -0,0 +1,87 @@
+import pytest
+from liquid import Liquid, Environment, DictLoader
+
+@pytest.mark.parametrize('template,variables,paths', [
+    ('{{ shop.name | upcase }}{{ a[0].b["c"][d] }}',
+     {'shop', 'a', 'd'},
+     {'shop.name', 'a[0].b.c[]', 'd'}),
+    ('{% for p in products limit: n %}{{ p.title }}{{ forloop.index }}'
+     '{% else %}{{ empty_text }}{% endfor %}',
+     {'products', 'n', 'empty_text'},
+     {'products', 'products[].title', 'n', 'empty_text'}),
+    ('{% tablerow t in ts cols: 2 %}{{ t.n }}{% endtablerow %}',
+     {'ts'}, {'ts', 'ts[].n'}),
+    ('{% assign x = product.title %}{{ x.size }}'
+     '{% capture y %}{{ w }}{% endcapture %}{{ y }}',
+     {'product', 'w'}, {'product.title', 'product.title.size', 'w'}),
+    # not assigned if the branch is not taken
+    ('{% if c %}{% assign y = 1 %}{{ y }}{% endif %}{{ y }}',
+     {'c', 'y'}, {'c', 'y'}),
+    # used before assigned
+    ('{{ y }}{% assign y = 1 %}', {'y'}, {'y'}),
+    # filters not available are looked up in the context
+    ('{{ a | myfilter: b = c }}', {'a', 'myfilter', 'c'},
+     {'a', 'myfilter', 'c'}),
+    ('{% comment %}{{ x }}{% endcomment %}{% raw %}{{ y }}{% endraw %}',
+     set(), set()),
+])
+def test_analyze(template, variables, paths):
+    analysis = Liquid(template).analyze()
+    assert analysis.variables == variables
+    assert analysis.paths == paths
+    assert analysis.complete
+
+def test_analyze_names():
+    liq = Liquid('{% assign x = 1 %}{% capture y %}{% endcapture %}'
+                 '{% for i in (1..2) %}{% cycle "a", "b" %}{% endfor %}'
+                 '{{ x | plus: 1 | append: y }}')
+    analysis = liq.analyze()
+    assert analysis.filters == {'plus', 'append'}
+    assert analysis.tags == {'assign', 'capture', 'for', 'cycle'}
+    assert analysis.assigns == {'x', 'y'}
+    assert analysis.includes == set()
+    assert analysis.extends == ()
+    assert liq.analyze() is analysis
+
+def test_analyze_includes_and_extends():
+    env = Environment(loader=DictLoader({
+        'card': '{{ include.p.title }}{{ include.o }}{{ q }}',
+        'base': '{% block b %}{{ m }}{% endblock %}{{ n }}',
+        'mid': ('{% extends base %}{% block b %}{{ mm }}'
+                '{% include card p=prod %}{% endblock %}'),
+    }))
+    analysis = env.from_string(
+        '{% extends mid %}{% block b %}{% for pr in prods %}'
+        '{% include card p=pr o=1 %}{% endfor %}{% endblock %}'
+    ).analyze()
+    # the blocks replaced are not referred to
+    assert analysis.variables == {'prods', 'q', 'n'}
+    assert analysis.paths == {'prods', 'prods[]', 'prods[].title', 'q', 'n'}
+    assert analysis.includes == {'<dict>/card'}
+    assert analysis.extends == ('<dict>/mid', '<dict>/base')
+    assert analysis.complete
+
+    analysis = env.from_string('{% include {{ name }} p=x %}').analyze()
+    assert analysis.variables == {'name', 'x'}
+    assert not analysis.complete
+
+def test_analyze_specialized():
+    liq = Liquid('{{ site.name }}{{ page.title }}',
+                 {'specialize': True}, site={'name': 'S'})
+    assert liq.analyze().variables == {'page'}
+
+def test_analyze_python():
+    liq = Liquid('{% for x, y in items | enumerate %}{{ x }}{% endfor %}'
+                 '{% for p in ps %}{{ p.a }}{% endfor %}'
+                 '{{ xs | map: lambda q, r=s: q.v + r }}'
+                 '{{ len(a) | @b.c | .upper | min: _, 2 }}',
+                 {'mode': 'python'})
+    analysis = liq.analyze()
+    assert analysis.variables == {'items', 'ps', 'xs', 's', 'a', 'b'}
+    assert analysis.paths == {'items', 'ps', 'ps[].a', 'xs', 's', 'a', 'b.c'}
+    assert analysis.filters == {'enumerate', 'map', 'min'}
+    assert analysis.complete
+
+    liq = Liquid('{% python x = 1 %}{{ x }}',
+                 {'mode': 'python', 'strict': False})
+    assert not liq.analyze().complete
@@ -0,0 +1,198 @@
+import time
+import asyncio
+from pathlib import Path
+import pytest
+from liquid import Liquid, LiquidRenderError
+from liquid.filters import filter_manager
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+def run(coro):
+    # run() requires python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+async def value(val):
+    await asyncio.sleep(0)
+    return val
+
+class User:
+    def __init__(self, name):
+        self._name = name
+
+    @property
+    async def name(self):
+        return await value(self._name)
+
+@pytest.fixture
+def async_filter():
+    @filter_manager.register('shout')
+    async def shout(base, suffix='!'):
+        return await value(f'{base.upper()}{suffix}')
+    yield
+    filter_manager.unregister('shout')
+
+@pytest.mark.parametrize('config', [{}, {'compile': True}])
+def test_render_async(config, async_filter):
+    template = ('{{ user.name | shout }} {{ count | plus: 1 }} '
+                '{% for x in items %}{{ x }}{% endfor %}'
+                '{% if flag %}{{ users[0].name | shout: "?" }}{% endif %}')
+    liq = Liquid(template, config)
+    rendered = run(liq.render_async(
+        user=User('ann'),
+        count=value(1),
+        items=value([1, 2]),
+        flag=value(True),
+        users=[User('bob')]
+    ))
+    assert rendered == 'ANN! 2 12BOB?'
+
+@pytest.mark.filterwarnings('ignore:coroutine:RuntimeWarning')
+def test_render_async_unused_values():
+    awaited = []
+
+    async def fetch(val):
+        awaited.append(val)
+        return val
+
+    liq = Liquid('{% if a %}{{ b }}{% else %}{{ c }}{% endif %}')
+    assert run(liq.render_async(a=fetch(False), b=fetch(1),
+                                c=fetch(2))) == '2'
+    assert awaited == [False, 2]
+
+def test_render_async_python_mode():
+    async def fetch(val):
+        return await value(val)
+
+    liq = Liquid('{{ fetch(1) + x }}{{ x | fetch }}{{ d["a"] }}',
+                 {'mode': 'python'})
+    assert run(liq.render_async(
+        fetch=fetch, x=1, d={'a': value(3)}
+    )) == '213'
+
+def test_render_async_contextvars():
+    contextvars = pytest.importorskip('contextvars')
+    request_id_var = contextvars.ContextVar('request_id')
+
+    async def request_id():
+        return request_id_var.get()
+
+    async def main():
+        request_id_var.set('r1')
+        return await Liquid('{{ rid }}').render_async(rid=request_id())
+
+    assert run(main()) == 'r1'
+
+def test_render_async_error():
+    async def fail():
+        raise ValueError('failed to fetch')
+
+    with pytest.raises(LiquidRenderError, match='failed to fetch'):
+        run(Liquid('{{ a }}').render_async(a=fail()))
+
+def test_render_async_nested(async_filter):
+    inner = Liquid('{{ x | shout }}')
+
+    @filter_manager.register('render_inner')
+    async def render_inner(base):
+        return await inner.render_async(x=base)
+
+    try:
+        liq = Liquid('{{ a | render_inner }}-{{ b | render_inner }}')
+        assert run(liq.render_async(a='x', b=value('y'))) == 'X!-Y!'
+    finally:
+        filter_manager.unregister('render_inner')
+
+@pytest.mark.filterwarnings('ignore:coroutine:RuntimeWarning')
+@pytest.mark.parametrize('template,context,config', [
+    ('{% if a %}1{% elsif b %}2{% else %}3{% endif %}', {'a': 0, 'b': 1},
+     {}),
+    ('{% unless a %}1{% endunless %}{{ a }}', {'a': False}, {}),
+    ('{% for x in y limit: n offset: 1 reversed %}{{ forloop.index }}'
+     '{{ x }}{% if x == 3 %}{% break %}{% endif %}{% else %}e{% endfor %}',
+     {'y': [1, 2, 3, 4, 5], 'n': 3}, {}),
+    ('{% for x in y %}{{ x }}{% else %}e{% endfor %}', {'y': ''}, {}),
+    ('{% case a %}{% when 1 %}one{% when b %}two{% else %}other'
+     '{% endcase %}', {'a': 2, 'b': 2}, {}),
+    ('{% assign x = a | plus: 1 %}{% capture y %}{{ x }}{{ a }}'
+     '{% endcapture %}{{ y }}', {'a': 1}, {}),
+    ('{% for x in (1..n) %}{% cycle "a", b %}{% increment i %}'
+     '{% decrement j %}{% endfor %}', {'n': 3, 'b': 'b'}, {}),
+    ('{% tablerow x in y cols: n %}{{ x }}{% endtablerow %}',
+     {'y': [1, 2, 3], 'n': 2}, {}),
+    ('{% raw %}{{ a }}{% endraw %}{% comment %}{{ a }}{% endcomment %}'
+     '{{ a.size }}{{ a[0] }}{{ d.k }}{{ d["k"] }}',
+     {'a': [1, 2], 'd': {'k': 'v'}}, {}),
+    ('{% include include.liquid x=a %}', {'a': 1}, {}),
+    ('{% include {{ name }} x=a %}', {'name': 'include.liquid', 'a': 1},
+     {}),
+    ('{% extends mother.liquid %}{% block b %}{{ a }}{% endblock %}',
+     {'a': 1}, {}),
+    ('{% for k, v in d.items() %}{{ k }}{{ v }}{% endfor %}'
+     '{% while x > 0 %}{{ x }}{% assign x = x - 1 %}{% endwhile %}',
+     {'d': {'a': 1}, 'x': 2}, {'mode': 'python'}),
+    ('{% if a %}1{% elif b %}2{% else if c %}3{% endif %}'
+     '{% unless a %}4{% else %}5{% endunless %}',
+     {'a': 0, 'b': 0, 'c': 1}, {'mode': 'python'}),
+    ('{{ x | ? plus: 1 ! minus: 1 }}{{ s | .join: [s, s] }}'
+     '{{ d | **f }}{{ (x, ) | *f }}{{ (x, -x)[0] ** 2 + -x }}'
+     '{{ {x, x} | len }}{{ [1, 2, 3][x:] }}{{ d | ["a"]: s }}',
+     {'x': 2, 's': ',', 'd': {'a': len}, 'f': lambda a: a},
+     {'mode': 'python'}),
+])
+def test_render_async_same_as_render(template, context, config):
+    config = {'include_dir': [TEMPLATES], 'extends_dir': [TEMPLATES],
+              **config}
+    liq = Liquid(template, config)
+    # each value used more than once is awaited once, the filters are
+    # not awaited
+    rendered = run(liq.render_async(**{
+        key: val if callable(val) else value(val)
+        for key, val in context.items()
+    }))
+    assert rendered == liq.render(**context)
+
+def test_render_async_concurrent():
+    liq = Liquid('{{ a }}')
+
+    async def slow(val):
+        await asyncio.sleep(.1)
+        return val
+
+    async def main():
+        return await asyncio.gather(*(
+            liq.render_async(a=slow(i)) for i in range(100)
+        ))
+
+    start = time.time()
+    assert run(main()) == [str(i) for i in range(100)]
+    # 10 seconds if the renders wait for each other
+    assert time.time() - start < 2
+
+def test_render_async_nested_deep():
+    liq = Liquid('{% if n > 0 %}{{ n | minus: 1 | again }}'
+                 '{% else %}{{ n | slow }}{% endif %}')
+
+    @filter_manager.register('slow')
+    async def slow(base):
+        await asyncio.sleep(.1)
+        return f'{base}!'
+
+    @filter_manager.register('again')
+    async def again(base):
+        return await liq.render_async(n=base)
+
+    async def main():
+        return await asyncio.gather(*(
+            liq.render_async(n=10) for _ in range(50)
+        ))
+
+    try:
+        assert run(main()) == ['0!'] * 50
+    finally:
+        filter_manager.unregister('slow')
+        filter_manager.unregister('again')
@@ -0,0 +1,141 @@
+import os
+import pytest
+from pathlib import Path
+from liquid import (Liquid, LiquidRenderError, Environment, Loader,
+                    template_cache)
+from liquid.cache import TemplateCache
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    template_cache.clear()
+    yield
+    template_cache.clear()
+
+def test_cache_hit_miss():
+    liq1 = Liquid('{{ a }}', {'cache': True})
+    liq2 = Liquid('{{ a }}', {'cache': True})
+    assert liq1.parsed is liq2.parsed
+    assert liq2.render(a=1) == '1'
+    assert template_cache.info() == (1, 1, template_cache.maxsize, 1)
+
+    # different mode or configuration
+    liq3 = Liquid('{{ a }}', {'cache': True, 'mode': 'python'})
+    liq4 = Liquid('{{ a }}', {'cache': True, 'compile': True})
+    assert liq3.parsed is not liq1.parsed
+    assert liq4.parsed is not liq1.parsed
+    assert liq4.compiled is not None
+    assert Liquid('{{ a }}', {'cache': True, 'compile': True}).compiled is (
+        liq4.compiled
+    )
+    assert template_cache.info().currsize == 3
+
+    # not cached
+    assert Liquid('{{ a }}').parsed is not liq1.parsed
+    assert template_cache.info().currsize == 3
+
+def test_cache_file():
+    template = TEMPLATES / 'curr3.liquid'
+    liq1 = Liquid(template, {'cache': True})
+    with template.open() as tpl:
+        liq2 = Liquid(tpl, {'cache': True})
+    assert liq1.parsed is liq2.parsed
+    assert liq1.render() == liq2.render() == 'abcd'
+
+    assert template_cache.invalidate(template) == 1
+    assert Liquid(template, {'cache': True}).parsed is not liq1.parsed
+    assert template_cache.invalidate() == 1
+    assert len(template_cache) == 0
+
+def test_cache_invalidate_depends(tmp_path):
+    mother = tmp_path / 'mother.liquid'
+    mother.write_text('a{% block b %}{% endblock %}c')
+    template = tmp_path / 'child.liquid'
+    template.write_text(
+        '{% extends mother.liquid %}{% block b %}{{ x }}{% endblock %}'
+    )
+    liq = Liquid(template, {'cache': True})
+    assert liq.render(x=1) == 'a1c'
+
+    mother.write_text('A{% block b %}{% endblock %}C')
+    assert Liquid(template, {'cache': True}).render(x=2) == 'a2c'
+    assert template_cache.invalidate(mother) == 1
+    assert Liquid(template, {'cache': True}).render(x=3) == 'A3C'
+
+def test_cache_loader_key():
+    class MyLoader(Loader):
+        def __init__(self, mapping):
+            self.mapping = mapping
+        def load(self, name, curr_path=None, dirs=()):
+            return self._meta(name, name, self.mapping[name])
+
+    env1 = Environment({'cache': True}, loader=MyLoader({'a': '1'}))
+    env2 = Environment({'cache': True}, loader=MyLoader({'a': '1'}))
+    env3 = Environment({'cache': True}, loader=MyLoader({'a': '2'}))
+    assert repr(env1.loader) == repr(env2.loader) != repr(env3.loader)
+    assert '0x' not in repr(env1.loader)
+    liq1 = env1.from_string('{% include a %}')
+    assert env2.from_string('{% include a %}').parsed is liq1.parsed
+    assert env3.from_string('{% include a %}').render() == '2'
+
+def test_cache_lru():
+    cache = TemplateCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.info() == (1, 1, 2, 2)
+
+def test_cache_dir(tmp_path):
+    cachedir = tmp_path / 'cache'
+    mother = tmp_path / 'mother.liquid'
+    mother.write_text('a{% block b %}{% endblock %}c')
+    template = tmp_path / 'child.liquid'
+    template.write_text(
+        '{% extends mother.liquid %}{% block b %}{{ x }}{% endblock %}'
+    )
+    liq = Liquid(template, {'cache': str(cachedir)})
+    assert liq.render(x=1) == 'a1c'
+    cached = list(cachedir.glob('*.pickle'))
+    assert len(cached) == 1
+
+    # loaded from the directory
+    template_cache.clear()
+    liq = Liquid(template, {'cache': str(cachedir)})
+    assert liq.render(x=2) == 'a2c'
+    assert list(cachedir.glob('*.pickle')) == cached
+    assert template_cache.info().misses == 1
+
+    # invalidated by the modified template it extends
+    template_cache.clear()
+    mother.write_text('A{% block b %}{% endblock %}C')
+    stat = mother.stat()
+    os.utime(mother, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert Liquid(template, {'cache': str(cachedir)}).render(x=3) == 'A3C'
+
+    # a corrupt file is just a miss
+    template_cache.clear()
+    cached[0].write_bytes(b'corrupt')
+    assert Liquid(template, {'cache': str(cachedir)}).render(x=4) == 'A4C'
+
+def test_cache_dir_error(tmp_path):
+    template = tmp_path / 'error.liquid'
+    template.write_text('a\n{{ x | nosuchfilter }}')
+    Liquid(template, {'cache': str(tmp_path)})
+    template_cache.clear()
+    with pytest.raises(LiquidRenderError) as exc:
+        Liquid(template, {'cache': str(tmp_path)}).render(x=1)
+    assert 'line 2' in str(exc.value)
+    assert 'nosuchfilter' in str(exc.value)
+
+def test_cache_dir_unwritable(tmp_path):
+    # the cache directory cannot be created under a file
+    cachedir = tmp_path / 'file' / 'cache'
+    cachedir.parent.write_text('')
+    liq = Liquid('{{ x }}', {'cache': str(cachedir)})
+    assert liq.render(x=1) == '1'
+    assert not cachedir.exists()
@@ -0,0 +1,80 @@
+import pytest
+from pathlib import Path
+from liquid import Liquid, LiquidRenderError
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+@pytest.mark.parametrize('template,context', [
+    ('', {}),
+    ('abc {{- a -}} \n def', {'a': 1}),
+    ('{{ a | plus: 1 }}{{ nil }}', {'a': 1}),
+    ('{% if a %}1{% elsif b %}2{% else %}3{% endif %}', {'a': 0, 'b': 0}),
+    ('{% if a %}1{% elsif b %}2{% else %}3{% endif %}', {'a': 0, 'b': 1}),
+    ('{% unless a %}1{% endunless %}', {'a': False}),
+    ('{% for x in y %}{{ forloop.index }}{{ x }}{% else %}e{% endfor %}',
+     {'y': [4, 5]}),
+    ('{% for x in y %}{% for z in y %}{{ forloop.index }}{% endfor %}'
+     '{% if forloop.last %}{{ forloop }}{% endif %}{% endfor %}',
+     {'y': [4, 5]}),
+    ('{% for x in y limit: 2 offset: 1 %}{{ x }}{% else %}e{% endfor %}',
+     {'y': [1, 2, 3, 4]}),
+    ('{% for x in y %}{{ x }}{% else %}e{% endfor %}', {'y': ''}),
+    ('{% for x in (1..5) reversed %}'
+     '{% if x == 4 %}{% continue %}{% endif %}'
+     '{% if x == 2 %}{% break %}{% endif %}{{ x }}'
+     '{% endfor %}', {}),
+    ('{% case a %} {% when 1 %}one{% when 2 %}two'
+     '{% else %}other{% endcase %}', {'a': 2}),
+    ('{% case a %}{% when 1 %}one{% else %}other{% endcase %}', {'a': 3}),
+    ('{% assign x = a | plus: 1 %}{{ x }}', {'a': 1}),
+    ('{% capture x %}{{ a }}{{ a }}{% endcapture %}{{ x }}', {'a': 1}),
+    ('{% comment %}{{ a }}{% endcomment %}{% raw %}{{ a }}{% endraw %}', {}),
+    # rendered by the tags themselves
+    ('{% for x in (1..4) %}{% cycle "a", "b" %}{% increment i %}{% endfor %}',
+     {}),
+    ('{% tablerow x in (1..4) cols: 2 %}{{ x }}{% endtablerow %}', {}),
+    ('{% for x in (1..4) %}{% tablerow y in (1..2) %}{{ y }}'
+     '{% endtablerow %}{% if x == 2 %}{% break %}{% endif %}{% endfor %}', {}),
+])
+def test_compiled_same_as_rendered(template, context):
+    compiled = Liquid(template, {'compile': True})
+    assert compiled.compiled is not None
+    assert compiled.render(**context) == Liquid(template).render(**context)
+
+def test_compiled_break_nested():
+    template = ('{% for x in (1..3) %}{% for y in (1..3) %}'
+                '{% if y > x %}{% break %}{% endif %}{{ x }}{{ y }},'
+                '{% endfor %}{% endfor %}')
+    liq = Liquid(template, {'compile': True})
+    assert liq.render() == '11,21,22,31,32,33,'
+    # the flags are not kept between renders
+    assert liq.render() == '11,21,22,31,32,33,'
+
+def test_compile_include_extends():
+    for template in (TEMPLATES / 'curr3.liquid', TEMPLATES / 'curr.liquid'):
+        assert Liquid(template, {'compile': True}).render() == Liquid(
+            template
+        ).render()
+
+    template = (f'{{% for x in (1..2) %}}'
+                f'{{% include {TEMPLATES / "include.liquid"} x=x %}}'
+                f'{{% endfor %}}')
+    assert Liquid(template, {'compile': True}).render() == '12'
+
+def test_compile_python_mode():
+    template = '{% assign x = [a, 2] %}{{ x | len }}{# a #}{% if a %}1{% endif %}'
+    liq = Liquid(template, {'mode': 'python', 'compile': True})
+    assert liq.compiled is not None
+    assert liq.render(a=1) == '21'
+
+def test_compiled_error_position():
+    template = '''{% if 1 %}
+    {% for x in y %}{{ x | nosuchfilter }}{% endfor %}
+    {% endif %}'''
+    with pytest.raises(LiquidRenderError) as rendered:
+        Liquid(template).render(y=[1])
+    with pytest.raises(LiquidRenderError) as compiled:
+        Liquid(template, {'compile': True}).render(y=[1])
+    assert 'line 2, column 28' in str(compiled.value)
+    assert str(compiled.value) == str(rendered.value)
@@ -0,0 +1,220 @@
+import pickle
+import zipfile
+import pytest
+from pathlib import Path
+from liquid import (
+    Liquid,
+    LiquidSyntaxError,
+    LiquidRenderError,
+    Environment,
+    FileSystemLoader,
+    DictLoader,
+    PackageLoader,
+    ZipLoader,
+)
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+TEMPLATES_DICT = {
+    'header': 'H{{ include.x }}',
+    'a': '{% include header x=1 %}A',
+    'b': '{% include header x=2 %}B',
+    'mother': '1{% block b %}x{% endblock %}3',
+    'child1': '{% extends mother %}{% block b %}2{% endblock %}',
+    'child2': '{% extends mother %}{% block b %}y{% endblock %}',
+}
+
+def test_shared_include():
+    env = Environment(loader=DictLoader(TEMPLATES_DICT))
+    liq_a = env.get_template('a')
+    liq_b = env.get_template('b')
+    assert liq_a.render() == 'H1A'
+    assert liq_b.render() == 'H2B'
+    # header is parsed only once
+    assert (liq_a.parsed.children[0].parsed[0]
+            is liq_b.parsed.children[0].parsed[0])
+    assert env.get_template('header').parsed is (
+        liq_a.parsed.children[0].parsed[0].visitor.root
+    )
+
+    env.clear()
+    assert env.get_template('a').parsed is not liq_a.parsed
+
+def test_shared_include_by_config():
+    env = Environment({'strict': False}, loader=DictLoader({
+        **TEMPLATES_DICT,
+        'c': '{% config fold_constants=false %}{% include header x=3 %}C',
+    }))
+    liq_a = env.get_template('a')
+    liq_c = env.get_template('c')
+    assert liq_a.render() == 'H1A'
+    assert liq_c.render() == 'H3C'
+
+    def included(liq):
+        return next(child.parsed[0] for child in liq.parsed.children
+                    if child.name == 'include')
+
+    # parsed with the configuration of the template including it
+    assert included(liq_a) is not included(liq_c)
+    assert included(liq_a).config.fold_constants is True
+    assert included(liq_c).config.fold_constants is False
+    assert included(env.get_template('a')) is included(liq_a)
+
+def test_extends_not_shared():
+    env = Environment(loader=DictLoader(TEMPLATES_DICT))
+    assert env.get_template('child1').render() == '123'
+    assert env.get_template('child2').render() == '1y3'
+    assert env.get_template('mother').render() == '1x3'
+
+def test_from_string():
+    env = Environment({'mode': 'python'},
+                      loader=[DictLoader(TEMPLATES_DICT),
+                              FileSystemLoader(TEMPLATES)])
+    liq = env.from_string('{% include header x=a %}'
+                          '{% include include.liquid x=a %}{{ len([a]) }}',
+                          a=1)
+    assert liq.__class__.__name__ == 'LiquidPython'
+    assert liq.render() == 'H111'
+
+def test_filters():
+    env = Environment(filters={'upcase': lambda base: f'<{base}>'})
+    assert env.from_string('{{ a | upcase | downcase }}').render(
+        a='B'
+    ) == '<b>'
+    assert Liquid('{{ a | upcase }}').render(a='b') == 'B'
+
+def test_file_system_loader():
+    env = Environment(loader=FileSystemLoader(TEMPLATES))
+    assert env.get_template('curr.liquid').render() == '123'
+    with pytest.raises(OSError):
+        env.get_template('nosuch.liquid')
+    with pytest.raises(LiquidSyntaxError, match='Cannot find template'):
+        env.from_string('{% include nosuch.liquid %}')
+
+def test_file_system_loader_stale(tmp_path):
+    tpl = tmp_path / 'gone.liquid'
+    tpl.write_text('\u00e9{{ a }}', encoding='utf-8')
+    loader = FileSystemLoader(tmp_path)
+    meta = loader.load('gone.liquid')
+    assert meta.stream.read() == '\u00e9{{ a }}'
+    meta.stream.close()
+    # the file is still found by the memoized path resolver
+    tpl.unlink()
+    assert loader.load('gone.liquid') is None
+
+def test_package_loader():
+    env = Environment(loader=PackageLoader('tests',
+                                           'test_addition/templates'))
+    assert env.get_template('mother.liquid').render() == '1x3'
+    assert env.loader.load('nosuch.liquid') is None
+
+def test_zip_loader(tmp_path):
+    zfile = tmp_path / 'templates.zip'
+    with zipfile.ZipFile(zfile, 'w') as zipf:
+        for name, source in TEMPLATES_DICT.items():
+            zipf.writestr(f'tpls/{name}', source)
+
+    env = Environment(loader=ZipLoader(zfile, 'tpls'))
+    assert env.get_template('a').render() == 'H1A'
+    assert env.get_template('child1').render() == '123'
+    assert env.loader.load('nosuch') is None
+
+def test_pickle_environment():
+    env = Environment(loader=DictLoader(TEMPLATES_DICT))
+    liq = pickle.loads(pickle.dumps(env.get_template('a')))
+    assert liq.render() == 'H1A'
+    assert isinstance(liq.env.loader, DictLoader)
+
+CHAIN_DICT = {
+    'base': ('<{% block head %}h{% endblock %}|'
+             '{% for x in xs %}{% if x > 2 %}{% break %}{% endif %}'
+             '{% block item %}{{ x }}{% endblock %}{% endfor %}>'),
+    'layout': ('{% extends base %}'
+               '{% block item %}[{% block inner %}{{ x }}{% endblock %}]'
+               '{% endblock %}'),
+    'page': '{% extends layout %}{% block inner %}{{ x * 2 }}{% endblock %}',
+    'other': '{% extends base %}{% block head %}H{% endblock %}',
+}
+
+@pytest.mark.parametrize('config', [{}, {'compile': True}])
+def test_extends_chain(config):
+    env = Environment({'mode': 'python', **config},
+                      loader=DictLoader(CHAIN_DICT))
+    base = env.get_template('base')
+    tree = base.parsed.children
+    assert env.get_template('page').render(xs=[1, 2, 3]) == '<h|[2][4]>'
+    assert env.get_template('layout').render(xs=[1, 2, 3]) == '<h|[1][2]>'
+    assert env.get_template('other').render(xs=[1, 2, 3]) == '<H|12>'
+    assert base.render(xs=[1, 2, 3]) == '<h|12>'
+    # the tree of the mother template is shared and never modified
+    assert base.parsed.children == tree
+    assert env.get_template('other').parsed.children[0].parsed is (
+        env.get_template('layout').parsed.children[0].parsed
+    )
+
+INLINE_DICT = {
+    'card': ('{% assign y = include.x | plus: 1 %}{% assign n = include.x %}'
+             '{% for i in (1..n) %}{% if i > 2 %}{% break %}'
+             '{% endif %}{{ i }}{% endfor %}:{{ y }}{{ z }};'),
+    'grid': ('{% assign z = "!" %}{% for x in xs %}{% include card x=x %}'
+             '{% endfor %}{{ y }}'),
+}
+
+@pytest.mark.parametrize('config', [{}, {'compile': True}])
+def test_inline_include(config):
+    loader = DictLoader(INLINE_DICT)
+    inlined = Environment({'inline_include': True, **config}, loader=loader)
+    liq = inlined.get_template('grid')
+    assert liq.parsed.children[1].children[0].inlined is (
+        inlined.get_template('card').parsed.children
+    )
+    expected = Environment(config, loader=loader).get_template('grid').render(
+        xs=[1, 3], y='Y'
+    )
+    assert expected == '1:2!;12:4!;Y'
+    assert liq.render(xs=[1, 3], y='Y') == expected
+    assert ''.join(liq.render_iter(xs=[1, 3], y='Y')) == expected
+
+@pytest.mark.parametrize('config', [{}, {'compile': True}])
+def test_dynamic_include(config):
+    from liquid.cache import template_cache, include_cache
+    template_cache.clear()
+    include_cache.clear()
+    loader = DictLoader({
+        'hero': '<h>{{ include.s.title }}</h>',
+        'text': '<p>{{ include.s.title }}</p>',
+        'page': ('{% for s in sections %}{% include {{ s.type }} s=s %}'
+                 '{% endfor %}'),
+    })
+    sections = [{'type': 'hero', 'title': 'a'},
+                {'type': 'text', 'title': 'b'},
+                {'type': 'text', 'title': 'c'}]
+    page = Environment(config, loader=loader).get_template('page')
+    other = Environment(config, loader=loader).from_string(
+        '{% include {{ name | append: "t" }} s=s %}'
+    )
+    assert page.render(sections=sections) == '<h>a</h><p>b</p><p>c</p>'
+    assert other.render(name='tex', s={'title': 'd'}) == '<p>d</p>'
+    # each partial parsed once, whatever includes it
+    assert template_cache.info().currsize == 2
+    assert include_cache.info().currsize == 3
+
+    with pytest.raises(LiquidRenderError, match="Cannot find template"):
+        page.render(sections=[{'type': 'nosuch'}])
+
+    assert include_cache.invalidate('<dict>/text') == 2
+    assert include_cache.info().currsize == 1
+
+def test_dynamic_include_strict():
+    from liquid.cache import template_cache, include_cache
+    template_cache.clear()
+    include_cache.clear()
+    loader = DictLoader({'unsafe': '{% config debug=False %}x'})
+    template = '{% include {{ name }} %}'
+    loose = Environment({'strict': False}, loader=loader)
+    assert loose.from_string(template).render(name='unsafe') == 'x'
+    # not reusing the partial parsed without strict mode
+    strict = Environment({'strict': True}, loader=loader)
+    with pytest.raises(LiquidRenderError, match='config'):
+        strict.from_string(template).render(name='unsafe')
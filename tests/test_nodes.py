@@ -0,0 +1,56 @@
+import pytest
+from liquid.config import Config
+from liquid.utils import template_meta
+from liquid.parser import Parser
+from liquid.python.parser import Parser as ParserPython
+from liquid.exceptions import LiquidSyntaxError
+from .legacy_scanner import NodeScannerLegacy, NodeScannerLegacyPython
+
+def scan(parser_class, scanner_class, template):
+    parser_class = type(parser_class.__name__,
+                        (parser_class, ),
+                        {'NODESCANNER_CLASS': scanner_class})
+    parser = parser_class(template_meta(template), Config())
+    nodes = []
+    while True:
+        try:
+            node = parser.nodescanner.consume(parser.context.stream)
+        except LiquidSyntaxError as exc:
+            nodes.append(str(exc).splitlines()[0])
+            return nodes
+        if node is False:
+            return nodes
+        if node is not True:
+            nodes.append((node.__class__.__name__,
+                          node.content,
+                          node.open_compact,
+                          node.close_compact,
+                          node.context.lineno,
+                          node.context.colno))
+
+@pytest.mark.parametrize('template', [
+    '',
+    'abc',
+    '{{ a }}',
+    'ab\n  {{- a -}}\n cd',
+    '{% if a %}\n{{ a }}{% else %}b{% endif %}',
+    '{%- for x in y -%}\n  {{ x }}\n{% endfor %}',
+    '{% raw %}{{ a }}{% if %}{% endraw %}{{ b }}',
+    '{% raw %}{%endraw%}{% endraw %}',
+    'a\\{{ b }}\\\\{{ c }}\\',
+    '{{ "}}" }}',
+    '{{ a } }}{% b %%}',
+    '{{ a',
+    '{% if a %\n}',
+    '{# comment #}\n{#- a -#}',
+    '{{{ a }}}{%% b %%}',
+    'line1\nline2\n   {{ a }}\n{% b\n c %}',
+])
+@pytest.mark.parametrize('parser_class,legacy_class', [
+    (Parser, NodeScannerLegacy),
+    (ParserPython, NodeScannerLegacyPython),
+])
+def test_scanner_same_as_legacy(template, parser_class, legacy_class):
+    assert scan(parser_class,
+                parser_class.NODESCANNER_CLASS,
+                template) == scan(parser_class, legacy_class, template)
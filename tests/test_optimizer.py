@@ -0,0 +1,385 @@
+import pytest
+from liquid import (
+    Liquid,
+    LiquidNameError,
+    LiquidRenderError,
+    Environment,
+    DictLoader
+)
+from liquid.filters import filter_manager
+from liquid.tags.tag__literal import TagLITERAL
+
+NOFOLD = {'fold_constants': False}
+
+@pytest.fixture
+def counting_filters():
+    calls = []
+
+    @filter_manager.register('count_pure', pure=True)
+    def count_pure(base):
+        calls.append(base)
+        return f'<{base}>'
+
+    @filter_manager.register('count_impure')
+    def count_impure(base):
+        calls.append(base)
+        return f'[{base}]'
+
+    yield calls
+    filter_manager.unregister('count_pure')
+    filter_manager.unregister('count_impure')
+
+def test_static_template():
+    liq = Liquid('a {{ "hello" | upcase }} {{- 3 | times: 4 }}\n'
+                 '{{ "a,b" | split: "," | join: "-" }}{{ nil }}')
+    assert len(liq.parsed.children) == 1
+    assert isinstance(liq.parsed.children[0], TagLITERAL)
+    assert liq.render() == 'a HELLO12\na-b'
+
+@pytest.mark.parametrize('template,context,mode', [
+    ('{% assign n = 3 | times: 4 %}{{ n | plus: x }}', {'x': 1}, 'standard'),
+    ('{{ "a,b" | split: "," | join: "-" | append: x }}', {'x': '!'},
+     'standard'),
+    ('{{ "a,b" | split: "," | append: x }}', {'x': '!'}, 'standard'),
+    ('{% if 1 > 2 %}a{% elsif "x" == "x" and y %}b{% endif %}', {'y': 1},
+     'standard'),
+    ('{% unless "" %}a{% else %}b{% endunless %}', {}, 'standard'),
+    ('{{ "abc".size }}{{ (1..3) | size }}{{ x | plus: 2 }}', {'x': 1},
+     'standard'),
+    ('{{ 1 + 2 * 3 }} {{ "ab"[1:] | upcase }}{{ x * (1 + 1) }}', {'x': 2},
+     'python'),
+    ('{% assign a = [1, 2] %}{{ a | len }}{{ 3 | ? "t" ! "f" }}'
+     '{% if not x or 1 < 2 %}y{% endif %}', {'x': 0}, 'python'),
+    ('{{ "a" | .upper }}{{ "x" | upcase | len }}', {}, 'python'),
+])
+@pytest.mark.parametrize('compile', [False, True])
+def test_folded_same_as_rendered(template, context, mode, compile):
+    folded = Liquid(template, {'mode': mode, 'compile': compile})
+    expected = Liquid(template, {'mode': mode, 'debug': True}).render(
+        **context
+    )
+    assert folded.render(**context) == expected
+
+def test_folded_segments():
+    liq = Liquid('{% assign n = 3 | times: 4 %}{% if x and 1 > 2 %}'
+                 '{% endif %}{{ "a" | upcase | append: x }}'
+                 '{{ nil | plus: 1 }}')
+    assign, tag_if, output, failed = liq.parsed.children
+    assert assign.parsed[1].data == (12, )
+    assert tag_if.parsed.data[2] is False
+    assert output.parsed.data[0] == 'A'
+    assert len(output.parsed) == 2
+    # failed to be evaluated, kept as is
+    assert failed.parsed.data[0] is None
+
+    liq = Liquid('{{ "a" | upcase }}{% if 1 > 2 %}{% endif %}', NOFOLD)
+    assert liq.parsed.children[0].name == 'OUTPUT'
+    assert liq.parsed.children[1].parsed.__class__.__name__ == (
+        'TagSegmentComparison'
+    )
+
+def test_pure_filters(counting_filters):
+    liq = Liquid('{{ "a" | count_pure }}{{ "b" | count_impure }}'
+                 '{{ "now" | date: "%Y" }}')
+    assert counting_filters == ['a']
+    liq.render()
+    liq.render()
+    assert counting_filters == ['a', 'b', 'b']
+    assert 'count_pure' in filter_manager.pure
+    assert 'date' not in filter_manager.pure
+
+    # registered again without being pure
+    filter_manager.register('count_pure')(str.upper)
+    assert 'count_pure' not in filter_manager.pure
+
+def test_filters_overridden_by_environment():
+    env = Environment(filters={'upcase': lambda base: f'<{base}>'})
+    liq = env.from_string('{{ "a" | upcase }}{{ "a" | downcase }}')
+    assert liq.parsed.children[0].name == 'OUTPUT'
+    assert liq.parsed.children[1].name == 'LITERAL'
+    assert liq.render() == '<a>a'
+
+@pytest.mark.parametrize('template,mode', [
+    ('{{ "a" | upcase }}\n  {{ a | nosuch }}', 'standard'),
+    ('{{ "a" | upcase }}\n{{ "a" | plus: 1 }}', 'standard'),
+    ('{% assign b = 1 | plus: 2 %}\n  {{ b | plus: c }}', 'standard'),
+    ('{{ "a" | upcase }}\n  {{ "a" | append: c | upcase }}', 'standard'),
+    ('{% if x %}\n{% elsif 1 > 2 %}{% elsif a.b %}{% endif %}', 'standard'),
+    ('{{ 1 + 1 }}\n  {{ 2 * x }}', 'python'),
+    ('{{ "a" | upcase }}\n  {{ "a" | upcase | nosuch }}', 'python'),
+])
+@pytest.mark.parametrize('compile', [False, True])
+def test_error_positions_unchanged(template, mode, compile):
+    with pytest.raises(LiquidRenderError) as folded:
+        Liquid(template, {'mode': mode, 'compile': compile}).render(a=1)
+    with pytest.raises(LiquidRenderError) as expected:
+        Liquid(template, {'mode': mode, **NOFOLD}).render(a=1)
+    assert str(folded.value) == str(expected.value)
+
+def count_tags(tag):
+    return 1 + sum(count_tags(child) for child in tag.children)
+
+HTML = '''
+<ul>
+  {%- for item in items %}
+    {%- comment %} the items {% endcomment %}
+    <li>
+      {%- if item > 1 -%}
+        {{ item }}
+      {%- else -%}
+        {% raw %}{{ small }}{% endraw %}
+      {%- endif -%}
+    </li>
+  {%- endfor %}
+</ul>
+'''
+
+@pytest.mark.parametrize('template,context,mode', [
+    (HTML, {'items': [1, 2, 3]}, 'standard'),
+    ('  {%- assign x = 1 -%}  \n {%- capture y %} {{- x }} {% endcapture -%}'
+     '  {{ y }}  ', {}, 'standard'),
+    ('{% case a -%} {%- when 1 %} one {% else -%} other {%- endcase %}',
+     {'a': 2}, 'standard'),
+    ('{# note #} a {%- if x %} {# b #} {%- endif %} \n', {'x': 1}, 'python'),
+    ('{% for i in (1..2) -%} A {% raw %}R{% endraw %}\n {%- if false %}x'
+     '{% elsif x -%} B {%- raw %} C {% endraw -%}\n{% elsif x %}D{% endif -%}'
+     ' E {%- endfor %}', {'x': 1}, 'standard'),
+    ('{% unless false -%}\n A {%- if nil %}{% elsif x %} B '
+     '{%- raw -%} {% endraw %}{% elsif true %}C{% endif %} \n{%- endunless %}',
+     {'x': 1}, 'standard'),
+])
+@pytest.mark.parametrize('compile', [False, True])
+def test_literals_same_as_rendered(template, context, mode, compile):
+    liq = Liquid(template, {'mode': mode, 'compile': compile})
+    expected = Liquid(template, {'mode': mode, 'debug': True}).render(
+        **context
+    )
+    assert liq.render(**context) == expected
+
+def test_literals_merged():
+    liq = Liquid(HTML)
+    assert count_tags(liq.parsed) < count_tags(
+        Liquid(HTML, {'debug': True}).parsed
+    )
+    tag_for = liq.parsed.children[1]
+    assert [child.name for child in tag_for.children] == [
+        'LITERAL', 'if', 'else', 'LITERAL'
+    ]
+    assert tag_for.children[0].content == '\n    <li>'
+    assert tag_for.children[2].children[0].content == '{{ small }}'
+
+    liq = Liquid('a {% comment %}{{ b }}{% endcomment %} c'
+                 '{% raw %} {{ d }}{% endraw %}{% config include_dir="." %}'
+                 '  {{- "e" }}', {'strict': False})
+    assert len(liq.parsed.children) == 1
+    assert liq.parsed.children[0].content == 'a  c {{ d }}e'
+    assert not liq.parsed.children[0].open_compact
+    assert not liq.parsed.children[0].close_compact
+
+def test_comment_with_blocks_kept():
+    env = Environment(loader=DictLoader({
+        'mother': ('1{% comment %}{% block b %}x{% endblock %}'
+                   '{% endcomment %}3'),
+        'child': '{% extends mother %}{% block b %}2{% endblock %}',
+    }))
+    assert env.get_template('mother').render() == '13'
+    assert env.get_template('child').render() == '13'
+
+@pytest.mark.parametrize('template,context,mode', [
+    ('a{% if false %}b{% endif %}c{% if true %}d{% else %}e{% endif %}',
+     {}, 'standard'),
+    ('{% if 1 > 2 %}a{% elsif x %}b{% elsif "" %}c{% else %}d{% endif %}',
+     {'x': 0}, 'standard'),
+    ('{% if x %}a{% elsif nil %}b{% elsif y %}c{% else %}d{% endif %}',
+     {'x': 0, 'y': 1}, 'standard'),
+    ('{% unless true %}a{% endunless %}{% unless 0 > 1 %}b{% endunless %}',
+     {}, 'standard'),
+    ('{% for i in xs %}{% if true %}{% if i > 1 %}{% break %}{% endif %}'
+     '{% endif %}{{ i }}{% endfor %}', {'xs': [1, 2, 3]}, 'standard'),
+    ('{% for i in (1..0) %}{{ i }}{% else %}none{% endfor %}'
+     '{% for i in (1..2) limit: 0 %}{{ i }}{% endfor %}'
+     '{% for i in (1..2) %}{{ i }}{% else %}none{% endfor %}', {},
+     'standard'),
+    ('{% if 0 %}a{% else if x %}b{% else if 1 %}c{% else %}d{% endif %}'
+     '{% unless 1 %}e{% else %}f{% endunless %}', {'x': 0}, 'python'),
+    ('{% for i in [] %}{{ i }}{% else if x %}a{% else %}b{% endfor %}'
+     '{% for i in [1] %}{{ i }}{% else %}c{% endfor %}', {'x': 0}, 'python'),
+    ('{% if false %}a{% elsif false %}b{% elsif x %}c{% elsif true %}d'
+     '{% elsif x %}e{% else %}f{% endif %}', {'x': False}, 'standard'),
+    ('{% if a %}{% if false %}{% elsif a %}X{% elsif a %}Y{% endif %}'
+     '{% endif %}', {'a': 1}, 'standard'),
+    ('{% unless true %}x{% else %}yes{% endunless %}'
+     '{% unless false %}y{% else %}no{% endunless %}'
+     '{% unless x %}z{% elsif true %}no{% else %}no{% endunless %}',
+     {'x': 1}, 'standard'),
+    ('{% if false %}{% assign n = 1 %}{% increment c %}{% elsif true %}'
+     '{% assign n = 2 %}{% increment c %}{% else %}{% decrement c %}'
+     '{% endif %}{{ n }}{% increment c %}{% capture s %}{% if 1 > 2 %}no'
+     '{% else %}{% increment c %}{% endif %}{% endcapture %}{{ s }}'
+     '{% for i in (1..3) %}{% unless false %}{% cycle "a", "b" %}'
+     '{% endunless %}{% if true %}{% continue %}{% endif %}-{% endfor %}',
+     {}, 'standard'),
+    ('{% for i in (1..2) %}{% if true %}{% unless i > 1 %}{% if false %}'
+     '{% elsif true %}{{ i }}{% endif %}{% else %}no{% endunless %}'
+     '{% elsif i %}no{% endif %}{% for j in (1..0) %}{% else %}'
+     '{% if i > 1 %}{% break %}{% endif %}-{% endfor %}{% endfor %}', {},
+     'standard'),
+    ('{% case x %}{% when 1 %}{% if false %}a{% else %}b{% endif %}'
+     '{% else %}{% unless true %}c{% endunless %}d{% endcase %}',
+     {'x': 1}, 'standard'),
+    ('{% unless 1 %}a{% else if false %}b{% else %}c{% endunless %}'
+     '{% if x %}{% else if 0 %}{% assign y = 1 %}{% else %}z{% endif %}'
+     '{{ y }}', {'x': 0, 'y': 0}, 'python'),
+])
+@pytest.mark.parametrize('compile', [False, True])
+def test_pruned_same_as_rendered(template, context, mode, compile):
+    liq = Liquid(template, {'mode': mode, 'compile': compile})
+    expected = Liquid(template, {'mode': mode, 'debug': True}).render(
+        **context
+    )
+    assert liq.render(**context) == expected
+
+def test_branches_pruned():
+    liq = Liquid('a {% if false %}b{% endif %}\n'
+                 '{%- if true %}{{ "c" }}{% else %}{{ x }}{% endif %}'
+                 '{% for i in (1..0) %}{{ i }}{% endfor %} d')
+    assert len(liq.parsed.children) == 1
+    assert liq.parsed.children[0].content == 'a c d'
+
+    liq = Liquid('{% if x %}a{% elsif false %}b{% elsif y %}c'
+                 '{% else %}d{% endif %}')
+    tag_if, tag_elsif, tag_else = liq.parsed.children
+    assert tag_if.next is tag_elsif and tag_elsif.prev is tag_if
+    assert tag_elsif.next is tag_else and tag_else.next is None
+
+    liq = Liquid('{% if false %}a{% elsif y %}b{% endif %}')
+    assert liq.parsed.children[0].name == 'elsif'
+    assert liq.parsed.children[0].prev is None
+
+    liq = Liquid('{% if a %}{% if false %}{% elsif a %}X{% elsif a %}Y'
+                 '{% endif %}{% endif %}')
+    tag_elsif, tag_elsif2 = liq.parsed.children[0].children
+    assert tag_elsif.prev is None and tag_elsif.next is tag_elsif2
+    assert tag_elsif2.prev is tag_elsif and tag_elsif2.next is None
+    assert liq.render(a=1) == 'X'
+
+    # else not supported by unless in standard mode
+    liq = Liquid('{% unless true %}x{% else %}yes{% endunless %}'
+                 '{% unless x %}y{% else %}no{% endunless %}')
+    assert len(liq.parsed.children) == 1
+    assert liq.parsed.children[0].name == 'unless'
+    assert liq.render(x=False) == 'y'
+
+    # pruned only when the constants are folded
+    liq = Liquid('{% if false %}a{% endif %}', NOFOLD)
+    assert liq.parsed.children[0].name == 'if'
+    liq = Liquid('{% if true %}a{% else %}b{% endif %}', NOFOLD)
+    assert len(liq.parsed.children) == 2
+    liq = Liquid('{% for i in (1..0) %}a{% endfor %}', NOFOLD)
+    assert liq.parsed.children[0].name == 'for'
+
+def test_branches_with_blocks_kept():
+    env = Environment(loader=DictLoader({
+        'mother': ('1{% if false %}{% block b %}x{% endblock %}'
+                   '{% else %}{% block c %}y{% endblock %}{% endif %}3'),
+        'child': ('{% extends mother %}{% block b %}2{% endblock %}'
+                  '{% block c %}4{% endblock %}'),
+    }))
+    assert env.get_template('mother').render() == '1y3'
+    assert env.get_template('child').render() == '143'
+    assert env.get_template('mother').parsed.children[1].name == 'if'
+
+def snapshot(tag):
+    return (tag, tag.parent, tag.prev, tag.next, tag.parsed,
+            [snapshot(child) for child in tag.children])
+
+def test_extended_shared_tree_not_modified():
+    env = Environment(loader=DictLoader({
+        'mother': ('{% if x %} a {%- endif %}{% if true %}b{% endif %}'
+                   '{% block b %}{{ "c" }}{% endblock %}'
+                   '{% for i in (1..2) %}{{ i }}{% endfor %}'),
+        'child': '{% extends mother %}{% block b %}2{% endblock %}',
+    }))
+    mother = env.get_template('mother')
+    tree = snapshot(mother.parsed)
+    assert env.get_template('child').render(x=1) == ' ab212'
+    assert snapshot(mother.parsed) == tree
+    assert mother.render(x=False) == 'bc12'
+
+    flattened = env.get_template('child').parsed.children[0].flattened
+    assert not set(flattened.children) & set(mother.parsed.children)
+    assert all(child.parent is flattened for child in flattened.children)
+
+SPECIALIZE = {'specialize': True}
+SITE = {'shop': {'name': 'acme'}, 'flags': {'promo': True, 'beta': False},
+        'currency': 'EUR', 'rate': 2, 'items': [1, 2], 'zero': 0}
+
+@pytest.mark.parametrize('template,context,mode', [
+    ('{% if flags.promo %}<p>{{ shop.name | upcase }}</p>{% endif %}'
+     '{% if flags.beta %}beta{% else %}{{ price | times: rate }}{% endif %}'
+     ' {{ currency }}', {'price': 3}, 'standard'),
+    ('{% for x in items limit: zero %}{{ x }}{% else %}none{% endfor %}'
+     '{% assign currency = "USD" %}{{ currency }}{{ rate | plus: n }}',
+     {'n': 1}, 'standard'),
+    ('{% for rate in (1..2) %}{{ rate }}{% endfor %}'
+     '{% capture shop %}{{ currency }}{% endcapture %}{{ shop }}', {},
+     'standard'),
+    ('{{ shop["name"].upper() }}{{ rate * 3 }}{% if flags["beta"] %}b'
+     '{% else %}{{ currency | .lower }}{% endif %}', {}, 'python'),
+    ('{% for shop in [1, 2] %}{{ shop }}{% endfor %}{{ shop["name"] }}'
+     '{% assign rate = 3 %}{{ rate }}', {}, 'python'),
+])
+@pytest.mark.parametrize('compile', [False, True])
+def test_specialized_same_as_rendered(template, context, mode, compile):
+    liq = Liquid(template, {'mode': mode, 'compile': compile, **SPECIALIZE},
+                 **SITE)
+    expected = Liquid(template, {'mode': mode}, **SITE).render(**context)
+    assert liq.render(**context) == expected
+
+def test_specialized():
+    template = ('{% if flags.promo %}<p>{{ shop.name | upcase }}</p>'
+                '{% endif %}{% if flags.beta %}beta{% endif %}'
+                '{{ price | times: rate }} {{ currency }}')
+    liq = Liquid(template, SPECIALIZE, **SITE)
+    literal, output, literal2 = liq.parsed.children
+    assert literal.content == '<p>ACME</p>'
+    assert output.name == 'OUTPUT'
+    assert literal2.content == ' EUR'
+    assert liq.render(price=3) == '<p>ACME</p>6 EUR'
+    with pytest.raises(LiquidNameError, match="'currency'"):
+        liq.render(currency='USD')
+
+    # not specialized unless asked
+    liq = Liquid(template, **SITE)
+    assert liq.parsed.children[0].name == 'if'
+    assert liq.render(price=1, currency='USD') == '<p>ACME</p>2 USD'
+
+    # variables bound by the template are not specialized
+    liq = Liquid('{% assign currency = "USD" %}{{ currency }}{{ rate }}',
+                 SPECIALIZE, **SITE)
+    assert liq.parsed.children[1].name == 'OUTPUT'
+    assert liq.parsed.children[2].content == '2'
+
+def test_specialized_shared_tree_not_modified():
+    env = Environment(SPECIALIZE, loader=DictLoader({
+        'mother': ('{% if flags.promo %}P{% endif %}'
+                   '{% block b %}{{ currency }}{% endblock %}'),
+        'child': '{% extends mother %}{% block b %}[{{ currency }}]'
+                 '{% endblock %}',
+        'page': '{% include mother %}{{ currency }}',
+    }))
+    mother = env.get_template('mother')
+    tree = mother.parsed.children
+    assert env.get_template('child', **SITE).render() == 'P[EUR]'
+    assert env.get_template('page', **SITE).render() == 'PEUREUR'
+    assert mother.parsed.children == tree
+    assert mother.parsed.children[0].name == 'if'
+    assert env.get_template('child').render(
+        flags={'promo': False}, currency='USD'
+    ) == '[USD]'
+
+def test_specialized_with_custom_tags():
+    liq = Liquid('{% python x = 1 %}{{ rate }}',
+                 {'mode': 'python', 'strict': False, **SPECIALIZE}, **SITE)
+    assert liq.parsed.children[1].name == 'OUTPUT'
+    assert liq.render(rate=3) == '3'
@@ -420,3 +420,14 @@ def test_from():
                   {'mode': 'python', 'strict': False}).render().strip() == 'a/b'
 
 
+
+def test_scopes_not_leaked():
+    liq = Liquid('{% assign f = lambda a: a + b %}{{ 1 | f }}{{ 2 | f }}'
+                 '{{ "b" | max: "a", _ }}{{ _ }}', {'mode': 'python'})
+    assert liq.render(b=1, _='-') == '23b-'
+
+    # the variables in the scope of the include are rendered
+    env = Environment({'mode': 'python'},
+                      loader=DictLoader({'part': '{{ tpl | render }}'}))
+    liq = env.from_string('{% include part x=2 %}{{ include }}')
+    assert liq.render(b=1, include=0, tpl='{{ b }}{{ include.x }}') == '120'
@@ -0,0 +1,61 @@
+import pytest
+from io import StringIO
+from pathlib import Path
+from liquid import Liquid, LiquidRenderError
+from liquid import liquid as liquid_module
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+@pytest.mark.parametrize('template,context', [
+    ('', {}),
+    ('{{ a }}', {'a': 1}),
+    ('{% for x in y %}{{ x }}{% capture c %}{{ x }}{% endcapture %}'
+     '{% if x > 1 %}{% break %}{% endif %}{% endfor %}{{ c }}',
+     {'y': [1, 2, 3]}),
+    (f'{{% for x in (1..2) %}}'
+     f'{{% include {TEMPLATES / "include.liquid"} x=x %}}'
+     f'{{% endfor %}}', {}),
+    (TEMPLATES / 'curr.liquid', {}),
+    (TEMPLATES / 'curr3.liquid', {}),
+    ('{% assign x = [a] %}{{ x | len }}', {'a': 1, 'mode': 'python'}),
+])
+def test_render_iter_same_as_render(template, context):
+    config = {'mode': context.pop('mode', 'standard')}
+    rendered = Liquid(template, config).render(**context)
+    assert ''.join(Liquid(template, config).render_iter(**context)) == (
+        rendered
+    )
+    out = StringIO()
+    Liquid(template, config).render_to(out, **context)
+    assert out.getvalue() == rendered
+
+def test_render_iter_chunks(monkeypatch):
+    monkeypatch.setattr(liquid_module, 'LIQUID_STREAM_CHUNK_SIZE', 10)
+    rendered = []
+    class Item:
+        def __init__(self, i):
+            self.i = i
+        def __str__(self):
+            rendered.append(self.i)
+            return str(self.i)
+
+    liq = Liquid('{% for x in y %}{{ x }},{% endfor %}')
+    chunks = liq.render_iter(y=[Item(i) for i in range(100)])
+    first = next(chunks)
+    assert len(first) >= 10
+    # streamed before the loop finishes
+    assert len(rendered) < 100
+    rest = ''.join(chunks)
+    assert first + rest == ''.join(f'{i},' for i in range(100))
+    # the generator function is compiled once
+    assert liq._compiled_iter is not None
+    assert ''.join(liq.render_iter(y=[1])) == '1,'
+
+def test_render_iter_error():
+    template = 'a\n{{ x | nosuchfilter }}'
+    with pytest.raises(LiquidRenderError) as rendered:
+        Liquid(template).render(x=1)
+    with pytest.raises(LiquidRenderError) as streamed:
+        list(Liquid(template).render_iter(x=1))
+    assert str(streamed.value) == str(rendered.value)
@@ -546,3 +546,23 @@ def test_xcrement():
 
 
 
+
+@pytest.mark.parametrize('template,used', [
+    ('{% for x in (1..3) %}{{ x }}{% endfor %}', False),
+    ('{% for x in (1..3) %}{% raw %}{{ forloop }}{% endraw %}{% endfor %}',
+     False),
+    ('{% for x in (1..3) %}{{ forloop.index }}{% endfor %}', True),
+    ('{% for x in (1..3) %}{% if x %}{% else %}{{ forloop.last }}'
+     '{% endif %}{% endfor %}', True),
+    ('{% for x in (1..3) %}{% assign f = forloop %}{% endfor %}', True),
+])
+def test_forloop_detected(template, used):
+    assert Liquid(template, {'debug': True}).parsed.children[0].uses_forloop \
+        is used
+
+def test_forloop_shared():
+    tpl = ('{% for x in (1..3) %}{{ forloop.index }}'
+           '{% assign f = forloop %}{% endfor %}{{ f.index }}')
+    # the forloop object is updated in place by the iterations
+    assert Liquid(tpl).render() == '1233'
+    assert Liquid(tpl, {'compile': True}).render() == '1233'
@@ -0,0 +1,110 @@
+import pickle
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from liquid import Liquid, LiquidRenderError, LiquidNameError
+
+HERE = Path(__file__).parent.resolve()
+TEMPLATES = HERE / 'test_addition' / 'templates'
+
+TEMPLATE = '''
+{%- for x in xs -%}
+  {%- for y in (1..3) -%}
+    {%- if y > x %}{% break %}{% endif -%}
+    {%- if y == 2 %}{% continue %}{% endif -%}
+    {%- cycle "a", "b", "c" -%}{{ y }}
+  {%- endfor -%}
+  {%- case x %}{% when 1 %}one{% when 2 %}two{% else %}many{% endcase -%},
+{%- endfor -%}
+'''
+
+@pytest.mark.parametrize('config', [{}, {'compile': True}])
+def test_render_in_threads(config):
+    liq = Liquid(TEMPLATE, config)
+    contexts = [{'xs': [i % 4, (i + 1) % 4, 3]} for i in range(64)]
+    expected = [liq.render(**context) for context in contexts]
+
+    with ThreadPoolExecutor(16) as executor:
+        for _ in range(10):
+            assert list(
+                executor.map(lambda context: liq.render(**context), contexts)
+            ) == expected
+
+def test_render_extends_in_threads():
+    liq = Liquid(TEMPLATES / 'curr.liquid')
+    with ThreadPoolExecutor(16) as executor:
+        assert set(executor.map(lambda _: liq.render(), range(64))) == {'123'}
+
+def test_cycle_starts_over():
+    liq = Liquid('{% for x in (1..2) %}{% cycle "a", "b", "c" %}{% endfor %}')
+    assert liq.render() == 'ab'
+    assert liq.render() == 'ab'
+
+def test_case_nested():
+    liq = Liquid('{% case a %}{% when 1 %}'
+                 '{% case b %}{% when 2 %}b2{% endcase %}'
+                 '{% when 2 %}a2{% endcase %}')
+    assert liq.render(a=1, b=2) == 'b2'
+    assert liq.render(a=2, b=1) == 'a2'
+
+def test_error_location_repeated():
+    liq = Liquid('ab {{ x | nosuchfilter }}', {'cache': True})
+    messages = set()
+    for _ in range(3):
+        with pytest.raises(LiquidRenderError) as exc:
+            liq.render(x=1)
+        messages.add(str(exc.value))
+    assert len(messages) == 1
+    assert 'line 1, column 11' in messages.pop()
+
+@pytest.mark.parametrize('workers', [None, 1, 3])
+@pytest.mark.parametrize('mode', ['standard', 'python'])
+def test_render_many(workers, mode):
+    liq = Liquid('{{ greeting }} {{ name }}{% if name == "x" %}!{% endif %}',
+                 {'mode': mode}, greeting='Hi')
+    contexts = ({'name': f'n{i}'} for i in range(50))
+    rendered = liq.render_many(contexts, workers)
+    assert liq.batch_stats is None
+    assert list(rendered) == [f'Hi n{i}' for i in range(50)]
+    assert liq.batch_stats.records == 50
+    assert liq.batch_stats.records_per_second > 0
+    assert '50 records in' in str(liq.batch_stats)
+
+def test_render_many_error():
+    liq = Liquid('{{ a | nosuchfilter }}')
+    with pytest.raises(LiquidRenderError):
+        list(liq.render_many([{'a': 1}], 2))
+    with pytest.raises(LiquidNameError):
+        list(liq.render_many([{'__LIQUID_X': 1}]))
+
+@pytest.mark.parametrize('template,config', [
+    ('{{ a | plus: 1 }}{% for x in (1..2) %}{% cycle "x", "y" %}{% endfor %}',
+     {}),
+    ('{{ a | plus: 1 }}', {'compile': True}),
+    ('{{ a + 1 }}{% for x in range(2) %}{{ x }}{% endfor %}',
+     {'mode': 'python', 'compile': True}),
+    (TEMPLATES / 'curr.liquid', {}),
+])
+def test_pickle(template, config):
+    liq = Liquid(template, config)
+    loaded = pickle.loads(pickle.dumps(liq))
+    assert loaded.__class__ is liq.__class__
+    assert (loaded.compiled is None) == (liq.compiled is None)
+    assert loaded.render(a=1) == liq.render(a=1)
+
+def test_pickle_error_message():
+    liq = pickle.loads(pickle.dumps(Liquid('{{ a | nosuchfilter }}')))
+    with pytest.raises(LiquidRenderError, match='nosuchfilter'):
+        liq.render(a=1)
+
+def test_render_many_processes():
+    liq = Liquid('{% for x in xs %}{{ x | plus: y }}{% endfor %}', y=1)
+    contexts = [{'xs': list(range(i % 5 + 1))} for i in range(600)]
+    assert list(liq.render_many(contexts, processes=2)) == list(
+        liq.render_many(contexts)
+    )
+    assert liq.batch_stats.records == 600
+
+    with pytest.raises(LiquidRenderError):
+        list(Liquid('{{ a | nosuchfilter }}').render_many([{'a': 1}],
+                                                          processes=1))
@@ -14,3 +14,171 @@ def test_check_name():
 
 def test_shorten():
     assert shorten('abcdefg', 6) == 'ab ...'
+
+def test_get_tag_parser_cache(tmp_path, monkeypatch):
+    from liquid import utils
+    from liquid.tags.tag_if import TagIf
+    monkeypatch.setattr(utils, 'LIQUID_PARSER_CACHE_DIR', str(tmp_path))
+    args = (TagIf.START, TagIf.GRAMMAR, TagIf.TRANSFORMER, TagIf.BASE_GRAMMAR)
+    built = get_tag_parser(*args)
+    assert len(list(tmp_path.glob('tag-parser-*.lark'))) == 1
+    loaded = get_tag_parser(*args)
+    assert repr(loaded.parse('a == 1')) == repr(built.parse('a == 1'))
+
+    monkeypatch.setattr(utils, 'LIQUID_PARSER_CACHE_DIR', '')
+    assert parser_cache_file(TagIf.START, 'grammar') is False
+
+def test_parser_cache_file_default(tmp_path, monkeypatch):
+    from pathlib import Path
+    from liquid import utils
+    monkeypatch.setattr(utils, 'LIQUID_PARSER_CACHE_DIR', None)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    cachefile = parser_cache_file('start', 'grammar')
+    assert Path(cachefile).parent == tmp_path / 'liquidpy'
+
+    # no home directory to resolve the default one
+    def no_home():
+        raise RuntimeError('Could not determine home directory.')
+    monkeypatch.delenv('XDG_CACHE_HOME')
+    monkeypatch.setattr(Path, 'home', no_home)
+    assert parser_cache_file('start', 'grammar') is False
+
+def test_lazy_tag_parser():
+    from threading import Thread
+    from liquid.tags.tag_if import TagIf
+    lazy = LazyTagParser(TagIf.START, TagIf.GRAMMAR,
+                         TagIf.TRANSFORMER, TagIf.BASE_GRAMMAR.copy())
+    assert lazy.shared is not None
+    assert not lazy.built
+    parsers = []
+    threads = [Thread(target=lambda: parsers.append(lazy.build()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lazy.built
+    assert len(set(map(id, parsers))) == 1
+
+def test_warmup():
+    from liquid import warmup, Liquid
+    from liquid.tags.tag_tablerow import TagTablerow
+    assert warmup('standard') > 0
+    assert TagTablerow.PARSER.built
+    assert warmup() > warmup('python')
+
+def test_shared_tag_parser():
+    from liquid import Liquid, Tag
+    from liquid.tags.tag_if import TagIf
+    from liquid.tags.tag_for import TagFor
+    from liquid.tags.tag_config import TagConfig
+    from liquid.tags.transformer import TagTransformer
+    assert TagIf.PARSER.shared is TagFor.PARSER.shared is not None
+    assert TagConfig.PARSER.shared is None
+
+    class TagTwiceTransformer(TagTransformer):
+        def tag_twice(self, children):
+            return children[0]
+
+    class TagTwice(Tag):
+        VOID = True
+        START = 'tag_twice'
+        GRAMMAR = 'tag_twice: var "twice"'
+        TRANSFORMER = TagTwiceTransformer()
+
+    # a tag changing the base rules does not share the parser
+    class TagChanging(Tag):
+        VOID = True
+        START = 'var'
+        GRAMMAR = 'var: "@" NAME'
+
+    assert TagTwice.PARSER.shared is TagIf.PARSER.shared
+    assert not TagIf.PARSER.built
+    assert TagChanging.PARSER.shared is None
+    assert repr(TagTwice.PARSER.parse('a twice')) == repr(
+        TagIf.PARSER.parse('a')
+    )
+    assert Liquid('{% if a or b %}1{% endif %}').render(a=0, b=1) == '1'
+
+    # the terminals of the other tags
+    shared = TagIf.PARSER.shared
+    parser = shared.build()
+    assert shared.foreign(parser, 'tag_if', 'TWICE')
+    assert not shared.foreign(parser, 'tag_twice', 'TWICE')
+    assert not shared.foreign(parser, 'tag_if', '$END')
+
+def test_shared_tag_parser_syntax_error():
+    from lark import UnexpectedToken
+    from liquid.tags.tag_if import TagIf
+    lazy = LazyTagParser(TagIf.START, TagIf.GRAMMAR,
+                         TagIf.TRANSFORMER, TagIf.BASE_GRAMMAR.copy())
+    with pytest.raises(UnexpectedToken):
+        lazy.parse('a ==')
+    # not falling back to the own parser of the tag
+    assert lazy.parser is None
+
+def test_path_resolver(tmp_path):
+    resolver = PathResolver(ttl=float('inf'))
+    (tmp_path / 'a.liquid').write_text('a')
+    (tmp_path / 'sub').mkdir()
+    curr = tmp_path / 'curr.liquid'
+
+    assert resolver.find_template('a.liquid', curr, []) == (
+        tmp_path / 'a.liquid'
+    )
+    assert resolver.find_template('a.liquid', curr, []) == (
+        tmp_path / 'a.liquid'
+    )
+    assert resolver.find_dir('sub', curr) == tmp_path / 'sub'
+    assert resolver.find_dir('a.liquid', curr) is None
+    info = resolver.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 3, 3)
+    # one stat and one listing of tmp_path for all the lookups, and one
+    # more stat for the directory missed by the listing
+    assert info.stats == 3
+
+    # missed by the listing, found by the file system
+    (tmp_path / 'b.liquid').write_text('b')
+    assert resolver.find_template('b.liquid', curr, []) == (
+        tmp_path / 'b.liquid'
+    )
+    assert resolver.find_template('c.liquid', curr, []) is None
+
+    resolver.clear()
+    assert resolver.info() == PathCacheInfo(0, 0, 0, 0)
+
+def test_path_resolver_revalidate(tmp_path):
+    resolver = PathResolver(ttl=0)
+    curr = tmp_path / 'curr.liquid'
+    assert resolver.find_template('a.liquid', curr, []) is None
+    (tmp_path / 'a.liquid').write_text('a')
+    assert resolver.find_template('a.liquid', curr, []) == (
+        tmp_path / 'a.liquid'
+    )
+    assert resolver.info().hits == 0
+    assert resolver.is_file(tmp_path / 'a.liquid')
+    assert not resolver.is_file(tmp_path / 'nosuch' / 'a.liquid')
+    assert not resolver.is_dir(tmp_path / 'a.liquid')
+
+def test_template_meta_source(monkeypatch):
+    from liquid import utils
+    resolver = PathResolver()
+    monkeypatch.setattr(utils, 'path_resolver', resolver)
+    for source in ('a\nb', '{{ a }}', '{% raw %}'):
+        assert template_meta(source).name == '<string>'
+    assert resolver.info().stats == 0
+    assert template_meta('nosuch.liquid').name == '<string>'
+    assert resolver.info().stats > 0
+
+def test_scope():
+    parent = {'a': 1, 'b': 2}
+    scope = Scope(parent, {'b': 3})
+    inner = Scope(scope, {'c': 4})
+    inner['a'] = 5
+    assert parent == {'a': 1, 'b': 2}
+    assert inner['a'] == 5 and inner['b'] == 3 and scope['a'] == 1
+    assert 'b' in inner and 'd' not in inner
+    assert inner.get('b') == 3 and inner.get('d', 0) == 0
+    assert inner.merged() == {'a': 5, 'b': 3, 'c': 4}
+    with pytest.raises(KeyError):
+        inner['d']